@@ -0,0 +1,193 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from profiling import timed_import
+from metrics import metrics
+
+DEFAULT_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+
+class EmbeddingService:
+    """Process-wide sentence embedder shared by every agent.
+
+    The SentenceTransformer model is loaded on the first ``encode`` call.
+    Concurrent ``encode`` calls from different agents are collected for up to
+    ``batch_window`` seconds and sent to the model as one batch.
+
+    Agents embed strings built from a few templates, so vectors are kept in
+    an LRU of ``cache_size`` entries keyed by the SHA-1 of the text. Cached
+    vectors are shared between callers and read-only.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, batch_window=0.005, max_batch_size=64, cache_size=None):
+        self.model_name = model_name
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        if cache_size is None:
+            cache_size = int(os.getenv('EMBEDDING_CACHE_SIZE', '4096'))
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._leader_active = False
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'model_load_seconds': None,
+            'encode_calls': 0,
+            'batches': 0,
+            'texts_encoded': 0,
+            'max_batch_size': 0,
+            'total_encode_seconds': 0.0,
+            'cache_hits': 0,
+            'cache_misses': 0,
+        }
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    start = time.perf_counter()
+                    sentence_transformers = timed_import('sentence_transformers')
+                    self._model = sentence_transformers.SentenceTransformer(self.model_name)
+                    with self._stats_lock:
+                        self._stats['model_load_seconds'] = time.perf_counter() - start
+        return self._model
+
+    @staticmethod
+    def _cache_key(text):
+        return hashlib.sha1(text.encode('utf-8')).digest()
+
+    def _cache_get(self, key):
+        with self._cache_lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+        with self._stats_lock:
+            self._stats['cache_hits' if vector is not None else 'cache_misses'] += 1
+        return vector
+
+    def _cache_put(self, key, vector):
+        # Copy so a cached row does not keep its whole batch alive
+        vector = np.array(vector, copy=True)
+        vector.flags.writeable = False
+        if self.cache_size > 0:
+            with self._cache_lock:
+                self._cache[key] = vector
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return vector
+
+    def encode(self, text):
+        """Encode a single text, sharing the forward pass with concurrent callers."""
+        key = self._cache_key(text)
+        cached = self._cache_get(key)
+        if cached is not None:
+            with self._stats_lock:
+                self._stats['encode_calls'] += 1
+            return cached
+
+        request = {'text': text, 'event': threading.Event(), 'result': None, 'error': None}
+        with self._pending_lock:
+            self._pending.append(request)
+            is_leader = not self._leader_active
+            if is_leader:
+                self._leader_active = True
+
+        with self._stats_lock:
+            self._stats['encode_calls'] += 1
+
+        with metrics.span('embed'):
+            if is_leader:
+                self._run_batches()
+            request['event'].wait()
+        if request['error'] is not None:
+            raise request['error']
+        return self._cache_put(key, request['result'])
+
+    def encode_batch(self, texts):
+        """Encode a list of texts, running only the uncached, distinct ones through the model."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        with self._stats_lock:
+            self._stats['encode_calls'] += 1
+        keys = [self._cache_key(text) for text in texts]
+        vectors = {}
+        for key in keys:
+            if key not in vectors:
+                vectors[key] = self._cache_get(key)
+        missing = {key: text for key, text in zip(keys, texts) if vectors[key] is None}
+        if missing:
+            for key, vector in zip(missing, self._forward(list(missing.values()))):
+                vectors[key] = self._cache_put(key, vector)
+        return np.stack([vectors[key] for key in keys])
+
+    def _run_batches(self):
+        # The leader waits briefly so that requests issued by other agents at
+        # the same moment end up in the same batch.
+        if self.batch_window > 0:
+            time.sleep(self.batch_window)
+        while True:
+            with self._pending_lock:
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+                if not batch:
+                    self._leader_active = False
+                    return
+            try:
+                vectors = self._forward([request['text'] for request in batch])
+                for request, vector in zip(batch, vectors):
+                    request['result'] = vector
+            except Exception as e:
+                for request in batch:
+                    request['error'] = e
+            for request in batch:
+                request['event'].set()
+
+    def _forward(self, texts):
+        model = self.model
+        start = time.perf_counter()
+        vectors = model.encode(texts)
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self._stats['batches'] += 1
+            self._stats['texts_encoded'] += len(texts)
+            self._stats['max_batch_size'] = max(self._stats['max_batch_size'], len(texts))
+            self._stats['total_encode_seconds'] += elapsed
+        return vectors
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        batches = stats['batches']
+        stats['model_loaded'] = self._model is not None
+        stats['avg_batch_size'] = stats['texts_encoded'] / batches if batches else 0.0
+        stats['avg_encode_latency_ms'] = stats['total_encode_seconds'] * 1000 / batches if batches else 0.0
+        lookups = stats['cache_hits'] + stats['cache_misses']
+        stats['cache_hit_rate'] = stats['cache_hits'] / lookups if lookups else 0.0
+        with self._cache_lock:
+            stats['cache_entries'] = len(self._cache)
+        return stats
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_embedding_service():
+    """Return the shared EmbeddingService, creating it on first use."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = EmbeddingService()
+    return _service
@@ -0,0 +1,341 @@
+from collections import deque
+
+import numpy as np
+
+SMA_WINDOWS = (5, 20)
+EMA_SPANS = (12, 26)
+RSI_PERIOD = 14
+ATR_PERIOD = 14
+VOLUME_WINDOW = 20
+
+
+# Vectorized series functions. Every function works along the last axis, so
+# the same call handles one symbol (shape (T,)) or a whole universe of
+# symbols at once (shape (N, T)).
+
+def _smooth(values, out, start, alpha):
+    """Exponential smoothing recursion from index ``start`` onwards, in place.
+
+    The recursion is inherently sequential in time, so it is vectorized across
+    symbols; a single series runs on plain floats, which is much faster than
+    indexing NumPy scalars one at a time.
+    """
+    if values.ndim == 1:
+        prev = float(out[start - 1])
+        smoothed = []
+        for value in values[start:].tolist():
+            prev += alpha * (value - prev)
+            smoothed.append(prev)
+        out[start:] = smoothed
+        return
+    for t in range(start, values.shape[-1]):
+        out[..., t] = out[..., t - 1] + alpha * (values[..., t] - out[..., t - 1])
+
+
+def sma(values, window):
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] < window:
+        return out
+    csum = np.cumsum(values, axis=-1)
+    out[..., window - 1] = csum[..., window - 1]
+    out[..., window:] = csum[..., window:] - csum[..., :-window]
+    out[..., window - 1:] /= window
+    return out
+
+
+def ema(values, span):
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty(values.shape)
+    if values.shape[-1] == 0:
+        return out
+    out[..., 0] = values[..., 0]
+    _smooth(values, out, 1, 2.0 / (span + 1))
+    return out
+
+
+def wilder(values, period):
+    """Wilder smoothing seeded with the simple mean of the first ``period`` values."""
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] < period:
+        return out
+    out[..., period - 1] = values[..., :period].mean(axis=-1)
+    _smooth(values, out, period, 1.0 / period)
+    return out
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        out = 100.0 - 100.0 / (1.0 + rs)
+    return np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), out)
+
+
+def rsi(close, period=RSI_PERIOD):
+    close = np.asarray(close, dtype=np.float64)
+    out = np.full(close.shape, np.nan)
+    if close.shape[-1] <= period:
+        return out
+    delta = np.diff(close, axis=-1)
+    avg_gain = wilder(np.clip(delta, 0, None), period)
+    avg_loss = wilder(np.clip(-delta, 0, None), period)
+    out[..., 1:] = _rsi_from_averages(avg_gain, avg_loss)
+    out[..., :period] = np.nan
+    return out
+
+
+def true_range(high, low, close):
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    tr = high - low
+    if close.shape[-1] > 1:
+        prev_close = close[..., :-1]
+        tr[..., 1:] = np.maximum.reduce([
+            tr[..., 1:],
+            np.abs(high[..., 1:] - prev_close),
+            np.abs(low[..., 1:] - prev_close),
+        ])
+    return tr
+
+
+def atr(high, low, close, period=ATR_PERIOD):
+    return wilder(true_range(high, low, close), period)
+
+
+def compute_indicator_series(open_, high, low, close, volume):
+    """Compute every indicator over the full history in one vectorized pass."""
+    series = {}
+    for window in SMA_WINDOWS:
+        series[f'SMA_{window}'] = sma(close, window)
+    for span in EMA_SPANS:
+        series[f'EMA_{span}'] = ema(close, span)
+    series['RSI'] = rsi(close, RSI_PERIOD)
+    series['ATR'] = atr(high, low, close, ATR_PERIOD)
+    series[f'VOLUME_AVG_{VOLUME_WINDOW}'] = sma(volume, VOLUME_WINDOW)
+    return series
+
+
+def _as_float(value):
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+class IndicatorState:
+    """Incrementally maintained indicators for a single symbol.
+
+    ``update`` folds one new bar into the state in constant time and gives the
+    same values as ``compute_indicator_series`` over the full history.
+    ``replace_last`` swaps out the most recent bar, which is how an intraday
+    quote refresh of today's bar is applied.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.last_close = None
+        self.last_volume = None
+        self.closes = deque(maxlen=max(SMA_WINDOWS))
+        self.volumes = deque(maxlen=VOLUME_WINDOW)
+        self.emas = {span: None for span in EMA_SPANS}
+        self.gain_seed = []
+        self.loss_seed = []
+        self.avg_gain = None
+        self.avg_loss = None
+        self.tr_seed = []
+        self.atr = None
+        self._previous = None
+
+    @classmethod
+    def from_history(cls, open_, high, low, close, volume):
+        """Seed the state from a full history using the vectorized functions.
+
+        All but the last bar are folded in at once; the last bar goes through
+        ``update`` so that ``replace_last`` works straight after seeding.
+        """
+        high = np.asarray(high, dtype=np.float64)
+        low = np.asarray(low, dtype=np.float64)
+        close = np.asarray(close, dtype=np.float64)
+        volume = np.asarray(volume, dtype=np.float64)
+        state = cls()
+        if len(close) == 0:
+            return state
+        head = slice(0, len(close) - 1)
+        state._seed(high[head], low[head], close[head], volume[head])
+        state.update(open_[-1], high[-1], low[-1], close[-1], volume[-1])
+        return state
+
+    def _seed(self, high, low, close, volume):
+        n = len(close)
+        if n == 0:
+            return
+        self.count = n
+        self.last_close = float(close[-1])
+        self.last_volume = float(volume[-1])
+        self.closes.extend(close[-self.closes.maxlen:].tolist())
+        self.volumes.extend(volume[-self.volumes.maxlen:].tolist())
+        for span in EMA_SPANS:
+            self.emas[span] = float(ema(close, span)[-1])
+
+        delta = np.diff(close)
+        gains, losses = np.clip(delta, 0, None), np.clip(-delta, 0, None)
+        if len(delta) >= RSI_PERIOD:
+            self.avg_gain = float(wilder(gains, RSI_PERIOD)[-1])
+            self.avg_loss = float(wilder(losses, RSI_PERIOD)[-1])
+        else:
+            self.gain_seed = gains.tolist()
+            self.loss_seed = losses.tolist()
+
+        tr = true_range(high, low, close)
+        if n >= ATR_PERIOD:
+            self.atr = float(wilder(tr, ATR_PERIOD)[-1])
+        else:
+            self.tr_seed = tr.tolist()
+
+    def _snapshot(self):
+        snapshot = dict(self.__dict__)
+        snapshot.pop('_previous')
+        snapshot['closes'] = deque(self.closes, maxlen=self.closes.maxlen)
+        snapshot['volumes'] = deque(self.volumes, maxlen=self.volumes.maxlen)
+        snapshot['emas'] = dict(self.emas)
+        snapshot['gain_seed'] = list(self.gain_seed)
+        snapshot['loss_seed'] = list(self.loss_seed)
+        snapshot['tr_seed'] = list(self.tr_seed)
+        return snapshot
+
+    def update(self, open_, high, low, close, volume):
+        self._previous = self._snapshot()
+        close = float(close)
+        high = float(high)
+        low = float(low)
+
+        tr = high - low
+        if self.last_close is not None:
+            tr = max(tr, abs(high - self.last_close), abs(low - self.last_close))
+            delta = close - self.last_close
+            gain, loss = max(delta, 0.0), max(-delta, 0.0)
+            if self.avg_gain is None:
+                self.gain_seed.append(gain)
+                self.loss_seed.append(loss)
+                if len(self.gain_seed) == RSI_PERIOD:
+                    self.avg_gain = sum(self.gain_seed) / RSI_PERIOD
+                    self.avg_loss = sum(self.loss_seed) / RSI_PERIOD
+            else:
+                self.avg_gain += (gain - self.avg_gain) / RSI_PERIOD
+                self.avg_loss += (loss - self.avg_loss) / RSI_PERIOD
+
+        if self.atr is None:
+            self.tr_seed.append(tr)
+            if len(self.tr_seed) == ATR_PERIOD:
+                self.atr = sum(self.tr_seed) / ATR_PERIOD
+        else:
+            self.atr += (tr - self.atr) / ATR_PERIOD
+
+        for span, value in self.emas.items():
+            alpha = 2.0 / (span + 1)
+            self.emas[span] = close if value is None else alpha * close + (1 - alpha) * value
+
+        self.closes.append(close)
+        self.volumes.append(float(volume))
+        self.last_close = close
+        self.last_volume = float(volume)
+        self.count += 1
+
+    def replace_last(self, open_, high, low, close, volume):
+        if self._previous is None:
+            self.update(open_, high, low, close, volume)
+            return
+        self.__dict__.update(self._previous)
+        self.update(open_, high, low, close, volume)
+
+    def values(self):
+        indicators = {'bars': self.count, 'current_price': self.last_close, 'volume': self.last_volume}
+        closes = list(self.closes)
+        for window in SMA_WINDOWS:
+            indicators[f'SMA_{window}'] = sum(closes[-window:]) / window if len(closes) >= window else None
+        for span, value in self.emas.items():
+            indicators[f'EMA_{span}'] = value
+        if self.avg_gain is not None:
+            indicators['RSI'] = float(_rsi_from_averages(np.float64(self.avg_gain), np.float64(self.avg_loss)))
+        else:
+            indicators['RSI'] = None
+        indicators['ATR'] = self.atr
+        volumes = self.volumes
+        key = f'VOLUME_AVG_{VOLUME_WINDOW}'
+        indicators[key] = sum(volumes) / VOLUME_WINDOW if len(volumes) == VOLUME_WINDOW else None
+        return indicators
+
+
+def latest_indicators(open_, high, low, close, volume):
+    """Latest value of every indicator, computed vectorized over the history."""
+    series = compute_indicator_series(open_, high, low, close, volume)
+    indicators = {name: _as_float(values[-1]) for name, values in series.items()}
+    indicators['bars'] = len(close)
+    indicators['current_price'] = float(close[-1])
+    indicators['volume'] = float(volume[-1])
+    return indicators
+
+
+class BarHistory:
+    """Rolling OHLCV history for one symbol, keyed by bar timestamp.
+
+    Bars live in preallocated NumPy arrays twice the retention size so that
+    trimming old bars only happens once every ``max_bars`` appends.
+    """
+
+    FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, max_bars=1260):
+        self.max_bars = max_bars
+        self._capacity = max_bars * 2
+        self._data = {field: np.empty(self._capacity, dtype=np.float64) for field in self.FIELDS}
+        self._start = 0
+        self._end = 0
+        self.state = IndicatorState()
+
+    def __len__(self):
+        return self._end - self._start
+
+    def load(self, bars):
+        """Replace the history with ``bars`` (dict of field -> array) and reseed indicators."""
+        n = min(len(bars['close']), self.max_bars)
+        self._start, self._end = 0, n
+        for field in self.FIELDS:
+            self._data[field][:n] = np.asarray(bars[field], dtype=np.float64)[-n:]
+        view = self.arrays()
+        self.state = IndicatorState.from_history(view['open'], view['high'], view['low'], view['close'], view['volume'])
+
+    def add_bar(self, timestamp, open_, high, low, close, volume):
+        """Append a bar, or replace the latest one if ``timestamp`` matches it."""
+        if len(self) and timestamp == self._data['timestamp'][self._end - 1]:
+            idx = self._end - 1
+            self.state.replace_last(open_, high, low, close, volume)
+        elif len(self) and timestamp < self._data['timestamp'][self._end - 1]:
+            return
+        else:
+            if self._end == self._capacity:
+                keep = self.max_bars - 1
+                for field in self.FIELDS:
+                    self._data[field][:keep] = self._data[field][self._end - keep:self._end]
+                self._start, self._end = 0, keep
+            idx = self._end
+            self._end += 1
+            if len(self) > self.max_bars:
+                self._start += 1
+            self.state.update(open_, high, low, close, volume)
+        for field, value in zip(self.FIELDS, (timestamp, open_, high, low, close, volume)):
+            self._data[field][idx] = value
+
+    def arrays(self):
+        return {field: self._data[field][self._start:self._end] for field in self.FIELDS}
+
+    def last_bar(self):
+        if not len(self):
+            return None
+        return {field: float(self._data[field][self._end - 1]) for field in self.FIELDS}
+
+    def last_close(self):
+        return float(self._data['close'][self._end - 1]) if len(self) else None
+
+    def indicators(self):
+        return self.state.values()
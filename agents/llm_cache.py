@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import metrics
+
+
+class LLMResponseCache:
+    """Content-addressed cache of LLM responses.
+
+    Keys are a SHA-256 of the model name, temperature and fully rendered
+    prompt. Entries live in an in-memory LRU tier and, when ``cache_dir`` is
+    set, in one JSON file per key on disk so they survive across runs. Both
+    tiers honour ``ttl`` seconds.
+    """
+
+    def __init__(self, cache_dir=None, max_entries=1024, ttl=86400.0):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'expired': 0, 'writes': 0}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(model_name, temperature, prompt):
+        payload = json.dumps({'model': model_name, 'temperature': temperature, 'prompt': prompt}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _remember(self, key, response, created_at):
+        with self._lock:
+            self._memory[key] = (response, created_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, created_at = entry
+                if now - created_at < self.ttl:
+                    self._memory.move_to_end(key)
+                    self._stats['memory_hits'] += 1
+                    return response
+                del self._memory[key]
+                self._stats['expired'] += 1
+
+        if self.cache_dir:
+            try:
+                with open(self._path(key), encoding='utf-8') as f:
+                    entry = json.load(f)
+                if now - entry['created_at'] < self.ttl:
+                    self._remember(key, entry['response'], entry['created_at'])
+                    self._count('disk_hits')
+                    return entry['response']
+                self._count('expired')
+            except (OSError, ValueError, KeyError):
+                pass
+        self._count('misses')
+        return None
+
+    def put(self, key, response):
+        created_at = time.time()
+        self._remember(key, response, created_at)
+        self._count('writes')
+        if self.cache_dir:
+            path = self._path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({'response': response, 'created_at': created_at}, f)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"LLM cache write failed: {e}")
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
+
+
+class StubLLM:
+    """Offline stand-in for ChatGroq with deterministic latency.
+
+    ``responder`` maps the rendered prompt to the response text; by default
+    every prompt gets the same canned JSON approval.
+    """
+
+    DEFAULT_RESPONSE = '{"approved": true, "risk_reason": "Stub LLM approval"}'
+
+    def __init__(self, latency=0.05, responder=None, model_name='stub', temperature=0):
+        self.latency = latency
+        self.responder = responder
+        self.model_name = model_name
+        self.temperature = temperature
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self.responder(prompt) if self.responder else self.DEFAULT_RESPONSE
+
+
+class CachedLLMChain:
+    """Renders a prompt template and answers it through the response cache.
+
+    Exposes the same ``run(**kwargs)`` call as langchain's LLMChain. With
+    ``validate``, only responses it accepts are cached; a rejected response
+    is still returned, and a cached one that fails it is asked again.
+    """
+
+    def __init__(self, llm, template, cache, validate=None):
+        self.llm = llm
+        self.template = template
+        self.cache = cache
+        self.validate = validate
+        self.model_name = getattr(llm, 'model_name', type(llm).__name__)
+        self.temperature = getattr(llm, 'temperature', None)
+
+    def run(self, **kwargs):
+        prompt = self.template.format(**kwargs)
+        key = self.cache.make_key(self.model_name, self.temperature, prompt)
+        response = self.cache.get(key)
+        if response is not None and (self.validate is None or self.validate(response)):
+            return response
+        result = self.llm.invoke(prompt)
+        response = getattr(result, 'content', result)
+        if self.validate is None or self.validate(response):
+            self.cache.put(key, response)
+        else:
+            metrics.increment('llm_cache_rejected_total')
+        return response
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the process-wide LLMResponseCache configured from the environment."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMResponseCache(
+                    cache_dir=os.getenv('LLM_CACHE_DIR', '.llm_cache') or None,
+                    max_entries=int(os.getenv('LLM_CACHE_SIZE', '1024')),
+                    ttl=float(os.getenv('LLM_CACHE_TTL', '86400')),
+                )
+    return _cache
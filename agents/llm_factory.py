@@ -0,0 +1,32 @@
+import os
+
+from profiling import timed_import
+
+DEFAULT_MODEL_NAME = 'llama3-70b-8192'
+
+
+# Builders for the LLM-side objects. They import crewai and langchain only
+# when an agent first touches its llm, agent or chain attribute.
+
+def build_llm(temperature, model_name=DEFAULT_MODEL_NAME):
+    # LLM_BACKEND=stub swaps Groq for a local deterministic stand-in
+    if os.getenv('LLM_BACKEND', 'groq').lower() == 'stub':
+        from agents.llm_cache import StubLLM
+        return StubLLM(latency=float(os.getenv('STUB_LLM_LATENCY', '0.05')), model_name=f"stub:{model_name}", temperature=temperature)
+    langchain_groq = timed_import('langchain_groq')
+    return langchain_groq.ChatGroq(temperature=temperature, model_name=model_name, groq_api_key=os.getenv('GROQ_API_KEY'))
+
+
+def build_crew_agent(role, goal, backstory, llm):
+    crewai = timed_import('crewai')
+    return crewai.Agent(role=role, goal=goal, backstory=backstory, llm=llm, verbose=True)
+
+
+def build_prompt(input_variables, template):
+    prompts = timed_import('langchain.prompts')
+    return prompts.PromptTemplate(input_variables=input_variables, template=template)
+
+
+def build_chain(llm, prompt):
+    chains = timed_import('langchain.chains')
+    return chains.LLMChain(llm=llm, prompt=prompt)
@@ -1,56 +1,333 @@
 import os
-import yfinance as yf
-import finnhub
+import threading
+import time
+from functools import cached_property
 import pandas as pd
-import requests
-from crewai import Agent
-from langchain_groq import ChatGroq
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
-from sentence_transformers import SentenceTransformer
+from metrics import metrics
+from agents.llm_factory import build_chain, build_crew_agent, build_llm, build_prompt
+from agents.market_data_client import get_market_data_client
+from agents.quote_cache import QuoteCache
+from agents.indicators import BarHistory
+from bar_store import BarStore
+
+SECONDS_PER_DAY = 86400
+
+
+def _bar_day(epoch_seconds):
+    # Bars are daily; every quote within a UTC day updates the same bar
+    return float(int(epoch_seconds) - int(epoch_seconds) % SECONDS_PER_DAY)
 
 class MarketDataAgent:
-    def __init__(self, db_handler):
-        self.finnhub_client = finnhub.Client(api_key=os.getenv('FINNHUB_API_KEY'))
-        self.llm = ChatGroq(temperature=0, model_name="llama3-70b-8192", groq_api_key=os.getenv('GROQ_API_KEY'))
+    def __init__(self, db_handler, quote_ttl=None, max_cached_quotes=None, max_history_bars=None, history_period=None,
+                 bar_store=None, client=None):
         self.db_handler = db_handler
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
-        self.agent = Agent(
+        if client is not None:
+            # Any object with the MarketDataClient quote/history/history_bulk methods
+            # (history taking ``start``, history_bulk taking ``starts``)
+            self.client = client
+        if quote_ttl is None:
+            quote_ttl = float(os.getenv('QUOTE_CACHE_TTL', '15'))
+        if max_cached_quotes is None:
+            max_cached_quotes = int(os.getenv('QUOTE_CACHE_SIZE', '1024'))
+        self.quote_cache = QuoteCache(ttl=quote_ttl, max_entries=max_cached_quotes)
+        if max_history_bars is None:
+            max_history_bars = int(os.getenv('HISTORY_MAX_BARS', '1260'))
+        if history_period is None:
+            history_period = os.getenv('HISTORY_SEED_PERIOD', '1y')
+        self.max_history_bars = max_history_bars
+        self.history_period = history_period
+        self.histories = {}
+        self._history_lock = threading.Lock()
+        # Optional on-disk bar store: history is seeded from it and every bar
+        # is written through to it
+        if bar_store is None and os.getenv('BAR_STORE_DIR'):
+            bar_store = BarStore(os.getenv('BAR_STORE_DIR'), os.getenv('BAR_STORE_PARTITION', 'year'))
+        self.bar_store = bar_store
+        # Bulk-downloaded history handed from prefetch() to the yfinance fallback
+        self._prefetched = {}
+        self._prefetched_lock = threading.Lock()
+
+    # Clients and LLM objects are built on first use so that startup does not
+    # pay for crewai/langchain imports on paths that never need them.
+    @cached_property
+    def client(self):
+        return get_market_data_client()
+
+    @cached_property
+    def llm(self):
+        return build_llm(temperature=0)
+
+    @cached_property
+    def agent(self):
+        return build_crew_agent(
             role='Market Data Analyst',
             goal='Fetch and process real-time market data',
             backstory='Expert in financial data processing',
-            llm=self.llm,
-            verbose=True
+            llm=self.llm
         )
-        self.prompt = PromptTemplate(
-            input_variables=["data"],
-            template="Process this market data: {data} and provide key insights."
-        )
-        self.chain = LLMChain(llm=self.llm, prompt=self.prompt)
+
+    @cached_property
+    def prompt(self):
+        return build_prompt(["data"], "Process this market data: {data} and provide key insights.")
+
+    @cached_property
+    def chain(self):
+        return build_chain(self.llm, self.prompt)
 
     def fetch_stock_data(self, symbol):
+        # Quotes are shared across callers for quote_ttl seconds; mock data is
+        # never cached so a recovered provider is picked up on the next call.
+        with metrics.span('fetch', symbol):
+            data = self.quote_cache.get_or_fetch(symbol, lambda: self._fetch_quote(symbol))
+        return data.copy()
+
+    def get_cache_stats(self):
+        return self.quote_cache.get_stats()
+
+    def get_history(self, symbol):
+        """Return the rolling daily bar history for ``symbol`` as a DataFrame."""
+        with self._history_lock:
+            history = self.histories.get(symbol)
+            if history is None:
+                return pd.DataFrame(columns=list(BarHistory.FIELDS))
+            return pd.DataFrame({field: values.copy() for field, values in history.arrays().items()})
+
+    def get_indicators(self, symbol):
+        """Return the latest incrementally maintained indicators, or None without history."""
+        with self._history_lock:
+            history = self.histories.get(symbol)
+            if history is None or not len(history):
+                return None
+            return history.indicators()
+
+    def _history_for(self, symbol):
+        with self._history_lock:
+            history = self.histories.get(symbol)
+            if history is None:
+                history = BarHistory(self.max_history_bars)
+                self.histories[symbol] = history
+            return history
+
+    @staticmethod
+    def _frame_bars(data):
+        return {
+            'timestamp': [_bar_day(ts.timestamp()) for ts in data.index],
+            'open': data['Open'].to_numpy(),
+            'high': data['High'].to_numpy(),
+            'low': data['Low'].to_numpy(),
+            'close': data['Close'].to_numpy(),
+            'volume': data['Volume'].to_numpy(),
+        }
+
+    def _load_history(self, symbol, data):
+        history = self._history_for(symbol)
+        bars = self._frame_bars(data)
+        with self._history_lock:
+            history.load(bars)
+        if self.bar_store is not None:
+            self.bar_store.append(symbol, bars)
+
+    def _seed_from_store(self, symbol):
+        """Load the newest stored bars into memory; False if the store has none.
+
+        A store whose last bar is older than today is backfilled from that
+        bar onwards, so indicators never run across a gap.
+        """
+        stale_since = self._load_from_store(symbol)
+        if stale_since is None:
+            return False
+        if stale_since:
+            try:
+                self._backfill(symbol, self.client.history(symbol, start=stale_since))
+            except Exception as e:
+                print(f"History backfill error for {symbol}: {e}")
+        return True
+
+    def _load_from_store(self, symbol):
+        """Load the newest stored bars into memory.
+
+        Returns None if the store has none, the last stored day (epoch
+        seconds) if it is older than today, and 0 otherwise.
+        """
+        if self.bar_store is None:
+            return None
+        bars = self.bar_store.tail(symbol, self.max_history_bars)
+        if not len(bars['timestamp']):
+            return None
+        history = self._history_for(symbol)
+        with self._history_lock:
+            history.load(bars)
+        last_day = float(bars['timestamp'][-1])
+        return last_day if last_day < _bar_day(time.time()) else 0
+
+    def _backfill(self, symbol, data):
+        """Append bars fetched since the last stored day to history and the store."""
+        if data.empty:
+            return
+        bars = self._frame_bars(data)
+        history = self._history_for(symbol)
+        with self._history_lock:
+            # add_bar skips bars older than the last one and replaces a bar for the same day
+            for row in zip(bars['timestamp'], bars['open'], bars['high'], bars['low'], bars['close'], bars['volume']):
+                history.add_bar(*row)
+        self.bar_store.append(symbol, bars)
+        metrics.increment('bar_store_backfills_total')
+
+    def _add_bar(self, symbol, day, open_, high, low, close, volume):
+        history = self._history_for(symbol)
+        with self._history_lock:
+            history.add_bar(day, open_, high, low, close, volume)
+        if self.bar_store is not None:
+            self.bar_store.append_bar(symbol, day, open_, high, low, close, volume)
+
+    def _record_bar(self, symbol, timestamp, bar):
+        self._add_bar(
+            symbol, _bar_day(timestamp), bar['open'].iloc[-1], bar['high'].iloc[-1],
+            bar['low'].iloc[-1], bar['close'].iloc[-1], bar['volume'].iloc[-1]
+        )
+
+    def on_bar(self, symbol, timestamp, open_, high, low, close, volume):
+        """Apply a streamed bar to the symbol's daily history."""
+        self._add_bar(symbol, _bar_day(timestamp), open_, high, low, close, volume)
+
+    def on_tick(self, symbol, timestamp, price, size=0):
+        """Fold a streamed trade into the current daily bar."""
+        history = self._history_for(symbol)
+        day = _bar_day(timestamp)
+        with self._history_lock:
+            last = history.last_bar()
+            if last is not None and last['timestamp'] == day:
+                bar = (last['open'], max(last['high'], price), min(last['low'], price), price, last['volume'] + size)
+            else:
+                bar = (price, price, price, price, size)
+            history.add_bar(day, *bar)
+        if self.bar_store is not None:
+            self.bar_store.append_bar(symbol, day, *bar)
+
+    def get_stored_bars(self, symbol, start=None, end=None):
+        """Bars from the on-disk store as memory-mapped arrays, without loading them into RAM."""
+        if self.bar_store is None:
+            return None
+        return self.bar_store.read(symbol, start, end)
+
+    def latest_bar(self, symbol):
+        """The newest bar as a one-row quote DataFrame, or None without history."""
+        with self._history_lock:
+            history = self.histories.get(symbol)
+            bar = history.last_bar() if history is not None else None
+        if bar is None:
+            return None
+        return pd.DataFrame({field: [bar[field]] for field in ('open', 'high', 'low', 'close', 'volume')})
+
+    def last_prices(self, symbols=None):
+        """Latest close for each symbol with history, as a {symbol: price} dict."""
+        with self._history_lock:
+            if symbols is None:
+                symbols = list(self.histories)
+            prices = {}
+            for symbol in symbols:
+                history = self.histories.get(symbol)
+                price = history.last_close() if history is not None else None
+                if price is not None:
+                    prices[symbol] = price
+            return prices
+
+    def _last_volume(self, symbol):
+        with self._history_lock:
+            history = self.histories.get(symbol)
+            if history is None or not len(history):
+                return None
+            return history.state.last_volume
+
+    def _needs_seed(self, symbol):
+        with self._history_lock:
+            return self.history_period and symbol not in self.histories
+
+    def prefetch(self, symbols):
+        """Seed history for every new symbol with one bulk download.
+
+        Symbols already in memory are skipped, and symbols in the bar store
+        are loaded from it; stale ones are backfilled in the same bulk
+        download. The frames downloaded for the other symbols also serve the
+        yfinance fallback of the next quote fetch, so it does not download
+        the same bars again; they are dropped once a quote is fetched or
+        ``clear_prefetched`` is called.
+        """
+        missing = []
+        stale = {}
+        for symbol in dict.fromkeys(symbols):
+            if not self._needs_seed(symbol):
+                continue
+            stale_since = self._load_from_store(symbol)
+            if stale_since is None:
+                missing.append(symbol)
+            elif stale_since:
+                stale[symbol] = stale_since
+        if not missing and not stale:
+            return 0
+        downloaded = self.client.history_bulk(missing + list(stale), self.history_period, starts=stale)
+        for symbol, data in downloaded.items():
+            if symbol in stale:
+                self._backfill(symbol, data)
+            elif not data.empty:
+                self._load_history(symbol, data)
+                with self._prefetched_lock:
+                    self._prefetched[symbol] = data
+        return len(downloaded)
+
+    def clear_prefetched(self):
+        """Drop bulk-downloaded frames that no quote fetch used, so a later fallback never reports them as current."""
+        with self._prefetched_lock:
+            self._prefetched.clear()
+
+    def _take_prefetched(self, symbol):
+        with self._prefetched_lock:
+            return self._prefetched.pop(symbol, None)
+
+    def _seed_history(self, symbol):
+        if self._seed_from_store(symbol):
+            return
+        try:
+            data = self.client.history(symbol, self.history_period)
+            if not data.empty:
+                self._load_history(symbol, data)
+        except Exception as e:
+            print(f"History seed error for {symbol}: {e}")
+
+    def _fetch_quote(self, symbol):
         try:
             # Try Finnhub first as it's more reliable
-            quote = self.finnhub_client.quote(symbol)
+            quote = self.client.quote(symbol)
             if quote and quote.get('c', 0) > 0:
+                if self._needs_seed(symbol):
+                    self._seed_history(symbol)
+                # Finnhub quotes carry no volume; reuse the last known bar's
                 combined = pd.DataFrame({
                     'open': [quote['o']],
                     'high': [quote['h']],
                     'low': [quote['l']],
                     'close': [quote['c']],
-                    'volume': [1000000]  # Default volume
+                    'volume': [self._last_volume(symbol) or 1000000]  # Default volume
                 })
-                return combined
+                self._record_bar(symbol, quote.get('t') or time.time(), combined)
+                # The prefetched frame was only there for the fallback
+                self._take_prefetched(symbol)
+                metrics.increment('market_data_source_total', source='finnhub')
+                return combined, True
         except Exception as e:
             print(f"Finnhub error: {e}")
-        
+        metrics.increment('market_data_fallback_total', **{'from': 'finnhub', 'to': 'yfinance'})
+
         try:
-            # Fallback to yfinance
-            session = requests.Session()
-            session.headers['User-Agent'] = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36'
-            ticker = yf.Ticker(symbol, session=session)
-            data = ticker.history(period="5d")  # Get more days to ensure data
+            # Fallback to yfinance, pulling the full seed window on first sight
+            data = self._take_prefetched(symbol)
+            seed = False
+            if data is None:
+                seed = self._needs_seed(symbol) and not self._seed_from_store(symbol)
+                data = self.client.history(symbol, self.history_period if seed else "5d")
             if not data.empty:
+                if seed:
+                    self._load_history(symbol, data)
                 latest = data.iloc[-1]
                 combined = pd.DataFrame({
                     'open': [latest['Open']],
@@ -59,28 +336,32 @@ class MarketDataAgent:
                     'close': [latest['Close']],
                     'volume': [latest['Volume']]
                 })
-                return combined
+                self._record_bar(symbol, data.index[-1].timestamp(), combined)
+                metrics.increment('market_data_source_total', source='yfinance')
+                return combined, True
         except Exception as e:
             print(f"YFinance error: {e}")
-        
+        metrics.increment('market_data_fallback_total', **{'from': 'yfinance', 'to': 'mock'})
+
         # Fallback with mock data for demo purposes
         print(f"Using mock data for {symbol}")
+        metrics.increment('market_data_source_total', source='mock')
         return pd.DataFrame({
             'open': [150.0],
             'high': [155.0],
             'low': [148.0],
             'close': [152.5],
             'volume': [1000000]
-        })
+        }), False
 
-    def process_data(self, symbol):
-        data = self.fetch_stock_data(symbol)
+    def process_data(self, symbol, data=None):
+        if data is None:
+            data = self.fetch_stock_data(symbol)
         # Simplified insights to reduce token usage
         price = data['close'].iloc[0]
         volume = data['volume'].iloc[0]
         insights = f"Current price: ${price:.2f}, Volume: {volume:,}"
         
         if self.db_handler:
-            embedding = self.embedder.encode(insights)
-            self.db_handler.store_memory('market_data', embedding, {'symbol': symbol, 'insights': insights})
+            self.db_handler.submit_memory('market_data', insights, {'symbol': symbol, 'insights': insights})
         return insights
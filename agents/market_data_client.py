@@ -0,0 +1,311 @@
+import http.client
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlencode, urlsplit
+
+import pandas as pd
+
+from metrics import metrics
+
+FINNHUB_URL = 'https://finnhub.io/api/v1'
+YAHOO_URL = 'https://query1.finance.yahoo.com'
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36'
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+MAX_BACKOFF_SECONDS = 10.0
+
+
+class HTTPError(Exception):
+    def __init__(self, status, path, retry_after=None):
+        super().__init__(f"HTTP {status} for {path}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, bursts of up to ``capacity``.
+
+    ``acquire`` reserves a token and sleeps until it would have been
+    refilled, so concurrent callers are spaced out at ``rate`` in arrival
+    order. A rate of 0 or less disables limiting.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.clock = clock
+        self._tokens = float(self.capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take ``tokens`` if they are available now; never waits."""
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            self._refill()
+            if self._tokens < tokens:
+                return False
+            self._tokens -= tokens
+            return True
+
+    def acquire(self, tokens=1):
+        """Take ``tokens``, waiting as long as needed; returns the seconds waited."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class HTTPPool:
+    """Keep-alive connections to one host, shared by every thread.
+
+    At most ``maxsize`` requests are in flight at once. A connection goes
+    back to the pool after each response unless the server closes it. A
+    reused connection that turns out to have been dropped by the server is
+    replaced and the request is sent once more.
+    """
+
+    def __init__(self, base_url, maxsize=8, timeout=10.0):
+        parts = urlsplit(base_url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(maxsize)
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'connections_opened': 0, 'reused': 0}
+
+    def _checkout(self):
+        with self._lock:
+            self._stats['requests'] += 1
+            if self._idle:
+                self._stats['reused'] += 1
+                return self._idle.pop(), True
+            self._stats['connections_opened'] += 1
+        return self.connection_class(self.host, self.port, timeout=self.timeout), False
+
+    def get(self, path, params=None, headers=None):
+        """GET ``path`` below the base URL; returns (status, headers, body)."""
+        url = self.prefix + path + ('?' + urlencode(params) if params else '')
+        with self._slots:
+            while True:
+                conn, reused = self._checkout()
+                try:
+                    conn.request('GET', url, headers=headers or {})
+                    response = conn.getresponse()
+                    body = response.read()
+                except (http.client.HTTPException, OSError):
+                    conn.close()
+                    if reused:
+                        continue
+                    raise
+                break
+            if response.will_close:
+                conn.close()
+            else:
+                with self._lock:
+                    self._idle.append(conn)
+        return response.status, response.headers, body
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle_connections'] = len(self._idle)
+        return stats
+
+
+def _retry_after(headers):
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _chart_frame(payload):
+    """Convert a Yahoo chart response to a yfinance-style OHLCV DataFrame."""
+    result = (payload.get('chart') or {}).get('result') or []
+    if not result or not result[0].get('timestamp'):
+        return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+    bars = result[0]['indicators']['quote'][0]
+    frame = pd.DataFrame({
+        'Open': bars['open'],
+        'High': bars['high'],
+        'Low': bars['low'],
+        'Close': bars['close'],
+        'Volume': bars['volume'],
+    }, index=pd.to_datetime(result[0]['timestamp'], unit='s', utc=True), dtype=float)
+    # Yahoo pads halted sessions with nulls
+    return frame.dropna(subset=['Close'])
+
+
+class MarketDataClient:
+    """Shared Finnhub and Yahoo Finance client with pooled connections.
+
+    Each provider has its own connection pool and token bucket, so every
+    agent in the process stays inside one quota per API key. Timeouts,
+    connection errors, 429s and 5xx responses are retried up to
+    ``max_retries`` times with full-jitter exponential backoff, honouring
+    ``Retry-After`` when the server sends one; the last error is raised so
+    callers can fall back to another source.
+
+    ``quote`` and ``company_news`` mirror ``finnhub.Client``; ``history``
+    returns the same OHLCV frame as ``yfinance.Ticker.history``.
+    """
+
+    def __init__(self, finnhub_key=None, finnhub_url=None, yahoo_url=None, finnhub_rate=None, finnhub_burst=None,
+                 yahoo_rate=None, yahoo_burst=None, max_retries=None, backoff=None, pool_size=None, timeout=None):
+        self.finnhub_key = finnhub_key or os.getenv('FINNHUB_API_KEY')
+        if max_retries is None:
+            max_retries = int(os.getenv('MARKET_DATA_RETRIES', '3'))
+        if backoff is None:
+            backoff = float(os.getenv('MARKET_DATA_BACKOFF', '0.25'))
+        if pool_size is None:
+            pool_size = int(os.getenv('MARKET_DATA_POOL_SIZE', '8'))
+        if timeout is None:
+            timeout = float(os.getenv('MARKET_DATA_TIMEOUT', '10'))
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        # Finnhub's free tier allows 60 calls/minute and at most 30/second
+        self.providers = {
+            'finnhub': (
+                HTTPPool(finnhub_url or os.getenv('FINNHUB_BASE_URL', FINNHUB_URL), pool_size, timeout),
+                TokenBucket(finnhub_rate if finnhub_rate is not None else float(os.getenv('FINNHUB_RATE_LIMIT', '1')),
+                            finnhub_burst if finnhub_burst is not None else float(os.getenv('FINNHUB_BURST', '30'))),
+            ),
+            'yahoo': (
+                HTTPPool(yahoo_url or os.getenv('YAHOO_BASE_URL', YAHOO_URL), pool_size, timeout),
+                TokenBucket(yahoo_rate if yahoo_rate is not None else float(os.getenv('YAHOO_RATE_LIMIT', '5')),
+                            yahoo_burst if yahoo_burst is not None else float(os.getenv('YAHOO_BURST', '10'))),
+            ),
+        }
+        self._lock = threading.Lock()
+        self._stats = {name: {'calls': 0, 'retries': 0, 'errors': 0, 'throttled_seconds': 0.0} for name in self.providers}
+
+    def _count(self, provider, key, amount=1):
+        with self._lock:
+            self._stats[provider][key] += amount
+
+    def _get_json(self, provider, path, params=None, headers=None):
+        pool, bucket = self.providers[provider]
+        self._count(provider, 'calls')
+        for attempt in range(self.max_retries + 1):
+            waited = bucket.acquire()
+            if waited:
+                self._count(provider, 'throttled_seconds', waited)
+            retry_after = None
+            try:
+                status, response_headers, body = pool.get(path, params, headers)
+                if status == 200:
+                    return json.loads(body)
+                error = HTTPError(status, path, _retry_after(response_headers))
+                retry_after = error.retry_after
+                if status not in RETRY_STATUSES:
+                    break
+            except (http.client.HTTPException, OSError) as e:
+                error = e
+            if attempt == self.max_retries:
+                break
+            delay = random.uniform(0, min(MAX_BACKOFF_SECONDS, self.backoff * 2 ** attempt))
+            if retry_after is not None:
+                delay = max(delay, min(MAX_BACKOFF_SECONDS, retry_after))
+            self._count(provider, 'retries')
+            metrics.increment('market_data_retries_total', provider=provider)
+            time.sleep(delay)
+        self._count(provider, 'errors')
+        metrics.increment('market_data_errors_total', provider=provider)
+        raise error
+
+    def _finnhub(self, path, params):
+        headers = {'X-Finnhub-Token': self.finnhub_key} if self.finnhub_key else None
+        return self._get_json('finnhub', path, params, headers)
+
+    def quote(self, symbol):
+        return self._finnhub('/quote', {'symbol': symbol})
+
+    def company_news(self, symbol, _from, to):
+        return self._finnhub('/company-news', {'symbol': symbol, 'from': _from, 'to': to})
+
+    def history(self, symbol, period='1mo', start=None):
+        """Daily bars over ``period``, or from ``start`` (epoch seconds) until now when it is given."""
+        if start is not None:
+            params = {'period1': int(start), 'period2': int(time.time()), 'interval': '1d'}
+        else:
+            params = {'range': period, 'interval': '1d'}
+        payload = self._get_json('yahoo', f'/v8/finance/chart/{quote(symbol)}', params, {'User-Agent': USER_AGENT})
+        return _chart_frame(payload)
+
+    def _fetch_many(self, fetch, symbols, label):
+        def fetch_one(symbol):
+            try:
+                return symbol, fetch(symbol)
+            except Exception as e:
+                print(f"{label} error for {symbol}: {e}")
+                return symbol, None
+
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.pool_size, len(symbols))) as executor:
+            return {symbol: value for symbol, value in executor.map(fetch_one, symbols) if value is not None}
+
+    def quotes(self, symbols):
+        """Finnhub quotes for many symbols over the pooled connections; failed symbols are left out."""
+        return self._fetch_many(self.quote, symbols, 'Quote')
+
+    def history_bulk(self, symbols, period='1mo', starts=None):
+        """``history`` for many symbols at once, as {symbol: DataFrame}; failed symbols are left out.
+
+        Symbols in ``starts``, a {symbol: epoch seconds} dict, are fetched
+        from that time onwards instead of over ``period``.
+        """
+        starts = starts or {}
+        return self._fetch_many(lambda symbol: self.history(symbol, period, starts.get(symbol)), symbols, 'History')
+
+    def close(self):
+        for pool, _ in self.providers.values():
+            pool.close()
+
+    def get_stats(self):
+        with self._lock:
+            stats = {name: dict(provider_stats) for name, provider_stats in self._stats.items()}
+        for name, (pool, _) in self.providers.items():
+            stats[name].update(pool.get_stats())
+            stats[name]['throttled_seconds'] = round(stats[name]['throttled_seconds'], 3)
+        return stats
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_market_data_client():
+    """Return the shared MarketDataClient, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MarketDataClient()
+    return _client
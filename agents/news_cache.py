@@ -0,0 +1,105 @@
+import hashlib
+import threading
+from collections import OrderedDict, deque
+
+SECONDS_PER_DAY = 86400
+
+
+def article_key(item):
+    """Stable identity for a news item: its provider id, else a hash of the headline."""
+    if item.get('id') is not None:
+        return f"id:{item['id']}"
+    headline = (item.get('headline') or '').strip().lower()
+    return 'h:' + hashlib.sha1(headline.encode('utf-8')).hexdigest()
+
+
+class ArticleSentimentCache:
+    """Bounded LRU of article key -> sentiment, shared across symbols."""
+
+    def __init__(self, max_entries=50000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            sentiment = self._entries.get(key)
+            if sentiment is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return sentiment
+
+    def put(self, key, sentiment):
+        with self._lock:
+            self._entries[key] = sentiment
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class SymbolNewsState:
+    """Sliding window of scored articles for one symbol.
+
+    Tracks the newest article time seen (the high-water mark), which keys
+    are already ingested, and running per-label sums so the aggregate
+    sentiment is updated as articles enter and leave the window rather
+    than recomputed.
+    """
+
+    def __init__(self, max_articles=100, window_days=30):
+        self.max_articles = max_articles
+        self.window_seconds = window_days * SECONDS_PER_DAY
+        self.high_water = None
+        self.articles = deque()
+        self.seen = OrderedDict()
+        self.sums = {'positive': 0.0, 'negative': 0.0, 'neutral': 0.0}
+        self.counts = {'positive': 0, 'negative': 0, 'neutral': 0}
+
+    def is_new(self, key, timestamp):
+        if key in self.seen:
+            return False
+        # Finnhub filters by date only, so the high-water day is re-fetched;
+        # anything older than that day was either seen or has aged out
+        return self.high_water is None or timestamp >= self.high_water - SECONDS_PER_DAY
+
+    def add(self, key, timestamp, sentiment):
+        label = sentiment['sentiment']
+        self.articles.append((timestamp, key, label, sentiment['score']))
+        self.sums[label] += sentiment['score']
+        self.counts[label] += 1
+        self.seen[key] = timestamp
+        if self.high_water is None or timestamp > self.high_water:
+            self.high_water = timestamp
+
+    def evict(self, now):
+        cutoff = now - self.window_seconds
+        while self.articles and (len(self.articles) > self.max_articles or self.articles[0][0] < cutoff):
+            _, _, label, score = self.articles.popleft()
+            self.sums[label] -= score
+            self.counts[label] -= 1
+        # Keys only need remembering while is_new could still accept them
+        if self.high_water is not None:
+            horizon = self.high_water - SECONDS_PER_DAY
+            stale = [key for key, timestamp in self.seen.items() if timestamp < horizon]
+            for key in stale:
+                del self.seen[key]
+
+    def aggregate(self):
+        """Same rule as SentimentScorer.aggregate, read off the running sums."""
+        positive, negative = self.counts['positive'], self.counts['negative']
+        if positive and positive >= negative:
+            return {'sentiment': 'positive', 'score': self.sums['positive'] / positive}
+        if negative and negative > positive:
+            return {'sentiment': 'negative', 'score': self.sums['negative'] / negative}
+        return {'sentiment': 'neutral', 'score': 0.5}
+
+    def __len__(self):
+        return len(self.articles)
@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class QuoteCache:
+    """Bounded TTL cache for quotes with request coalescing.
+
+    ``get_or_fetch`` returns a cached value while it is fresh. On a miss only
+    one caller runs the fetch for a given key; concurrent callers for the same
+    key wait for that fetch and share its result.
+    """
+
+    def __init__(self, ttl=15.0, max_entries=1024, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'fetches': 0,
+            'evictions': 0,
+            'expirations': 0,
+        }
+
+    def get_or_fetch(self, key, fetch):
+        """Return the value for ``key``, calling ``fetch()`` on a miss.
+
+        ``fetch`` returns ``(value, cacheable)``; values with ``cacheable``
+        false are handed to waiting callers but not stored.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if self.clock() < expires_at:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return value
+                del self._entries[key]
+                self._stats['expirations'] += 1
+
+            self._stats['misses'] += 1
+            waiter = self._in_flight.get(key)
+            if waiter is None:
+                waiter = {'event': threading.Event(), 'value': None, 'error': None}
+                self._in_flight[key] = waiter
+                is_owner = True
+            else:
+                self._stats['coalesced'] += 1
+                is_owner = False
+
+        if not is_owner:
+            waiter['event'].wait()
+            if waiter['error'] is not None:
+                raise waiter['error']
+            return waiter['value']
+
+        try:
+            with self._lock:
+                self._stats['fetches'] += 1
+            value, cacheable = fetch()
+            waiter['value'] = value
+            if cacheable and self.ttl > 0:
+                self._store(key, value)
+            return value
+        except Exception as e:
+            waiter['error'] = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            waiter['event'].set()
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, self.clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
@@ -1,69 +1,214 @@
-import os
 import json
-from crewai import Agent
-from langchain_groq import ChatGroq
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
-from sentence_transformers import SentenceTransformer
+import os
+import numpy as np
+from functools import cached_property
+from agents.llm_factory import build_crew_agent, build_llm
+from agents.llm_cache import CachedLLMChain, get_response_cache
+from metrics import metrics
+from portfolio_risk import REASONS, STOP_LOSS, PortfolioRiskEngine
+
+RISK_PROMPT_TEMPLATE = "Evaluate risk for strategy: {strategy}. Current portfolio: {current_portfolio}, available capital: {capital}. Apply rules: stop-loss 5% below entry, max 10% capital exposure, diversify across sectors. Output JSON with 'approved' (bool), 'adjusted_strategy', 'risk_reason'."
+
+def _parse_screen(response, strategy):
+    """The risk_data dict in an LLM response; raises if it is not usable."""
+    risk_data = json.loads(response)
+    adjusted_strategy = risk_data.get('adjusted_strategy')
+    if not isinstance(adjusted_strategy, dict):
+        adjusted_strategy = strategy
+    # The LLM may answer "10" or 10.0; anything int() can't take falls back to the rules
+    risk_data['adjusted_strategy'] = dict(adjusted_strategy, quantity=int(float(adjusted_strategy.get('quantity', 0))))
+    return risk_data
+
+
+def _usable_response(response):
+    try:
+        _parse_screen(response, {})
+    except Exception:
+        return False
+    return True
+
+
+def _signed_quantity(strategy):
+    action = strategy.get('action')
+    quantity = strategy.get('quantity', 0)
+    return quantity if action == 'buy' else -quantity if action == 'sell' else 0
 
 class RiskManagementAgent:
-    def __init__(self, db_handler):
-        self.llm = ChatGroq(temperature=0.3, model_name="llama3-70b-8192", groq_api_key=os.getenv('GROQ_API_KEY'))
+    def __init__(self, db_handler, response_cache=None, risk_engine=None):
         self.db_handler = db_handler
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
-        self.agent = Agent(
+        self.response_cache = response_cache or get_response_cache()
+        if risk_engine is not None:
+            self.risk_engine = risk_engine
+
+    @cached_property
+    def risk_engine(self):
+        return PortfolioRiskEngine(
+            max_position_pct=float(os.getenv('RISK_MAX_POSITION_PCT', '0.10')),
+            max_sector_pct=float(os.getenv('RISK_MAX_SECTOR_PCT', '0.25')),
+            max_gross_pct=float(os.getenv('RISK_MAX_GROSS_PCT', '1.0')),
+            stop_loss_pct=float(os.getenv('RISK_STOP_LOSS_PCT', '0.05')),
+        )
+
+    @cached_property
+    def llm(self):
+        return build_llm(temperature=0.3)
+
+    @cached_property
+    def agent(self):
+        return build_crew_agent(
             role='Risk Manager',
             goal='Evaluate and manage trading risks',
             backstory='Expert in risk assessment',
-            llm=self.llm,
-            verbose=True
-        )
-        self.prompt = PromptTemplate(
-            input_variables=["strategy", "current_portfolio", "capital"],
-            template="Evaluate risk for strategy: {strategy}. Current portfolio: {current_portfolio}, available capital: {capital}. Apply rules: stop-loss 5% below entry, max 10% capital exposure, diversify across sectors. Output JSON with 'approved' (bool), 'adjusted_strategy', 'risk_reason'."
+            llm=self.llm
         )
-        self.chain = LLMChain(llm=self.llm, prompt=self.prompt)
 
-    def evaluate_risk(self, symbol, strategy, current_portfolio, capital=100000):
+    @cached_property
+    def chain(self):
+        # Risk prompts are built from a handful of fields and repeat across
+        # symbols and runs, so responses are served from the shared cache.
+        # Answers _screen could not parse are not cached, or they would be
+        # replayed until LLM_CACHE_TTL expires.
+        return CachedLLMChain(self.llm, RISK_PROMPT_TEMPLATE, self.response_cache, validate=_usable_response)
+
+    def _sync_engine(self, current_portfolio, capital, prices):
+        engine = self.risk_engine
+        engine.capital = capital
+        engine.sync_positions(current_portfolio)
+        if prices:
+            engine.update_prices(prices)
+        return engine
+
+    def _screen(self, symbol, strategy, current_portfolio, capital):
+        """The LLM's (or the rule-based fallback's) decision, before portfolio limits."""
+        # Simplified risk evaluation to reduce token usage
+        portfolio_str = f"Portfolio size: {len(current_portfolio)} positions"
+        strategy_summary = f"Action: {strategy.get('action', 'hold')}, Quantity: {strategy.get('quantity', 0)}"
+
+        risk_eval = self.chain.run(
+            strategy=strategy_summary,
+            current_portfolio=portfolio_str,
+            capital=f"${capital:,}"
+        )
         try:
-            # Simplified risk evaluation to reduce token usage
-            portfolio_str = f"Portfolio size: {len(current_portfolio)} positions"
-            strategy_summary = f"Action: {strategy.get('action', 'hold')}, Quantity: {strategy.get('quantity', 0)}"
-            
-            risk_eval = self.chain.run(
-                strategy=strategy_summary, 
-                current_portfolio=portfolio_str, 
-                capital=f"${capital:,}"
-            )
+            risk_data = _parse_screen(risk_eval, strategy)
+        except:
+            # Fallback risk evaluation with simple rules
+            metrics.increment('llm_json_parse_failures_total', agent='risk')
+            action = strategy.get('action', 'hold')
+
+            if action == 'hold':
+                risk_data = {'approved': True, 'adjusted_strategy': strategy, 'risk_reason': 'Hold position is safe'}
+            elif action in ['buy', 'sell']:
+                # Sized by the portfolio limits afterwards
+                risk_data = {'approved': True, 'adjusted_strategy': strategy, 'risk_reason': 'Risk within acceptable limits'}
+            else:
+                risk_data = {'approved': False, 'adjusted_strategy': strategy, 'risk_reason': 'Unknown action type'}
+        return risk_data
+
+    def evaluate_risk(self, symbol, strategy, current_portfolio, capital=100000, price=None, reserve=False):
+        """Approve, resize or reject one strategy.
+
+        The LLM (or the rule-based fallback) decides first; approved orders
+        are then held to the portfolio limits of ``risk_engine`` at ``price``
+        or the last price it has seen for ``symbol``. With ``reserve`` an
+        approved order is reserved in the engine, so later calls count it
+        until its fills arrive; only reserve orders whose fills will reach
+        ``risk_engine.apply_fills``, and ``release`` any that are not sent.
+        """
+        with metrics.span('risk', symbol):
             try:
-                risk_data = json.loads(risk_eval)
-            except:
-                # Fallback risk evaluation with simple rules
-                action = strategy.get('action', 'hold')
-                quantity = strategy.get('quantity', 0)
-                
-                if action == 'hold':
-                    risk_data = {'approved': True, 'adjusted_strategy': strategy, 'risk_reason': 'Hold position is safe'}
-                elif action in ['buy', 'sell']:
-                    # Simple risk check: limit to 10% of capital
-                    max_quantity = int(capital * 0.1 / 200)  # Assuming ~$200 per share
-                    if quantity > max_quantity:
-                        adjusted_strategy = strategy.copy()
-                        adjusted_strategy['quantity'] = max_quantity
-                        risk_data = {
-                            'approved': True, 
-                            'adjusted_strategy': adjusted_strategy, 
-                            'risk_reason': f'Quantity adjusted from {quantity} to {max_quantity} for risk management'
-                        }
-                    else:
-                        risk_data = {'approved': True, 'adjusted_strategy': strategy, 'risk_reason': 'Risk within acceptable limits'}
-                else:
-                    risk_data = {'approved': False, 'adjusted_strategy': strategy, 'risk_reason': 'Unknown action type'}
-        except Exception as e:
-            print(f"Risk evaluation error: {e}")
-            risk_data = {'approved': False, 'adjusted_strategy': strategy, 'risk_reason': 'Error in risk evaluation'}
-        
+                engine = self._sync_engine(current_portfolio, capital, {symbol: price} if price is not None else None)
+                risk_data = self._apply_limits(engine, symbol, self._screen(symbol, strategy, current_portfolio, capital))
+                if reserve:
+                    self._reserve(engine, {symbol: risk_data})
+            except Exception as e:
+                print(f"Risk evaluation error: {e}")
+                metrics.increment('risk_errors_total')
+                risk_data = {'approved': False, 'adjusted_strategy': strategy, 'risk_reason': 'Error in risk evaluation'}
+
         if self.db_handler:
-            embedding = self.embedder.encode(str(risk_data))
-            self.db_handler.store_memory('risk', embedding, {'symbol': symbol, 'risk_eval': risk_data})
-        return risk_data
\ No newline at end of file
+            self.db_handler.submit_memory('risk', str(risk_data), {'symbol': symbol, 'risk_eval': risk_data})
+        return risk_data
+
+    @staticmethod
+    def _reserve(engine, risk_results):
+        approved = {symbol: _signed_quantity(risk_data['adjusted_strategy'])
+                    for symbol, risk_data in risk_results.items() if risk_data.get('approved')}
+        approved = {symbol: quantity for symbol, quantity in approved.items() if quantity}
+        if approved:
+            engine.reserve(list(approved), list(approved.values()))
+
+    def release(self, symbol, strategy):
+        """Give back the room reserved for an approved order that was not placed."""
+        quantity = _signed_quantity(strategy)
+        if quantity:
+            self.risk_engine.release([symbol], [quantity])
+
+    def _apply_limits(self, engine, symbol, risk_data):
+        strategy = risk_data['adjusted_strategy']
+        result = engine.evaluate([symbol], [_signed_quantity(strategy)])
+        return self._risk_result(engine, symbol, strategy, result, 0, risk_data)
+
+    def _risk_result(self, engine, symbol, strategy, result, i, risk_data=None):
+        """Turn row ``i`` of an engine result into a risk_data dict.
+
+        A stopped-out position is closed whatever was proposed; otherwise the
+        proposal keeps its decision with the quantity the limits allow.
+        """
+        if result['stopped'][i]:
+            position = engine.position(symbol)
+            exit_quantity = -position
+            if _signed_quantity(strategy) * np.sign(exit_quantity) < abs(exit_quantity):
+                exit_strategy = {'action': 'sell' if position > 0 else 'buy', 'quantity': int(abs(position)),
+                                 'reason': f"Stop-loss {engine.stop_loss_pct:.0%} against entry"}
+                return {'approved': True, 'adjusted_strategy': exit_strategy, 'risk_reason': REASONS[STOP_LOSS]}
+        if risk_data is not None and not risk_data.get('approved'):
+            return risk_data
+        if strategy.get('action') not in ('buy', 'sell'):
+            return risk_data or {'approved': True, 'adjusted_strategy': strategy, 'risk_reason': 'Hold position is safe'}
+        reason = int(result['reason'][i])
+        if not result['approved'][i]:
+            return {'approved': False, 'adjusted_strategy': strategy, 'risk_reason': REASONS[reason]}
+        requested = strategy.get('quantity', 0)
+        approved_quantity = int(abs(result['quantity'][i]))
+        if approved_quantity != requested:
+            return {'approved': True, 'adjusted_strategy': dict(strategy, quantity=approved_quantity),
+                    'risk_reason': f'Quantity adjusted from {requested} to {approved_quantity}: {REASONS[reason]}'}
+        return risk_data or {'approved': True, 'adjusted_strategy': strategy, 'risk_reason': REASONS[reason]}
+
+    def evaluate_risk_batch(self, strategies, current_portfolio, capital=100000, prices=None, screen=False):
+        """Check {symbol: strategy} against the portfolio limits in one vectorized pass.
+
+        ``prices`` is a {symbol: price} dict such as
+        ``MarketDataAgent.last_prices()``. Orders compete for exposure room in
+        the order given. With ``screen`` each strategy first goes through the
+        LLM as in ``evaluate_risk``, rejected ones take no room, and every
+        decision is stored as a memory; otherwise no LLM is consulted.
+        Returns {symbol: risk_data} like ``evaluate_risk``.
+        """
+        screened = {}
+        if screen:
+            for symbol, strategy in strategies.items():
+                with metrics.span('risk', symbol):
+                    try:
+                        screened[symbol] = self._screen(symbol, strategy, current_portfolio, capital)
+                    except Exception as e:
+                        print(f"Risk evaluation error: {e}")
+                        metrics.increment('risk_errors_total')
+                        screened[symbol] = {'approved': False, 'adjusted_strategy': strategy,
+                                            'risk_reason': 'Error in risk evaluation'}
+        with metrics.span('risk_batch'):
+            engine = self._sync_engine(current_portfolio, capital, prices)
+            proposals = {symbol: screened[symbol]['adjusted_strategy'] if symbol in screened else strategy
+                         for symbol, strategy in strategies.items()}
+            quantities = [_signed_quantity(proposals[symbol]) if screened.get(symbol, {}).get('approved', True) else 0
+                          for symbol in strategies]
+            result = engine.evaluate(list(strategies), quantities)
+            results = {
+                symbol: self._risk_result(engine, symbol, proposals[symbol], result, i, screened.get(symbol))
+                for i, symbol in enumerate(strategies)
+            }
+        if screen and self.db_handler:
+            for symbol, risk_data in results.items():
+                self.db_handler.submit_memory('risk', str(risk_data), {'symbol': symbol, 'risk_eval': risk_data})
+        return results
@@ -1,52 +1,161 @@
 import os
-import finnhub
-from crewai import Agent
-from langchain_groq import ChatGroq
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
-from sentence_transformers import SentenceTransformer
+import threading
+import time
+from functools import cached_property
+from metrics import metrics
+from agents.market_data_client import get_market_data_client
+from agents.llm_factory import build_chain, build_crew_agent, build_llm, build_prompt
+from agents.sentiment_scorer import NEUTRAL, SentimentScorer
+from agents.news_cache import ArticleSentimentCache, SymbolNewsState, article_key
 import json
 
 class SentimentAnalysisAgent:
-    def __init__(self, db_handler):
-        self.finnhub_client = finnhub.Client(api_key=os.getenv('FINNHUB_API_KEY'))
-        self.llm = ChatGroq(temperature=0.5, model_name="llama3-70b-8192", groq_api_key=os.getenv('GROQ_API_KEY'))
+    def __init__(self, db_handler, finnhub_client=None, max_articles=None, window_days=None):
         self.db_handler = db_handler
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
-        self.agent = Agent(
+        self.scorer = SentimentScorer()
+        if finnhub_client is not None:
+            # Any object with a finnhub-style company_news(symbol, _from, to)
+            self.finnhub_client = finnhub_client
+        self.max_articles = max_articles or int(os.getenv('NEWS_WINDOW_SIZE', '100'))
+        self.window_days = window_days or int(os.getenv('NEWS_WINDOW_DAYS', '30'))
+        self.article_cache = ArticleSentimentCache(int(os.getenv('NEWS_SENTIMENT_CACHE_SIZE', '50000')))
+        self._news_states = {}
+        self._news_lock = threading.Lock()
+
+    @cached_property
+    def finnhub_client(self):
+        # Shared with MarketDataAgent so both stay inside one Finnhub quota
+        return get_market_data_client()
+
+    @cached_property
+    def llm(self):
+        return build_llm(temperature=0.5)
+
+    @cached_property
+    def agent(self):
+        return build_crew_agent(
             role='Sentiment Analyst',
             goal='Analyze market sentiment from news',
             backstory='Expert in sentiment analysis',
-            llm=self.llm,
-            verbose=True
+            llm=self.llm
         )
-        self.prompt = PromptTemplate(
-            input_variables=["news"],
-            template="Analyze the sentiment of this news: {news}. Output as JSON with 'sentiment' (positive/negative/neutral) and 'score' (0-1)."
+
+    @cached_property
+    def prompt(self):
+        return build_prompt(
+            ["news"],
+            "Analyze the sentiment of this news: {news}. Output as JSON with 'sentiment' (positive/negative/neutral) and 'score' (0-1)."
         )
-        self.chain = LLMChain(llm=self.llm, prompt=self.prompt)
+
+    @cached_property
+    def chain(self):
+        return build_chain(self.llm, self.prompt)
+
+    def _news_state(self, symbol):
+        with self._news_lock:
+            state = self._news_states.get(symbol)
+            if state is None:
+                state = self._news_states[symbol] = SymbolNewsState(self.max_articles, self.window_days)
+            return state
 
     def fetch_news(self, symbol):
+        """Fetch articles newer than the symbol's high-water mark.
+
+        Returns a list of ``{'key', 'datetime', 'text'}`` dicts for articles
+        not ingested yet, oldest first.
+        """
         try:
-            # Use recent dates for news
             from datetime import datetime, timedelta
+            state = self._news_state(symbol)
             end_date = datetime.now()
-            start_date = end_date - timedelta(days=30)
-            
-            news = self.finnhub_client.company_news(
-                symbol, 
-                _from=start_date.strftime('%Y-%m-%d'), 
-                to=end_date.strftime('%Y-%m-%d')
-            )
-            return [item['headline'] + ' ' + (item.get('summary', '') or '') for item in news[:5]]
+            with self._news_lock:
+                high_water = state.high_water
+            if high_water is None:
+                start_date = end_date - timedelta(days=self.window_days)
+            else:
+                start_date = datetime.fromtimestamp(high_water)
+
+            with metrics.span('fetch_news', symbol):
+                news = self.finnhub_client.company_news(
+                    symbol,
+                    _from=start_date.strftime('%Y-%m-%d'),
+                    to=end_date.strftime('%Y-%m-%d')
+                )
+            items = []
+            keys = set()
+            # Undated articles are stamped with the fetch time, not the epoch,
+            # so they are not evicted from the window as soon as they arrive
+            fetched_at = time.time()
+            with self._news_lock:
+                for item in news:
+                    key = article_key(item)
+                    timestamp = item.get('datetime') or fetched_at
+                    if key in keys or not state.is_new(key, timestamp):
+                        continue
+                    keys.add(key)
+                    items.append({'key': key, 'datetime': timestamp,
+                                  'text': item['headline'] + ' ' + (item.get('summary', '') or '')})
+            items.sort(key=lambda item: item['datetime'])
+            return items
         except Exception as e:
             print(f"Error fetching news: {e}")
+            metrics.increment('news_fetch_errors_total')
             return []
 
-    def analyze_sentiment(self, symbol):
-        try:
+    def analyze_sentiment(self, symbol, news=None):
+        if news is None:
             news = self.fetch_news(symbol)
-            if not news:
+        return self.analyze_sentiment_batch({symbol: news})[symbol]
+
+    def _score_new_articles(self, items):
+        """Sentiment for each item, scoring only articles not already cached."""
+        sentiments = [self.article_cache.get(item['key']) for item in items]
+        missing = [i for i, sentiment in enumerate(sentiments) if sentiment is None]
+        if missing:
+            scores = self.scorer.score_articles([items[i]['text'] for i in missing])
+            for i, sentiment in zip(missing, scores):
+                self.article_cache.put(items[i]['key'], sentiment)
+                sentiments[i] = sentiment
+        return sentiments
+
+    def analyze_sentiment_batch(self, news_by_symbol):
+        """Ingest new articles for many symbols and return updated aggregates.
+
+        ``news_by_symbol`` maps symbol -> items from ``fetch_news`` (plain
+        strings are accepted and keyed by text hash). Only articles the
+        symbol has not seen are added to its window; the aggregate is kept
+        up to date from running sums. Returns symbol -> ``{'sentiment', 'score'}``.
+        """
+        now = time.time()
+        batch = []
+        for symbol, news in news_by_symbol.items():
+            for item in news or []:
+                if isinstance(item, str):
+                    item = {'key': article_key({'headline': item}), 'datetime': now, 'text': item}
+                elif not item.get('datetime'):
+                    item = {**item, 'datetime': now}
+                batch.append((symbol, item))
+
+        try:
+            with metrics.span('sentiment'):
+                sentiments = self._score_new_articles([item for _, item in batch])
+        except Exception as e:
+            print(f"Sentiment analysis error: {e}")
+            sentiments = []
+
+        with self._news_lock:
+            for (symbol, item), sentiment in zip(batch, sentiments):
+                state = self._news_states.setdefault(symbol, SymbolNewsState(self.max_articles, self.window_days))
+                if state.is_new(item['key'], item['datetime']):
+                    state.add(item['key'], item['datetime'], sentiment)
+
+        results = {}
+        for symbol, news in news_by_symbol.items():
+            state = self._news_state(symbol)
+            with self._news_lock:
+                state.evict(now)
+                avg_sentiment = state.aggregate() if len(state) else None
+            if avg_sentiment is None:
                 # Generate varied sentiment based on symbol characteristics for demo
                 import random
                 sentiments = ['positive', 'negative', 'neutral']
@@ -54,56 +163,31 @@ class SentimentAnalysisAgent:
                 score = random.uniform(0.3, 0.8)
                 avg_sentiment = {'sentiment': sentiment_type, 'score': score}
                 print(f"No news found, using simulated sentiment for demo: {avg_sentiment}")
-            else:
-                # Try to analyze news sentiment
-                sentiments = []
-                for article in news[:2]:  # Analyze fewer articles to save tokens
-                    try:
-                        # Simple keyword-based sentiment as fallback
-                        positive_words = ['growth', 'profit', 'gain', 'rise', 'up', 'strong', 'beat', 'exceed', 'positive', 'bullish']
-                        negative_words = ['loss', 'drop', 'fall', 'down', 'weak', 'miss', 'decline', 'negative', 'bearish', 'concern']
-                        
-                        article_lower = article.lower()
-                        positive_count = sum(1 for word in positive_words if word in article_lower)
-                        negative_count = sum(1 for word in negative_words if word in article_lower)
-                        
-                        if positive_count > negative_count:
-                            sentiment_data = {'sentiment': 'positive', 'score': min(0.8, 0.5 + positive_count * 0.1)}
-                        elif negative_count > positive_count:
-                            sentiment_data = {'sentiment': 'negative', 'score': min(0.8, 0.5 + negative_count * 0.1)}
-                        else:
-                            sentiment_data = {'sentiment': 'neutral', 'score': 0.5}
-                        
-                        sentiments.append(sentiment_data)
-                    except Exception as e:
-                        print(f"Error analyzing article: {e}")
-                        sentiments.append({'sentiment': 'neutral', 'score': 0.5})
-                
-                # Calculate average sentiment
-                if sentiments:
-                    positive_scores = [s['score'] for s in sentiments if s['sentiment'] == 'positive']
-                    negative_scores = [s['score'] for s in sentiments if s['sentiment'] == 'negative']
-                    neutral_scores = [s['score'] for s in sentiments if s['sentiment'] == 'neutral']
-                    
-                    if positive_scores and len(positive_scores) >= len(negative_scores):
-                        avg_sentiment = {'sentiment': 'positive', 'score': sum(positive_scores) / len(positive_scores)}
-                    elif negative_scores and len(negative_scores) > len(positive_scores):
-                        avg_sentiment = {'sentiment': 'negative', 'score': sum(negative_scores) / len(negative_scores)}
-                    else:
-                        avg_sentiment = {'sentiment': 'neutral', 'score': 0.5}
-                else:
-                    avg_sentiment = {'sentiment': 'neutral', 'score': 0.5}
-                    
-        except Exception as e:
-            print(f"Sentiment analysis error: {e}")
-            # Generate random sentiment for demo purposes
-            import random
-            sentiments = ['positive', 'negative', 'neutral']
-            sentiment_type = random.choice(sentiments)
-            score = random.uniform(0.4, 0.8)
-            avg_sentiment = {'sentiment': sentiment_type, 'score': score}
-        
-        if self.db_handler:
-            embedding = self.embedder.encode(str(avg_sentiment))
-            self.db_handler.store_memory('sentiment', embedding, {'symbol': symbol, 'sentiment': avg_sentiment})
-        return avg_sentiment
\ No newline at end of file
+                metrics.increment('sentiment_fallback_total', reason='no_news')
+
+            if self.db_handler:
+                self.db_handler.submit_memory('sentiment', str(avg_sentiment), {'symbol': symbol, 'sentiment': avg_sentiment})
+            results[symbol] = avg_sentiment
+        return results
+
+    def current_sentiment(self, symbol):
+        """Aggregate over the articles already ingested, without fetching."""
+        with self._news_lock:
+            state = self._news_states.get(symbol)
+            if state is None or not len(state):
+                return dict(NEUTRAL)
+            return state.aggregate()
+
+    def news_window_size(self, symbol):
+        with self._news_lock:
+            state = self._news_states.get(symbol)
+            return len(state) if state else 0
+
+    def get_news_stats(self):
+        with self._news_lock:
+            stats = {
+                'symbols': len(self._news_states),
+                'articles_in_window': sum(len(state) for state in self._news_states.values()),
+            }
+        stats['article_cache'] = self.article_cache.get_stats()
+        return stats
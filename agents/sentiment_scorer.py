@@ -0,0 +1,152 @@
+import re
+import numpy as np
+
+POSITIVE_WORDS = ('growth', 'profit', 'gain', 'rise', 'up', 'strong', 'beat', 'exceed', 'positive', 'bullish')
+NEGATIVE_WORDS = ('loss', 'drop', 'fall', 'down', 'weak', 'miss', 'decline', 'negative', 'bearish', 'concern')
+
+# Forms that the regular -s/-ed/-ing rules in inflections() do not produce.
+# The substring scan the scorer replaced counted most of these ("stronger"
+# contains "strong"); irregular past tenses are listed so "rose" and "fell"
+# count as well.
+IRREGULAR_FORMS = {
+    'profit': ('profitable', 'profitability'),
+    'rise': ('rose', 'risen'),
+    'up': ('upgrade', 'upgrades', 'upgraded'),
+    'strong': ('stronger', 'strongest', 'strongly'),
+    'beat': ('beaten',),
+    'positive': ('positively',),
+    'fall': ('fell', 'fallen'),
+    'down': ('downgrade', 'downgrades', 'downgraded'),
+    'weak': ('weaker', 'weakest', 'weakness', 'weaken', 'weakens', 'weakened', 'weakening'),
+    'negative': ('negatively',),
+}
+
+_VOWELS = set('aeiou')
+
+
+def inflections(word):
+    """``word`` with its -s, -ed and -ing forms, e.g. decline, declines, declined, declining."""
+    if word.endswith('e'):
+        return (word, word + 's', word + 'd', word[:-1] + 'ing')
+    plural = word + 'es' if word.endswith(('s', 'sh', 'ch', 'x')) else word + 's'
+    stem = word
+    # A short vowel before a single final consonant doubles it: drop, dropped
+    if (word[-1] not in _VOWELS and word[-1] not in 'wxy' and len(word) >= 2 and word[-2] in _VOWELS
+            and (len(word) == 2 or word[-3] not in _VOWELS)):
+        stem = word + word[-1]
+    return (word, plural, stem + 'ed', stem + 'ing')
+
+
+def _trie_pattern(forms):
+    """Regex alternation of ``forms`` with shared prefixes factored out.
+
+    ``re`` tries a flat alternation one branch at a time, so a few hundred
+    forms cost a few hundred attempts per position; the trie tries one
+    branch per character.
+    """
+    trie = {}
+    for form in forms:
+        node = trie
+        for char in form:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if '' in node else body
+
+    return build(trie)
+
+NEUTRAL = {'sentiment': 'neutral', 'score': 0.5}
+
+
+class SentimentScorer:
+    """Keyword sentiment scorer compiled once into a single regex.
+
+    Each article is scored by the number of distinct positive and negative
+    lexicon words it contains, as whole words in any form that
+    ``inflections`` or ``IRREGULAR_FORMS`` gives for them. Batches of articles are
+    joined and scanned in one pass, then mapped back to their article by
+    offset.
+    """
+
+    def __init__(self, positive_words=POSITIVE_WORDS, negative_words=NEGATIVE_WORDS, irregular_forms=IRREGULAR_FORMS):
+        self.words = tuple(positive_words) + tuple(negative_words)
+        self.n_positive = len(positive_words)
+        # Every accepted surface form maps to its lexicon word; the article
+        # separator maps to -1
+        self._lookup = {'\n': -1}
+        for i, word in enumerate(self.words):
+            for form in inflections(word) + tuple(irregular_forms.get(word, ())):
+                self._lookup.setdefault(form, i)
+        # The pattern has no capture groups, which keeps ``findall`` on its
+        # fast path
+        alternation = _trie_pattern(form for form in self._lookup if form != '\n')
+        self.pattern = re.compile(rf"\n|\b{alternation}\b")
+
+    def count_matches(self, articles):
+        """Distinct positive and negative word counts per article, as two arrays."""
+        n = len(articles)
+        if n == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        # Articles are joined with newlines (stripped from the articles
+        # themselves) and the separators are matched too, so the running
+        # count of separators gives each hit's article index.
+        text = '\n'.join(article.replace('\n', ' ') for article in articles).lower()
+        lookup = self._lookup
+        ids = np.fromiter((lookup[token] for token in self.pattern.findall(text)), dtype=np.int64)
+        separators = ids < 0
+        article_idx = np.cumsum(separators)[~separators]
+        word_idx = ids[~separators]
+
+        # Each lexicon word counts once per article
+        n_words = len(self.words)
+        pairs = np.unique(article_idx * n_words + word_idx)
+        pair_article, pair_word = np.divmod(pairs, n_words)
+        is_positive = pair_word < self.n_positive
+        positive = np.bincount(pair_article[is_positive], minlength=n)
+        negative = np.bincount(pair_article[~is_positive], minlength=n)
+        return positive, negative
+
+    def score_articles(self, articles):
+        """Per-article ``{'sentiment', 'score'}`` dicts."""
+        pos, neg = self.count_matches(articles)
+        # 0 neutral, 1 positive, 2 negative
+        labels = np.where(pos > neg, 1, np.where(neg > pos, 2, 0)).tolist()
+        scores = np.where(pos == neg, 0.5, np.minimum(0.8, 0.5 + np.maximum(pos, neg) * 0.1)).tolist()
+        names = ('neutral', 'positive', 'negative')
+        return [{'sentiment': names[label], 'score': score} for label, score in zip(labels, scores)]
+
+    def score_text(self, text):
+        return self.score_articles([text])[0]
+
+    @staticmethod
+    def aggregate(article_scores):
+        """Majority label across articles with the mean score of that label."""
+        positive = [s['score'] for s in article_scores if s['sentiment'] == 'positive']
+        negative = [s['score'] for s in article_scores if s['sentiment'] == 'negative']
+        if positive and len(positive) >= len(negative):
+            return {'sentiment': 'positive', 'score': sum(positive) / len(positive)}
+        if negative and len(negative) > len(positive):
+            return {'sentiment': 'negative', 'score': sum(negative) / len(negative)}
+        return dict(NEUTRAL)
+
+    def score_batch(self, news_by_symbol):
+        """Score every article for many symbols in one pass.
+
+        Returns ``{symbol: {'articles': [...], 'aggregate': {...}}}``.
+        """
+        symbols = list(news_by_symbol)
+        articles = [article for symbol in symbols for article in news_by_symbol[symbol]]
+        scores = self.score_articles(articles)
+        results = {}
+        offset = 0
+        for symbol in symbols:
+            count = len(news_by_symbol[symbol])
+            symbol_scores = scores[offset:offset + count]
+            offset += count
+            results[symbol] = {'articles': symbol_scores, 'aggregate': self.aggregate(symbol_scores)}
+        return results
@@ -1,86 +1,109 @@
-import os
-import pandas as pd
-from crewai import Agent
-from langchain_groq import ChatGroq
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
-from sentence_transformers import SentenceTransformer
+from functools import cached_property
+from agents.llm_factory import build_chain, build_crew_agent, build_llm, build_prompt
+from agents.indicators import latest_indicators
+from metrics import metrics
 import json
 
 class StrategyAgent:
     def __init__(self, db_handler):
-        self.llm = ChatGroq(temperature=0.7, model_name="llama3-70b-8192", groq_api_key=os.getenv('GROQ_API_KEY'))
         self.db_handler = db_handler
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
-        self.agent = Agent(
+
+    @cached_property
+    def llm(self):
+        return build_llm(temperature=0.7)
+
+    @cached_property
+    def agent(self):
+        return build_crew_agent(
             role='Strategy Generator',
             goal='Generate trading strategies based on data and sentiment',
             backstory='Expert in trading strategies',
-            llm=self.llm,
-            verbose=True
+            llm=self.llm
         )
-        self.prompt = PromptTemplate(
-            input_variables=["market_data", "sentiment", "indicators"],
-            template="Generate a trading strategy for the stock based on market data: {market_data}, sentiment: {sentiment}, and indicators: {indicators}. Output as JSON with 'action' (buy/sell/hold), 'quantity', 'reason'."
+
+    @cached_property
+    def prompt(self):
+        return build_prompt(
+            ["market_data", "sentiment", "indicators"],
+            "Generate a trading strategy for the stock based on market data: {market_data}, sentiment: {sentiment}, and indicators: {indicators}. Output as JSON with 'action' (buy/sell/hold), 'quantity', 'reason'."
         )
-        self.chain = LLMChain(llm=self.llm, prompt=self.prompt)
+
+    @cached_property
+    def chain(self):
+        return build_chain(self.llm, self.prompt)
 
     def compute_indicators(self, data):
         try:
-            # For single data point, use the current price as moving averages
-            current_price = data['close'].iloc[0]
-            indicators = {
-                'SMA_5': current_price,  # Use current price as proxy
-                'SMA_20': current_price * 0.98,  # Slightly lower for demo
-                'RSI': 50,  # Neutral RSI
-                'current_price': current_price,
-                'volume': data['volume'].iloc[0]
-            }
+            # Indicators are computed over every bar in ``data``; a single quote
+            # row only yields the price and volume, the rest stay None.
+            indicators = latest_indicators(
+                data['open'].to_numpy(), data['high'].to_numpy(), data['low'].to_numpy(),
+                data['close'].to_numpy(), data['volume'].to_numpy()
+            )
             return indicators
         except Exception as e:
             print(f"Error computing indicators: {e}")
             return {
-                'SMA_5': 100,
-                'SMA_20': 98,
-                'RSI': 50,
+                'SMA_5': None,
+                'SMA_20': None,
+                'RSI': None,
                 'current_price': 100,
                 'volume': 1000000
             }
 
-    def generate_strategy(self, symbol, market_data, sentiment):
-        try:
-            indicators = self.compute_indicators(market_data)
-            price = market_data['close'].iloc[0]
-            volume = market_data['volume'].iloc[0]
-            
-            # Enhanced strategy logic with multiple factors
-            strategy_data = self._generate_enhanced_strategy(symbol, price, volume, sentiment, indicators)
-            
-        except Exception as e:
-            print(f"Strategy generation error: {e}")
-            # Fallback to basic strategy
-            strategy_data = self._generate_basic_strategy(sentiment)
-        
+    def generate_strategy(self, symbol, market_data, sentiment, indicators=None):
+        with metrics.span('strategy', symbol):
+            try:
+                if indicators is None:
+                    indicators = self.compute_indicators(market_data)
+                price = market_data['close'].iloc[-1]
+                volume = market_data['volume'].iloc[-1]
+
+                # Enhanced strategy logic with multiple factors
+                strategy_data = self._generate_enhanced_strategy(symbol, price, volume, sentiment, indicators)
+
+            except Exception as e:
+                print(f"Strategy generation error: {e}")
+                # Fallback to basic strategy
+                metrics.increment('strategy_fallback_total')
+                strategy_data = self._generate_basic_strategy(sentiment)
+
         if self.db_handler:
-            embedding = self.embedder.encode(str(strategy_data))
-            self.db_handler.store_memory('strategy', embedding, {'symbol': symbol, 'strategy': strategy_data})
+            self.db_handler.submit_memory('strategy', str(strategy_data), {'symbol': symbol, 'strategy': strategy_data})
         return strategy_data
-    
+
     def _generate_enhanced_strategy(self, symbol, price, volume, sentiment, indicators):
         """Generate strategy based on multiple factors"""
-        
+
+        sma_5 = indicators.get('SMA_5')
+        sma_20 = indicators.get('SMA_20')
+        rsi = indicators.get('RSI')
+        volume_avg = indicators.get('VOLUME_AVG_20')
+
         # Technical analysis factors
-        high_volume = volume > 500000
-        
-        # Price momentum (simplified)
-        price_momentum = 'neutral'
-        if price > 200:  # High price stocks
+        high_volume = volume > volume_avg if volume_avg else volume > 500000
+
+        if sma_5 is not None and sma_20 is not None:
+            # Trend from moving average alignment
+            if price > sma_5 > sma_20:
+                price_momentum = 'strong' if high_volume else 'moderate'
+            elif price < sma_5 < sma_20:
+                price_momentum = 'weak'
+            else:
+                price_momentum = 'moderate'
+        # Price momentum by price tier when there is not enough history
+        elif price > 200:  # High price stocks
             price_momentum = 'strong' if high_volume else 'moderate'
         elif price > 100:  # Mid price stocks
             price_momentum = 'moderate'
         else:  # Low price stocks
             price_momentum = 'weak'
-        
+
+        if rsi is not None:
+            oversold, overbought = rsi < 30, rsi > 70
+        else:
+            oversold, overbought = price < 150, price > 400
+
         # Decision matrix based on sentiment and technical factors
         if sentiment['sentiment'] == 'positive' and sentiment['score'] > 0.5:
             if price_momentum == 'strong':
@@ -89,7 +112,7 @@ class StrategyAgent:
                 return {'action': 'buy', 'quantity': 10, 'reason': f'Positive sentiment ({sentiment["score"]:.2f}) + moderate momentum'}
             else:
                 return {'action': 'buy', 'quantity': 5, 'reason': f'Positive sentiment ({sentiment["score"]:.2f}) but weak momentum'}
-                
+
         elif sentiment['sentiment'] == 'negative' and sentiment['score'] > 0.5:
             if price_momentum == 'strong':
                 return {'action': 'sell', 'quantity': 8, 'reason': f'Strong negative sentiment ({sentiment["score"]:.2f}) + strong momentum'}
@@ -97,17 +120,17 @@ class StrategyAgent:
                 return {'action': 'sell', 'quantity': 5, 'reason': f'Negative sentiment ({sentiment["score"]:.2f}) + moderate momentum'}
             else:
                 return {'action': 'hold', 'quantity': 0, 'reason': f'Negative sentiment ({sentiment["score"]:.2f}) but weak momentum - wait'}
-                
+
         else:  # Neutral sentiment
             if price_momentum == 'strong' and high_volume:
                 return {'action': 'buy', 'quantity': 8, 'reason': 'Strong technical momentum despite neutral sentiment'}
-            elif price < 150 and high_volume:  # Value opportunity
+            elif oversold and high_volume:  # Value opportunity
                 return {'action': 'buy', 'quantity': 12, 'reason': 'Potential value opportunity with high volume'}
-            elif price > 400:  # High price, be cautious
-                return {'action': 'sell', 'quantity': 3, 'reason': 'Taking profits at high price levels'}
+            elif overbought:  # Stretched price, be cautious
+                return {'action': 'sell', 'quantity': 3, 'reason': 'Taking profits at overbought levels'}
             else:
                 return {'action': 'hold', 'quantity': 0, 'reason': 'Neutral conditions - monitoring market'}
-    
+
     def _generate_basic_strategy(self, sentiment):
         """Basic fallback strategy"""
         if sentiment['sentiment'] == 'positive' and sentiment['score'] > 0.4:
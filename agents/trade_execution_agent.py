@@ -1,23 +1,35 @@
 import logging
 import datetime
+from metrics import metrics
 
 class TradeExecutionAgent:
-    def __init__(self, db_handler):
+    def __init__(self, db_handler, order_manager=None):
         self.db_handler = db_handler
+        # With an OrderManager, trades are queued to the venue and logged as they fill
+        self.order_manager = order_manager
         logging.basicConfig(level=logging.INFO)
 
     def execute_trade(self, symbol, strategy, price):
-        if strategy['action'] in ['buy', 'sell']:
-            quantity = strategy['quantity']
-            action = strategy['action']
-            reason = strategy['reason']
+        """Place a buy or sell; returns True if the order was logged or queued."""
+        with metrics.span('execute', symbol):
+            if strategy['action'] in ['buy', 'sell']:
+                quantity = strategy['quantity']
+                action = strategy['action']
+                reason = strategy['reason']
             
-            if self.db_handler:
-                self.db_handler.log_trade(symbol, action, price, quantity, reason)
+                if self.order_manager is not None:
+                    if self.order_manager.submit(symbol, action, quantity, price, reason) is None:
+                        print(f"❌ Order rejected: {action} {quantity} {symbol}")
+                        return False
+                elif self.db_handler:
+                    self.db_handler.log_trade(symbol, action, price, quantity, reason)
+                metrics.increment('trades_executed_total', action=action)
             
-            logging.info(f"{datetime.datetime.now()} - Executed {action} {quantity} shares of {symbol} at ${price:.2f}. Reason: {reason}")
-            print(f"🔄 TRADE EXECUTED: {action.upper()} {quantity} shares of {symbol} at ${price:.2f}")
-            print(f"💡 Reason: {reason}")
-        else:
-            logging.info(f"Holding {symbol}. Reason: {strategy.get('reason', 'No action required')}")
-            print(f"⏸️ HOLDING {symbol}. Reason: {strategy.get('reason', 'No action required')}")
\ No newline at end of file
+                logging.info(f"{datetime.datetime.now()} - Executed {action} {quantity} shares of {symbol} at ${price:.2f}. Reason: {reason}")
+                print(f"🔄 TRADE EXECUTED: {action.upper()} {quantity} shares of {symbol} at ${price:.2f}")
+                print(f"💡 Reason: {reason}")
+                return True
+            else:
+                logging.info(f"Holding {symbol}. Reason: {strategy.get('reason', 'No action required')}")
+                print(f"⏸️ HOLDING {symbol}. Reason: {strategy.get('reason', 'No action required')}")
+                return False
\ No newline at end of file
@@ -0,0 +1,223 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from agents.indicators import RSI_PERIOD, VOLUME_WINDOW, rsi, sma
+
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+SENTIMENT_CODES = {'neutral': 0, 'positive': 1, 'negative': 2}
+BARS_PER_YEAR = 252
+
+# Momentum codes, indexing the quantity tables below
+WEAK, MODERATE, STRONG = 0, 1, 2
+POSITIVE_QUANTITY = np.array([5, 10, 15])
+NEGATIVE_QUANTITY = np.array([0, -5, -8])
+
+
+# Array versions of StrategyAgent._generate_enhanced_strategy and the
+# rule-based fallback of RiskManagementAgent.evaluate_risk. Inputs are
+# (symbols, bars) arrays; decisions are signed share quantities (buy > 0,
+# sell < 0, hold 0) for the bar at which they are made.
+
+def strategy_quantities(close, volume, sma_5, sma_20, rsi_values, volume_avg, sentiment_label, sentiment_score):
+    """Signed order quantity for every symbol and bar.
+
+    Missing indicators are NaN and fall back to the same price tiers and
+    thresholds the agent uses when history is too short.
+    """
+    with np.errstate(invalid='ignore'):
+        has_volume_avg = ~np.isnan(volume_avg) & (volume_avg != 0)
+        high_volume = np.where(has_volume_avg, volume > volume_avg, volume > 500000)
+
+        trend_momentum = np.where(
+            (close > sma_5) & (sma_5 > sma_20), np.where(high_volume, STRONG, MODERATE),
+            np.where((close < sma_5) & (sma_5 < sma_20), WEAK, MODERATE)
+        )
+        tier_momentum = np.where(
+            close > 200, np.where(high_volume, STRONG, MODERATE),
+            np.where(close > 100, MODERATE, WEAK)
+        )
+        has_sma = ~np.isnan(sma_5) & ~np.isnan(sma_20)
+        momentum = np.where(has_sma, trend_momentum, tier_momentum)
+
+        has_rsi = ~np.isnan(rsi_values)
+        oversold = np.where(has_rsi, rsi_values < 30, close < 150)
+        overbought = np.where(has_rsi, rsi_values > 70, close > 400)
+
+    positive = (sentiment_label == SENTIMENT_CODES['positive']) & (sentiment_score > 0.5)
+    negative = (sentiment_label == SENTIMENT_CODES['negative']) & (sentiment_score > 0.5)
+    neutral = np.where(
+        (momentum == STRONG) & high_volume, 8,
+        np.where(oversold & high_volume, 12, np.where(overbought, -3, 0))
+    )
+    return np.where(positive, POSITIVE_QUANTITY[momentum],
+                    np.where(negative, NEGATIVE_QUANTITY[momentum], neutral))
+
+
+def apply_risk_limits(quantity, close, capital=100000, max_position_pct=0.10):
+    """Cap each order at ``max_position_pct`` of capital at the bar's close.
+
+    This is the per-order part of PortfolioRiskEngine's position limit; the
+    sector, gross and stop-loss rules depend on the running portfolio and
+    are not simulated.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        max_quantity = np.where(close > 0, np.floor(capital * max_position_pct / close), 0)
+    return np.sign(quantity) * np.minimum(np.abs(quantity), max_quantity)
+
+
+def simulate_fills(quantity, close, fill_price, long_only=False, cost_bps=0.0):
+    """Positions, cash and mark-to-market P&L for every symbol and bar.
+
+    ``quantity[:, t]`` is filled at ``fill_price[:, t]``; NaN fill prices
+    mean no fill. Like TradeExecutionAgent, sells are not checked against
+    holdings unless ``long_only`` is set.
+    """
+    quantity = np.where(np.isnan(fill_price), 0, quantity).astype(np.float64)
+    if long_only:
+        # Clipping at zero depends on the running position, so step through
+        # time, vectorized across symbols
+        position = np.zeros(quantity.shape[0])
+        for t in range(quantity.shape[1]):
+            new_position = np.maximum(position + quantity[:, t], 0)
+            quantity[:, t] = new_position - position
+            position = new_position
+    price = np.nan_to_num(fill_price)
+    notional = quantity * price
+    cost = np.abs(notional) * cost_bps / 10000
+    position = np.cumsum(quantity, axis=-1)
+    cash = -np.cumsum(notional + cost, axis=-1)
+    pnl = cash + position * close
+    return {'fills': quantity, 'position': position, 'pnl': pnl, 'traded': np.abs(notional), 'costs': cost}
+
+
+def _max_drawdown(equity):
+    """Largest peak-to-trough fall along the last axis, as a fraction of the peak."""
+    peak = np.maximum.accumulate(equity, axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdown = np.where(peak > 0, (peak - equity) / peak, 0.0)
+    return drawdown.max(axis=-1)
+
+
+def _backtest_arrays(bars, sentiment, capital, fill, long_only, cost_bps):
+    close = bars['close']
+    active = bars.get('active', np.ones(close.shape, dtype=bool))
+    sma_5 = sma(close, 5)
+    sma_20 = sma(close, 20)
+    rsi_values = rsi(close, RSI_PERIOD)
+    volume_avg = sma(bars['volume'], VOLUME_WINDOW)
+    if sentiment is None:
+        label = np.zeros(close.shape, dtype=np.int8)
+        score = np.full(close.shape, 0.5)
+    else:
+        label, score = sentiment['label'], sentiment['score']
+
+    quantity = strategy_quantities(close, bars['volume'], sma_5, sma_20, rsi_values, volume_avg, label, score)
+    quantity = apply_risk_limits(quantity, close, capital)
+
+    if fill == 'close':
+        fill_price = close.copy()
+    elif fill == 'next_open':
+        # Decided on bar t's close, filled at bar t+1's open; the last bar never fills
+        fill_price = np.full(close.shape, np.nan)
+        fill_price[:, :-1] = bars['open'][:, 1:]
+        active = active & np.concatenate([active[:, 1:], np.zeros((close.shape[0], 1), dtype=bool)], axis=1)
+    else:
+        raise ValueError(f"Unknown fill model: {fill}")
+    fill_price[~active] = np.nan
+
+    sim = simulate_fills(quantity, close, fill_price, long_only, cost_bps)
+    return {
+        'pnl_curve': sim['pnl'].sum(axis=0),
+        'pnl': sim['pnl'][:, -1],
+        'symbol_max_drawdown': (np.maximum.accumulate(sim['pnl'], axis=-1) - sim['pnl']).max(axis=-1),
+        'turnover': sim['traded'].sum(axis=-1),
+        'trades': np.count_nonzero(sim['fills'], axis=-1),
+        'costs': sim['costs'].sum(axis=-1),
+        'final_position': sim['position'][:, -1],
+    }
+
+
+def _summarize(symbols, parts, capital, n_bars):
+    combined = {key: np.concatenate([part[key] for part in parts]) for key in parts[0] if key != 'pnl_curve'}
+    equity = capital + np.sum([part['pnl_curve'] for part in parts], axis=0)
+    combined.update({
+        'symbols': list(symbols),
+        'equity': equity,
+        'total_pnl': float(equity[-1] - capital),
+        'max_drawdown': float(_max_drawdown(equity)),
+        'total_turnover': float(combined['turnover'].sum() / capital),
+        'total_trades': int(combined['trades'].sum()),
+        'symbol_years': len(symbols) * n_bars / BARS_PER_YEAR,
+    })
+    return combined
+
+
+def run_backtest(symbols, bars, sentiment=None, capital=100000, fill='next_open', long_only=False, cost_bps=0.0):
+    """Backtest the strategy and risk rules over (symbols, bars) arrays.
+
+    ``bars`` maps open/high/low/close/volume (and optionally an ``active``
+    mask) to arrays of shape (len(symbols), n_bars). ``sentiment`` holds
+    ``label`` codes (see SENTIMENT_CODES) and ``score`` arrays of the same
+    shape; without it every bar is neutral. Returns per-symbol arrays (pnl,
+    symbol_max_drawdown, turnover, trades, costs, final_position) plus the
+    portfolio equity curve and its total P&L, max drawdown (fraction of
+    peak equity) and turnover (traded notional / capital).
+    """
+    part = _backtest_arrays(bars, sentiment, capital, fill, long_only, cost_bps)
+    return _summarize(symbols, [part], capital, bars['close'].shape[1])
+
+
+def _run_shard(args):
+    return _backtest_arrays(*args)
+
+
+def run_backtest_sharded(symbols, bars, sentiment=None, capital=100000, fill='next_open', long_only=False,
+                         cost_bps=0.0, processes=None):
+    """``run_backtest`` with symbols split across worker processes."""
+    processes = processes or os.cpu_count() or 1
+    n = len(symbols)
+    if processes <= 1 or n < 2:
+        return run_backtest(symbols, bars, sentiment, capital, fill, long_only, cost_bps)
+    bounds = np.linspace(0, n, min(processes, n) + 1).astype(int)
+    shards = []
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        shard_bars = {field: values[lo:hi] for field, values in bars.items()}
+        shard_sentiment = None if sentiment is None else {key: values[lo:hi] for key, values in sentiment.items()}
+        shards.append((shard_bars, shard_sentiment, capital, fill, long_only, cost_bps))
+    with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+        parts = list(executor.map(_run_shard, shards))
+    return _summarize(symbols, parts, capital, bars['close'].shape[1])
+
+
+def frames_to_arrays(frames, sentiment_frames=None):
+    """Align per-symbol OHLCV DataFrames (yfinance-style columns) on one date index.
+
+    Returns ``(symbols, bars, sentiment)`` ready for ``run_backtest``. Bars
+    before a symbol lists are back-filled with its first price and marked
+    inactive so they never trade. Sentiment frames (``sentiment`` and
+    ``score`` columns) carry their last reading forward; symbols without
+    one are neutral.
+    """
+    import pandas as pd
+
+    symbols = list(frames)
+    index = pd.DatetimeIndex(sorted(set().union(*(frame.index for frame in frames.values()))))
+    bars = {field: np.empty((len(symbols), len(index))) for field in BAR_FIELDS}
+    bars['active'] = np.zeros((len(symbols), len(index)), dtype=bool)
+    label = np.zeros((len(symbols), len(index)), dtype=np.int8)
+    score = np.full((len(symbols), len(index)), 0.5)
+    for i, symbol in enumerate(symbols):
+        frame = frames[symbol].rename(columns=str.lower).reindex(index)
+        bars['active'][i] = frame['close'].notna().to_numpy()
+        for field in BAR_FIELDS:
+            if field == 'volume':
+                bars[field][i] = frame[field].fillna(0).to_numpy()
+            else:
+                bars[field][i] = frame[field].ffill().bfill().to_numpy()
+        if sentiment_frames and symbol in sentiment_frames:
+            readings = sentiment_frames[symbol].reindex(index, method='ffill')
+            label[i] = readings['sentiment'].map(SENTIMENT_CODES).fillna(0).to_numpy()
+            score[i] = readings['score'].fillna(0.5).to_numpy()
+    return symbols, bars, {'label': label, 'score': score}
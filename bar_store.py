@@ -0,0 +1,224 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+# Partition name is the bar's UTC date truncated to this numpy datetime unit
+PARTITION_UNITS = {'year': 'Y', 'month': 'M', 'day': 'D'}
+ROW_BYTES = 8
+
+
+class BarStore:
+    """On-disk columnar OHLCV store, one raw float64 file per field.
+
+    Layout is ``root/<SYMBOL>/<partition>/<field>.f64``, where the partition
+    is the bar's UTC year, month or day. Bars are appended in timestamp
+    order. A bar with the same timestamp as the last stored one overwrites
+    it in place, so the current day's bar can be updated. The timestamp
+    column is written last and defines how many rows are committed, so
+    readers never see a partially appended row.
+
+    Readers memory-map the files: a range inside one partition comes back as
+    zero-copy NumPy views, and a range spanning partitions is concatenated.
+    Any number of processes can read while one process writes, and reads
+    are thread-safe. Open write handles and memory maps are each capped by
+    an LRU of ``max_open_files``.
+    """
+
+    def __init__(self, root, partition='year', max_open_files=256):
+        if partition not in PARTITION_UNITS:
+            raise ValueError(f"Unknown partition: {partition}")
+        self.root = root
+        self.partition = partition
+        self.max_open_files = max_open_files
+        self._unit = PARTITION_UNITS[partition]
+        self._fds = OrderedDict()
+        self._sizes = {}
+        self._maps = OrderedDict()
+        self._last = {}
+        self._lock = threading.Lock()
+        # Readers share the map LRU; it has its own lock so reads never wait on a write
+        self._maps_lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _partition_keys(self, timestamps):
+        return timestamps.astype('datetime64[s]').astype(f'datetime64[{self._unit}]')
+
+    def _dir(self, symbol, partition):
+        return os.path.join(self.root, symbol, partition)
+
+    # Writing
+
+    def _fd(self, symbol, partition, field):
+        key = (symbol, partition, field)
+        fd = self._fds.get(key)
+        if fd is not None:
+            self._fds.move_to_end(key)
+            return fd
+        directory = self._dir(symbol, partition)
+        os.makedirs(directory, exist_ok=True)
+        fd = os.open(os.path.join(directory, f'{field}.f64'), os.O_RDWR | os.O_CREAT, 0o644)
+        size = os.fstat(fd).st_size
+        self._fds[key] = fd
+        # A torn append leaves a partial row; it is overwritten by the next one
+        self._sizes[key] = size - size % ROW_BYTES
+        while len(self._fds) > self.max_open_files:
+            old_key, old_fd = self._fds.popitem(last=False)
+            os.close(old_fd)
+            del self._sizes[old_key]
+        return fd
+
+    def _last_timestamp(self, symbol):
+        if symbol not in self._last:
+            partitions = self.partitions(symbol)
+            timestamps = self._column(symbol, partitions[-1], 'timestamp') if partitions else None
+            self._last[symbol] = float(timestamps[-1]) if timestamps is not None and len(timestamps) else None
+        return self._last[symbol]
+
+    def append(self, symbol, bars):
+        """Append bars (dict of field -> array, timestamps ascending).
+
+        Bars older than the last stored bar are skipped; one matching its
+        timestamp replaces it. Returns the number of rows written.
+        """
+        columns = {field: np.ascontiguousarray(bars[field], dtype='<f8') for field in FIELDS}
+        timestamps = columns['timestamp']
+        if not len(timestamps):
+            return 0
+        with self._lock:
+            last = self._last_timestamp(symbol)
+            keep = timestamps >= last if last is not None else np.ones(len(timestamps), dtype=bool)
+            if not keep.all():
+                columns = {field: values[keep] for field, values in columns.items()}
+                timestamps = columns['timestamp']
+            if not len(timestamps):
+                return 0
+            # Split into runs of rows that share a partition
+            keys = self._partition_keys(timestamps)
+            bounds = [0] + (np.flatnonzero(keys[1:] != keys[:-1]) + 1).tolist() + [len(keys)]
+            for lo, hi in zip(bounds[:-1], bounds[1:]):
+                self._write_rows(symbol, str(keys[lo]), {field: values[lo:hi] for field, values in columns.items()}, last)
+                last = float(timestamps[hi - 1])
+            self._last[symbol] = last
+            return len(timestamps)
+
+    def _write_rows(self, symbol, partition, columns, last):
+        self._fd(symbol, partition, 'timestamp')
+        committed = self._sizes[(symbol, partition, 'timestamp')]
+        overwrite = committed and last is not None and columns['timestamp'][0] == last
+        offset = committed - ROW_BYTES if overwrite else committed
+        # Data columns first, timestamp last: the timestamp length is the commit
+        for field in FIELDS[1:] + FIELDS[:1]:
+            fd = self._fd(symbol, partition, field)
+            data = columns[field].tobytes()
+            os.pwrite(fd, data, offset)
+            self._sizes[(symbol, partition, field)] = offset + len(data)
+
+    def append_bar(self, symbol, timestamp, open_, high, low, close, volume):
+        return self.append(symbol, {field: [value] for field, value in zip(FIELDS, (timestamp, open_, high, low, close, volume))})
+
+    def flush(self):
+        """fsync every open column file."""
+        with self._lock:
+            for fd in self._fds.values():
+                os.fsync(fd)
+
+    def close(self):
+        with self._lock:
+            for fd in self._fds.values():
+                os.close(fd)
+            self._fds.clear()
+            self._sizes.clear()
+        with self._maps_lock:
+            self._maps.clear()
+
+    # Reading
+
+    def symbols(self):
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def partitions(self, symbol):
+        directory = os.path.join(self.root, symbol)
+        if not os.path.isdir(directory):
+            return []
+        # Partition names sort chronologically
+        return sorted(os.listdir(directory))
+
+    def _column(self, symbol, partition, field, rows=None):
+        path = os.path.join(self._dir(symbol, partition), f'{field}.f64')
+        if rows is None:
+            try:
+                rows = os.path.getsize(path) // ROW_BYTES
+            except OSError:
+                return np.empty(0)
+        if rows == 0:
+            return np.empty(0)
+        with self._maps_lock:
+            cached = self._maps.get(path)
+            if cached is None or len(cached) < rows:
+                cached = np.memmap(path, dtype='<f8', mode='r')
+                self._maps[path] = cached
+                # Each map holds a file descriptor until it and its views are gone
+                while len(self._maps) > self.max_open_files:
+                    self._maps.popitem(last=False)
+            else:
+                self._maps.move_to_end(path)
+        return cached[:rows]
+
+    def read(self, symbol, start=None, end=None, fields=FIELDS):
+        """Bars for ``symbol`` with ``start <= timestamp <= end`` as a dict of arrays.
+
+        Arrays are read-only memory-mapped views when the range lies in one
+        partition.
+        """
+        pieces = []
+        first = str(self._partition_keys(np.array([start]))[0]) if start is not None else None
+        last = str(self._partition_keys(np.array([end]))[0]) if end is not None else None
+        for partition in self.partitions(symbol):
+            # Partition names order like their dates, so out-of-range ones are never opened
+            if (first is not None and partition < first) or (last is not None and partition > last):
+                continue
+            timestamps = self._column(symbol, partition, 'timestamp')
+            if not len(timestamps):
+                continue
+            if (start is not None and timestamps[-1] < start) or (end is not None and timestamps[0] > end):
+                continue
+            lo = 0 if start is None else int(np.searchsorted(timestamps, start, 'left'))
+            hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, 'right'))
+            if hi > lo:
+                pieces.append({field: self._column(symbol, partition, field, len(timestamps))[lo:hi] for field in fields})
+        if not pieces:
+            return {field: np.empty(0) for field in fields}
+        if len(pieces) == 1:
+            return pieces[0]
+        return {field: np.concatenate([piece[field] for piece in pieces]) for field in fields}
+
+    def tail(self, symbol, n, fields=FIELDS):
+        """The last ``n`` bars, reading only as many partitions as needed."""
+        pieces = []
+        remaining = n
+        for partition in reversed(self.partitions(symbol)):
+            timestamps = self._column(symbol, partition, 'timestamp')
+            rows = len(timestamps)
+            if not rows:
+                continue
+            take = min(rows, remaining)
+            pieces.append({field: self._column(symbol, partition, field, rows)[rows - take:] for field in fields})
+            remaining -= take
+            if not remaining:
+                break
+        if not pieces:
+            return {field: np.empty(0) for field in fields}
+        if len(pieces) == 1:
+            return pieces[0]
+        return {field: np.concatenate([piece[field] for piece in reversed(pieces)]) for field in fields}
+
+    def read_frame(self, symbol, start=None, end=None):
+        """``read`` as a DataFrame indexed by UTC timestamp."""
+        import pandas as pd
+
+        bars = self.read(symbol, start, end)
+        index = pd.to_datetime(np.asarray(bars['timestamp']), unit='s', utc=True)
+        return pd.DataFrame({field: bars[field] for field in FIELDS[1:]}, index=index, copy=False)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Recall vs latency benchmark for the agent_memory ANN index.
+
+Needs a PostgreSQL database with pgvector (DB_CONNECTION). Loads synthetic
+384-d memories under a scratch agent_type, then sweeps ef_search (HNSW) or
+probes (IVFFlat) and reports recall@k against exact NumPy search together
+with query latency. The scratch rows are deleted afterwards.
+
+Usage:
+    DB_CONNECTION=postgresql://localhost/trading_db DB_ANN_INDEX=hnsw \\
+        python benchmarks/bench_ann_recall.py --n 100000 --queries 200
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import DatabaseHandler
+
+AGENT_TYPE = 'bench_ann'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, default=100_000)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--knobs', type=int, nargs='+', default=None,
+                        help='ef_search (hnsw) or probes (ivfflat) values to sweep')
+    args = parser.parse_args()
+
+    db = DatabaseHandler(batch_size=1000)
+    if not db.use_db:
+        sys.exit("This benchmark needs PostgreSQL with pgvector (set DB_CONNECTION)")
+    if db.ann_method not in ('hnsw', 'ivfflat'):
+        sys.exit("Set DB_ANN_INDEX to hnsw or ivfflat")
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.n, args.dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    try:
+        start = time.perf_counter()
+        for i, vector in enumerate(vectors):
+            db.store_memory(AGENT_TYPE, vector, {'id': i})
+        db.flush()
+        if db.ann_method == 'ivfflat':
+            db.rebuild_memory_indexes(AGENT_TYPE)
+        print(f"Loaded {args.n:,} memories in {time.perf_counter() - start:.1f}s")
+
+        # Vectors are unit length, so the exact L2 neighbours are the
+        # highest inner products
+        exact = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.k]
+
+        knobs = args.knobs or ([10, 20, 40, 80, 160, 320] if db.ann_method == 'hnsw' else [1, 2, 5, 10, 20, 50])
+        knob_name = 'ef_search' if db.ann_method == 'hnsw' else 'probes'
+        print(f"{knob_name:>10} {'recall@' + str(args.k):>10} {'p50 ms':>8} {'p99 ms':>8}")
+        for knob in knobs:
+            hits, latencies = 0, []
+            for q, expected in zip(queries, exact):
+                start = time.perf_counter()
+                found = db.retrieve_memory(AGENT_TYPE, q, args.k, **{knob_name: knob})
+                latencies.append((time.perf_counter() - start) * 1e3)
+                hits += len({m['id'] for m in found} & set(expected.tolist()))
+            recall = hits / (args.k * len(queries))
+            print(f"{knob:>10} {recall:>10.3f} {np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 99):>8.2f}")
+    finally:
+        with db.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute("DELETE FROM agent_memory WHERE agent_type = %s;", (AGENT_TYPE,))
+            conn.commit()
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
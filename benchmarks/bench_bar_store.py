@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Columnar bar store benchmark.
+
+Writes years of synthetic daily bars for many symbols into a BarStore in a
+temporary directory, then times full-history and one-month range reads and
+the bar-by-bar append path used for live quotes.
+
+Usage:
+    python benchmarks/bench_bar_store.py --symbols 500 --years 10
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bar_store import BarStore
+
+SECONDS_PER_DAY = 86400
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--appends', type=int, default=10000, help='single-bar appends to time')
+    parser.add_argument('--max-open-files', type=int, default=256, help='BarStore file handle / map cache size')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bar_store_')
+    try:
+        store = BarStore(root, max_open_files=args.max_open_files)
+        n_bars = args.years * 365
+        rng = np.random.default_rng(0)
+        timestamps = 1_262_304_000 + np.arange(n_bars, dtype=np.float64) * SECONDS_PER_DAY
+        symbols = [f'SYM{i}' for i in range(args.symbols)]
+
+        start = time.perf_counter()
+        for symbol in symbols:
+            close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n_bars)))
+            store.append(symbol, {'timestamp': timestamps, 'open': close, 'high': close * 1.01,
+                                  'low': close * 0.99, 'close': close, 'volume': np.full(n_bars, 1e6)})
+        store.flush()
+        elapsed = time.perf_counter() - start
+        total = args.symbols * n_bars
+        print(f"bulk write: {total:,} bars in {elapsed:.2f}s ({total / elapsed:,.0f} bars/sec)")
+
+        reader = BarStore(root, max_open_files=args.max_open_files)
+        start = time.perf_counter()
+        for symbol in symbols:
+            float(reader.read(symbol)['close'].sum())
+        elapsed = time.perf_counter() - start
+        print(f"full-history read + sum: {elapsed * 1000 / args.symbols:.3f} ms/symbol ({n_bars:,} bars each)")
+
+        # The second pass shows the cost once the maps are open, if they fit the cache
+        month_start = timestamps[n_bars // 2]
+        for label in ('cold', 'warm'):
+            start = time.perf_counter()
+            for symbol in symbols:
+                float(reader.read(symbol, month_start, month_start + 30 * SECONDS_PER_DAY)['close'].sum())
+            elapsed = time.perf_counter() - start
+            print(f"one-month range read ({label}): {elapsed * 1e6 / args.symbols:.1f} us/symbol")
+
+        start = time.perf_counter()
+        ts = timestamps[-1]
+        for i in range(args.appends):
+            ts += SECONDS_PER_DAY
+            store.append_bar('LIVE', ts, 100.0, 101.0, 99.0, 100.5, 1e6)
+        elapsed = time.perf_counter() - start
+        print(f"single-bar append: {elapsed * 1e6 / args.appends:.1f} us/bar")
+        store.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Market-data client against the local HTTP stub server.
+
+The stub answers 429 above --quota requests per second per provider and
+sleeps --latency per request. Three runs fetch the same universe:
+- one new connection per quote, no rate limit, no retries (the old
+  behaviour, where every throttled symbol dropped to mock data);
+- MarketDataClient.quotes: pooled keep-alive connections, a token bucket
+  at the quota and jittered retries;
+- MarketDataClient.history_bulk for the one-year seed history.
+Reports elapsed time, symbols served, 429s and connections opened.
+
+Usage:
+    python benchmarks/bench_market_data.py --symbols 500 --quota 200 --latency 0.002
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import stubs
+from agents.market_data_client import MarketDataClient
+
+
+def fetch_unpooled(url, symbols, workers):
+    def fetch_one(symbol):
+        try:
+            with urllib.request.urlopen(f'{url}/api/v1/quote?symbol={symbol}', timeout=10) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return [quote for quote in executor.map(fetch_one, symbols) if quote is not None]
+
+
+def report(label, server, before, elapsed, served, total):
+    after = server.stats()
+    print(f"{label:<28} {elapsed:>6.2f}s  {served:>5}/{total} served  "
+          f"{after['throttled'] - before['throttled']:>5} throttled (429)  "
+          f"{after['connections'] - before['connections']:>5} connections")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--quota', type=float, default=200, help='stub requests per second per provider')
+    parser.add_argument('--latency', type=float, default=0.002, help='stub seconds per request')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent requests')
+    parser.add_argument('--period', default='1y', help='history period for the bulk download')
+    args = parser.parse_args()
+
+    configs = {'finnhub': stubs.StubConfig(args.latency), 'yahoo': stubs.StubConfig(args.latency)}
+    stubs.StubFinnhubClient.config = configs['finnhub']
+    stubs.StubTicker.config = configs['yahoo']
+    server = stubs.StubMarketDataServer(quota=args.quota)
+    symbols = [f'SYM{i}' for i in range(args.symbols)]
+
+    before = server.stats()
+    start = time.perf_counter()
+    served = fetch_unpooled(server.url, symbols, args.workers)
+    report('new connection per quote:', server, before, time.perf_counter() - start, len(served), len(symbols))
+
+    # Let the stub's bucket refill so both runs start from the same burst
+    time.sleep(1.0)
+    client = MarketDataClient(finnhub_url=f'{server.url}/api/v1', yahoo_url=server.url,
+                              finnhub_rate=args.quota, finnhub_burst=args.quota,
+                              yahoo_rate=args.quota, yahoo_burst=args.quota, pool_size=args.workers)
+    before = server.stats()
+    start = time.perf_counter()
+    quotes = client.quotes(symbols)
+    report('MarketDataClient.quotes:', server, before, time.perf_counter() - start, len(quotes), len(symbols))
+
+    time.sleep(1.0)
+    before = server.stats()
+    start = time.perf_counter()
+    histories = client.history_bulk(symbols, args.period)
+    report('MarketDataClient.history_bulk:', server, before, time.perf_counter() - start, len(histories), len(symbols))
+    print(f"client stats: {client.get_stats()}")
+    client.close()
+    server.close()
+
+
+if __name__ == '__main__':
+    main()
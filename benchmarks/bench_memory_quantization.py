@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Memory footprint, query latency and recall of quantized agent memories.
+
+Bulk-loads --n synthetic 384-d memories into VectorIndex once per dtype
+(float32, float16, int8) and reports the RAM the index holds, the p50/p95
+top-k latency with and without rescoring, and recall@k against an exact
+float32 scan. Vectors are regenerated chunk by chunk from fixed seeds, so
+the exact answers never need all of them in RAM at once. A dtype whose
+projected footprint does not fit in available memory is reported as a
+projection and skipped.
+
+Usage:
+    python benchmarks/bench_memory_quantization.py --n 10000000 --queries 50
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vector_index import DTYPES, VectorIndex
+
+AGENT_TYPE = 'bench_quantization'
+
+
+def chunks(n, dim, chunk):
+    for i, start in enumerate(range(0, n, chunk)):
+        rng = np.random.default_rng(1000 + i)
+        yield start, rng.standard_normal((min(chunk, n - start), dim), dtype=np.float32)
+
+
+def exact_top_k(args, queries):
+    """Top-k row ids per query by exact cosine similarity, one chunk at a time."""
+    best_ids = np.empty((len(queries), 0), dtype=np.int64)
+    best_scores = np.empty((len(queries), 0), dtype=np.float32)
+    for start, vectors in chunks(args.n, args.dim, args.chunk):
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        scores = np.concatenate([best_scores, queries @ vectors.T], axis=1)
+        ids = np.concatenate([best_ids, np.broadcast_to(np.arange(start, start + len(vectors)), (len(queries), len(vectors)))], axis=1)
+        top = np.argpartition(-scores, args.k - 1, axis=1)[:, :args.k]
+        best_scores = np.take_along_axis(scores, top, axis=1)
+        best_ids = np.take_along_axis(ids, top, axis=1)
+    return [set(row.tolist()) for row in best_ids]
+
+
+def available_bytes():
+    with open('/proc/meminfo') as f:
+        for line in f:
+            if line.startswith('MemAvailable:'):
+                return int(line.split()[1]) * 1024
+    return None
+
+
+def projected_bytes(dtype, n, dim):
+    per_row = np.dtype(dtype).itemsize * dim + 16 + (4 if dtype == 'int8' else 0)
+    # Metadata list slot plus a small int per row
+    return n * (per_row + 8 + 28)
+
+
+def run(args, dtype, queries, truth):
+    index = VectorIndex(initial_capacity=args.n, dtype=dtype, rescore=args.rescore)
+    start = time.perf_counter()
+    for offset, vectors in chunks(args.n, args.dim, args.chunk):
+        index.add_batch(AGENT_TYPE, vectors, range(offset, offset + len(vectors)))
+    load = time.perf_counter() - start
+    stats = index.get_stats()[AGENT_TYPE]
+    print(f"{dtype:>7}: loaded in {load:.1f}s, index arrays {stats['array_bytes'] / 2**30:.2f} GiB")
+
+    for rescore in ((0, args.rescore) if dtype != 'float32' else (0,)):
+        index.rescore = rescore
+        # Warm up page cache and allocator before timing
+        index.search(AGENT_TYPE, queries[0], args.k)
+        latencies, recalls = [], []
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            found = index.search(AGENT_TYPE, query, args.k)
+            latencies.append(time.perf_counter() - start)
+            recalls.append(len(expected.intersection(found)) / args.k)
+        latencies = np.array(latencies) * 1000
+        label = f"rescore x{rescore}" if rescore else 'no rescore'
+        print(f"         {label:<11} p50 {np.percentile(latencies, 50):8.1f} ms  p95 {np.percentile(latencies, 95):8.1f} ms  "
+              f"recall@{args.k} {np.mean(recalls):.3f}")
+    del index
+    gc.collect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, default=10_000_000)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--rescore', type=int, default=4, help='candidates re-ranked per result for quantized dtypes')
+    parser.add_argument('--dtypes', default=','.join(DTYPES))
+    parser.add_argument('--chunk', type=int, default=100_000, help='vectors generated per chunk')
+    args = parser.parse_args()
+
+    queries = np.random.default_rng(7).standard_normal((args.queries, args.dim), dtype=np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    start = time.perf_counter()
+    truth = exact_top_k(args, queries)
+    print(f"Exact top-{args.k} for {args.queries} queries over {args.n:,} vectors in {time.perf_counter() - start:.1f}s")
+
+    for dtype in args.dtypes.split(','):
+        needed, available = projected_bytes(dtype, args.n, args.dim), available_bytes()
+        if available is not None and needed > 0.9 * available:
+            print(f"{dtype:>7}: needs ~{needed / 2**30:.1f} GiB, {available / 2**30:.1f} GiB available; skipped")
+            continue
+        run(args, dtype, queries, truth)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Decision latency with memories stored inline vs by the background worker.
+
+Runs process_data -> analyze_sentiment_batch -> generate_strategy ->
+evaluate_risk per symbol against the offline stubs, once with
+MEMORY_WORKER off (encode + store before each stage returns) and once with
+it on. The stub embedder sleeps --embed-latency per forward pass, and the
+embedding cache is off by default so every memory pays for one. Reports
+per-decision latency and how long close() takes to drain the queue.
+
+Usage:
+    python benchmarks/bench_memory_worker.py --symbols 200 --embed-latency 0.01
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import stubs
+
+
+def run(symbols, async_memory, policy):
+    from agents.llm_cache import LLMResponseCache
+    from agents.market_data_agent import MarketDataAgent
+    from agents.risk_management_agent import RiskManagementAgent
+    from agents.sentiment_analysis_agent import SentimentAnalysisAgent
+    from agents.strategy_agent import StrategyAgent
+    from database import DatabaseHandler
+
+    os.environ['MEMORY_QUEUE_POLICY'] = policy
+    db_handler = DatabaseHandler(async_memory=async_memory)
+    market = MarketDataAgent(db_handler)
+    sentiment = SentimentAnalysisAgent(db_handler)
+    strategy = StrategyAgent(db_handler)
+    risk = RiskManagementAgent(db_handler, response_cache=LLMResponseCache(cache_dir=tempfile.mkdtemp(prefix='bench_llm_')))
+    portfolio = {'AAPL': 100, 'GOOGL': 50}
+
+    # Fetches are outside the timed section; they do not touch memory storage
+    inputs = {symbol: (market.fetch_stock_data(symbol), sentiment.fetch_news(symbol)) for symbol in symbols}
+    latencies = []
+    for symbol in symbols:
+        market_data, news = inputs[symbol]
+        start = time.perf_counter()
+        market.process_data(symbol, market_data)
+        sentiment_result = sentiment.analyze_sentiment_batch({symbol: news})[symbol]
+        decision = strategy.generate_strategy(symbol, market_data, sentiment_result, market.get_indicators(symbol))
+        risk.evaluate_risk(symbol, decision, portfolio, 100000, float(market_data['close'].iloc[-1]))
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    db_handler.close()
+    drain = time.perf_counter() - start
+    latencies = np.array(latencies) * 1000
+    stats = db_handler.get_write_stats().get('memory_worker', {})
+    return latencies, drain, stats, db_handler.get_memory_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=200)
+    parser.add_argument('--embed-latency', type=float, default=0.01, help='stub embedder seconds per forward pass')
+    parser.add_argument('--policy', choices=('block', 'drop'), default='block')
+    parser.add_argument('--embedding-cache', action='store_true', help='keep the embedding cache on')
+    args = parser.parse_args()
+
+    os.environ['LLM_BACKEND'] = 'groq'
+    os.environ['LLM_CACHE_DIR'] = tempfile.mkdtemp(prefix='bench_llm_')
+    os.environ['TRADE_JOURNAL_DIR'] = ''
+    os.environ.pop('DB_CONNECTION', None)
+    if not args.embedding_cache:
+        os.environ['EMBEDDING_CACHE_SIZE'] = '0'
+    stubs.install(embed_latency=args.embed_latency)
+    logging.disable(logging.INFO)
+
+    for label, async_memory in (('inline', False), ('worker', True)):
+        symbols = [f'{label.upper()}{i}' for i in range(args.symbols)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            latencies, drain, stats, memory = run(symbols, async_memory, args.policy)
+        stored = sum(entry['entries'] for entry in memory.values())
+        print(f"{label:>6}: decision p50 {np.percentile(latencies, 50):.2f} ms, p95 {np.percentile(latencies, 95):.2f} ms, "
+              f"mean {latencies.mean():.2f} ms; close() {drain * 1000:.0f} ms; {stored} memories stored")
+        if stats:
+            print(f"        worker: {stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Order pipeline throughput against the local simulated exchange.
+
+Submits random buy/sell market orders over a symbol universe three ways:
+- TradeExecutionAgent logging every order synchronously (the old path);
+- the same agent routing through OrderManager;
+- OrderManager directly.
+Reports sustained orders/sec until every order has filled, plus how much
+netting removed, and checks that the final portfolio matches the signed
+sum of all orders.
+
+Usage:
+    python benchmarks/bench_order_pipeline.py --orders 100000 --symbols 500 --latency 0.001
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agents.trade_execution_agent import TradeExecutionAgent
+from database import DatabaseHandler
+from order_manager import OrderManager
+from sim_exchange import SimulatedExchange
+
+
+def make_orders(n, n_symbols, seed=0):
+    rng = np.random.default_rng(seed)
+    symbols = rng.integers(n_symbols, size=n)
+    sides = np.where(rng.random(n) < 0.5, 'buy', 'sell')
+    quantities = rng.integers(1, 20, size=n)
+    prices = 50 + symbols % 400
+    return [(f'SYM{s}', str(side), int(q), float(p)) for s, side, q, p in zip(symbols, sides, quantities, prices)]
+
+
+def expected_portfolio(orders):
+    expected = Counter()
+    for symbol, side, quantity, _ in orders:
+        expected[symbol] += quantity if side == 'buy' else -quantity
+    return {symbol: shares for symbol, shares in expected.items() if shares}
+
+
+def build_manager(args, db_handler, portfolio):
+    exchange = SimulatedExchange(latency=args.latency, liquidity=args.liquidity, tick_interval=args.tick)
+    return OrderManager(exchange, portfolio, db_handler, batch_size=args.batch_size, batch_window=args.batch_window,
+                        max_queue=args.orders + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=100000)
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.001, help='venue latency in seconds')
+    parser.add_argument('--liquidity', type=int, default=50, help='shares per symbol and side per venue tick')
+    parser.add_argument('--tick', type=float, default=0.001, help='venue matching interval in seconds')
+    parser.add_argument('--batch-size', type=int, default=1024)
+    parser.add_argument('--batch-window', type=float, default=0.002)
+    args = parser.parse_args()
+
+    os.environ['TRADE_JOURNAL_DIR'] = ''
+    os.environ['MEMORY_WORKER'] = '0'
+    logging.disable(logging.INFO)
+    orders = make_orders(args.orders, args.symbols)
+    expected = expected_portfolio(orders)
+
+    db_handler = DatabaseHandler()
+    agent = TradeExecutionAgent(db_handler)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for symbol, side, quantity, price in orders:
+            agent.execute_trade(symbol, {'action': side, 'quantity': quantity, 'reason': 'bench'}, price)
+    elapsed = time.perf_counter() - start
+    print(f"sync agent log_trade:   {args.orders / elapsed:>10,.0f} orders/sec")
+
+    for label, through_agent in (('agent + OrderManager:', True), ('OrderManager.submit:', False)):
+        db_handler = DatabaseHandler()
+        portfolio = {}
+        manager = build_manager(args, db_handler, portfolio)
+        agent = TradeExecutionAgent(db_handler, manager)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for symbol, side, quantity, price in orders:
+                if through_agent:
+                    agent.execute_trade(symbol, {'action': side, 'quantity': quantity, 'reason': 'bench'}, price)
+                else:
+                    manager.submit(symbol, side, quantity, price, 'bench')
+        submitted = time.perf_counter() - start
+        manager.close()
+        elapsed = time.perf_counter() - start
+        stats = manager.get_stats()
+        venue = manager.exchange.get_stats()
+        print(f"{label:<23} {args.orders / elapsed:>10,.0f} orders/sec sustained "
+              f"(submit {args.orders / submitted:,.0f}/sec, all filled after {elapsed:.2f}s)")
+        print(f"    routed {stats['net_orders']:,} net orders in {stats['batches']:,} batches, "
+              f"{stats['crossed_shares'] / max(1, stats['crossed_shares'] + stats['net_shares']):.0%} of shares crossed internally; "
+              f"{venue['fills']:,} fills ({venue['partial_fills']:,} partial), {len(db_handler.trade_journal):,} journaled")
+        print(f"    portfolio matches orders: {portfolio == expected}")
+
+
+if __name__ == '__main__':
+    main()
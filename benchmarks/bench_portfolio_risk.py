@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Portfolio risk engine benchmark.
+
+Builds a portfolio over a synthetic universe with random prices and sectors,
+then times PortfolioRiskEngine.evaluate on batches of candidate orders and
+reports how many were resized or rejected by each rule.
+
+Usage:
+    python benchmarks/bench_portfolio_risk.py --symbols 5000 --orders 5000
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from portfolio_risk import REASONS, PortfolioRiskEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=5000)
+    parser.add_argument('--orders', type=int, default=5000, help='candidate orders per evaluate call')
+    parser.add_argument('--sectors', type=int, default=11)
+    parser.add_argument('--capital', type=float, default=100_000_000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    symbols = [f'SYM{i}' for i in range(args.symbols)]
+    sectors = {symbol: f'SECTOR{rng.integers(args.sectors)}' for symbol in symbols}
+    engine = PortfolioRiskEngine(args.capital, sectors=sectors)
+    prices = dict(zip(symbols, rng.uniform(5, 500, args.symbols)))
+    engine.update_prices(prices)
+    held = rng.choice(args.symbols, args.symbols // 5, replace=False)
+    # Half the capital spread over the held names
+    notional = args.capital * 0.5 / len(held)
+    engine.sync_positions({symbols[i]: int(notional * rng.uniform(0.2, 1.8) / prices[symbols[i]]) + 1 for i in held})
+    # Knock a few positions through their stop-loss
+    engine.update_prices({symbols[i]: prices[symbols[i]] * 0.9 for i in held[:len(held) // 20]})
+
+    order_symbols = [symbols[i] for i in rng.integers(args.symbols, size=args.orders)]
+    quantities = rng.integers(-500, 2000, args.orders)
+
+    engine.evaluate(order_symbols, quantities)
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        result = engine.evaluate(order_symbols, quantities)
+    elapsed = (time.perf_counter() - start) / args.repeat
+    print(f"evaluate: {args.orders:,} orders over {args.symbols:,} symbols in {elapsed * 1000:.2f} ms "
+          f"({args.orders / elapsed:,.0f} orders/sec)")
+
+    resized = (result['quantity'] != quantities) & result['approved']
+    print(f"approved {int(result['approved'].sum()):,}, resized {int(resized.sum()):,}, "
+          f"rejected {int((~result['approved']).sum()):,}")
+    for code, count in sorted(Counter(result['reason'].tolist()).items()):
+        print(f"  {REASONS[code]}: {count:,}")
+    print(f"engine: {engine.get_stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+RiskManagementAgent benchmark against the stub LLM backend.
+
+Evaluates risk for many symbols with a fixed stub latency, first with a cold
+response cache and then warm, and reports decisions per second and hit rate.
+Runs fully offline.
+
+Usage:
+    python benchmarks/bench_risk_cache.py --symbols 1000 --latency 0.05
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.05, help='stub LLM latency in seconds')
+    args = parser.parse_args()
+
+    os.environ['LLM_BACKEND'] = 'stub'
+    os.environ['STUB_LLM_LATENCY'] = str(args.latency)
+    from agents.llm_cache import LLMResponseCache
+    from agents.risk_management_agent import RiskManagementAgent
+
+    cache = LLMResponseCache(cache_dir=tempfile.mkdtemp(prefix='llm_cache_'))
+    agent = RiskManagementAgent(None, response_cache=cache)
+    actions = [('buy', 15), ('buy', 10), ('buy', 5), ('sell', 8), ('sell', 5), ('hold', 0)]
+    portfolio = {'AAPL': 100, 'GOOGL': 50}
+
+    for label in ('cold', 'warm'):
+        start = time.perf_counter()
+        for i in range(args.symbols):
+            action, quantity = actions[i % len(actions)]
+            agent.evaluate_risk(f'SYM{i}', {'action': action, 'quantity': quantity, 'reason': 'bench'}, portfolio,
+                                price=100.0 + i % 400)
+        elapsed = time.perf_counter() - start
+        print(f"{label}: {args.symbols} decisions in {elapsed:.2f}s ({args.symbols / elapsed:,.0f}/sec), "
+              f"LLM calls so far {agent.llm.calls}")
+    print(f"Cache stats: {cache.get_stats()}")
+
+
+if __name__ == '__main__':
+    main()
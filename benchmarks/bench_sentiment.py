@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Keyword sentiment scorer benchmark.
+
+Builds a local corpus of synthetic headlines (default 100k, spread over
+500 symbols) and scores it with SentimentScorer.score_batch in one call,
+reporting articles per second. The per-article substring scan the agent
+used before is timed on the same corpus for comparison. A second corpus,
+built from inflected lexicon forms the substring scan also recognizes
+("declined", "stronger") and filler without lexicon substrings, checks that
+both give the same score to every article.
+
+Usage:
+    python benchmarks/bench_sentiment.py --articles 100000 --symbols 500
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agents.sentiment_scorer import IRREGULAR_FORMS, NEGATIVE_WORDS, POSITIVE_WORDS, SentimentScorer, inflections
+
+FILLER = ('shares', 'company', 'quarter', 'supply', 'update', 'analysts', 'market', 'guidance',
+          'revenue', 'outlook', 'investors', 'chain', 'sector', 'report', 'demand', 'upgrade')
+
+
+def make_corpus(n_articles, n_symbols, seed=0, vocab=None):
+    rng = np.random.default_rng(seed)
+    vocab = np.array(vocab or FILLER * 4 + POSITIVE_WORDS + NEGATIVE_WORDS)
+    lengths = rng.integers(8, 25, size=n_articles)
+    words = rng.choice(vocab, size=lengths.sum())
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    articles = [' '.join(words[bounds[i]:bounds[i + 1]]).capitalize() for i in range(n_articles)]
+    news = {}
+    for i, article in enumerate(articles):
+        news.setdefault(f'SYM{i % n_symbols}', []).append(article)
+    return news
+
+
+def agreement_vocab():
+    """Filler and inflected forms on which the substring scan and the scorer should agree."""
+    words = POSITIVE_WORDS + NEGATIVE_WORDS
+    # "supply" holds "up": the substring scan counts it, the scorer by design does not
+    filler = [word for word in FILLER if not any(lexicon_word in word for lexicon_word in words)]
+    # Forms without their lexicon word ("rose", "rising") are only seen by the scorer
+    forms = [form for word in words for form in inflections(word) + IRREGULAR_FORMS.get(word, ()) if word in form]
+    return filler * 4 + forms
+
+
+def substring_scan(articles):
+    # Per-article scoring as analyze_sentiment did it before SentimentScorer
+    results = []
+    for article in articles:
+        positive_words = ['growth', 'profit', 'gain', 'rise', 'up', 'strong', 'beat', 'exceed', 'positive', 'bullish']
+        negative_words = ['loss', 'drop', 'fall', 'down', 'weak', 'miss', 'decline', 'negative', 'bearish', 'concern']
+        article_lower = article.lower()
+        positive_count = sum(1 for word in positive_words if word in article_lower)
+        negative_count = sum(1 for word in negative_words if word in article_lower)
+        if positive_count > negative_count:
+            results.append({'sentiment': 'positive', 'score': min(0.8, 0.5 + positive_count * 0.1)})
+        elif negative_count > positive_count:
+            results.append({'sentiment': 'negative', 'score': min(0.8, 0.5 + negative_count * 0.1)})
+        else:
+            results.append({'sentiment': 'neutral', 'score': 0.5})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--articles', type=int, default=100_000)
+    parser.add_argument('--symbols', type=int, default=500)
+    args = parser.parse_args()
+
+    news = make_corpus(args.articles, args.symbols)
+    scorer = SentimentScorer()
+
+    start = time.perf_counter()
+    results = scorer.score_batch(news)
+    elapsed = time.perf_counter() - start
+    print(f"score_batch: {args.articles:,} articles / {len(results)} symbols in {elapsed:.2f}s "
+          f"({args.articles / elapsed:,.0f} articles/sec)")
+
+    articles = [article for symbol_news in news.values() for article in symbol_news]
+    start = time.perf_counter()
+    substring_scan(articles)
+    elapsed = time.perf_counter() - start
+    print(f"previous substring scan: {args.articles:,} articles in {elapsed:.2f}s ({args.articles / elapsed:,.0f} articles/sec), "
+          f"without word boundaries")
+
+    news = make_corpus(min(args.articles, 20_000), args.symbols, seed=1, vocab=agreement_vocab())
+    articles = [article for symbol_news in news.values() for article in symbol_news]
+    expected = substring_scan(articles)
+    scores = scorer.score_articles(articles)
+    mismatches = [(article, old, new) for article, old, new in zip(articles, expected, scores) if old != new]
+    print(f"agreement with the substring scan on {len(articles):,} inflected articles: "
+          f"{len(articles) - len(mismatches):,}/{len(articles):,}")
+    for article, old, new in mismatches[:5]:
+        print(f"  {article!r}: substring scan {old}, scorer {new}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for the agents and the full pipeline.
+
+Finnhub, yfinance, Groq and the sentence embedder are replaced by the local
+stand-ins in benchmarks/stubs.py, with configurable latency and failure
+rate. Micro-benchmarks time each agent method; macro-benchmarks run
+``main()`` end to end for each universe size. Results are written as JSON
+(default benchmarks/results/<git commit>.json), and ``--compare`` prints the
+change against an earlier results file.
+
+Usage:
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --sizes 1,100,10000 --api-latency 0.005 --failure-rate 0.01
+    python benchmarks/bench_suite.py --compare benchmarks/results/<old commit>.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import stubs
+
+
+def _time_calls(fn, args_list):
+    latencies = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+    return {
+        'calls': len(latencies),
+        'mean_ms': round(float(latencies.mean()), 4),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 4),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 4),
+        'ops_per_second': round(float(len(latencies) / (latencies.sum() / 1000)), 2) if latencies.sum() else None,
+    }
+
+
+def run_micro(n):
+    from agents.llm_cache import LLMResponseCache
+    from agents.market_data_agent import MarketDataAgent
+    from agents.risk_management_agent import RiskManagementAgent
+    from agents.sentiment_analysis_agent import SentimentAnalysisAgent
+    from agents.strategy_agent import StrategyAgent
+    from agents.trade_execution_agent import TradeExecutionAgent
+    from database import DatabaseHandler
+
+    db_handler = DatabaseHandler()
+    market = MarketDataAgent(db_handler)
+    sentiment = SentimentAnalysisAgent(db_handler)
+    strategy = StrategyAgent(db_handler)
+    risk = RiskManagementAgent(db_handler, response_cache=LLMResponseCache(cache_dir=tempfile.mkdtemp(prefix='bench_llm_')))
+    execution = TradeExecutionAgent(db_handler)
+
+    symbols = [f'MICRO{i}' for i in range(n)]
+    results = {}
+    results['market.fetch_stock_data.cold'] = _time_calls(market.fetch_stock_data, [(s,) for s in symbols])
+    results['market.fetch_stock_data.cached'] = _time_calls(market.fetch_stock_data, [(s,) for s in symbols])
+    quotes = {s: market.fetch_stock_data(s) for s in symbols}
+    results['market.get_indicators'] = _time_calls(market.get_indicators, [(s,) for s in symbols])
+    results['market.process_data'] = _time_calls(market.process_data, [(s, quotes[s]) for s in symbols])
+
+    results['sentiment.fetch_news.first'] = _time_calls(sentiment.fetch_news, [(s,) for s in symbols])
+    results['sentiment.fetch_news.incremental'] = _time_calls(sentiment.fetch_news, [(s,) for s in symbols])
+    news = {s: sentiment.fetch_news(s) for s in symbols}
+    fresh = SentimentAnalysisAgent(db_handler)
+    results['sentiment.analyze_sentiment'] = _time_calls(fresh.analyze_sentiment, [(s, news[s]) for s in symbols])
+    sentiments = {s: sentiment.current_sentiment(s) for s in symbols}
+
+    indicators = {s: market.get_indicators(s) for s in symbols}
+    results['strategy.generate_strategy'] = _time_calls(
+        strategy.generate_strategy, [(s, quotes[s], sentiments[s], indicators[s]) for s in symbols])
+    strategies = {s: strategy.generate_strategy(s, quotes[s], sentiments[s], indicators[s]) for s in symbols}
+
+    portfolio = {'AAPL': 100, 'GOOGL': 50}
+    prices = {s: float(quotes[s]['close'].iloc[-1]) for s in symbols}
+    # A distinct capital per call makes every prompt a cache miss
+    results['risk.evaluate_risk.cold'] = _time_calls(
+        risk.evaluate_risk, [(s, strategies[s], portfolio, 100000 + i, prices[s]) for i, s in enumerate(symbols)])
+    results['risk.evaluate_risk.cached'] = _time_calls(
+        risk.evaluate_risk, [(s, strategies[s], portfolio, 100000 + i, prices[s]) for i, s in enumerate(symbols)])
+    results['risk.evaluate_risk_batch'] = _time_calls(
+        risk.evaluate_risk_batch, [(strategies, portfolio, 100000, prices)])
+    results['execution.execute_trade'] = _time_calls(
+        execution.execute_trade, [(s, strategies[s], float(quotes[s]['close'].iloc[-1])) for s in symbols])
+    db_handler.close()
+    return results
+
+
+def run_macro(sizes):
+    import main as app
+
+    results = {}
+    argv = sys.argv
+    sys.argv = [argv[0]]
+    try:
+        for size in sizes:
+            symbols = [f'SYM{i}' for i in range(size)]
+            start = time.perf_counter()
+            result = app.main(symbols)
+            elapsed = time.perf_counter() - start
+            # main() catches its own errors and returns None; a crashed run has no throughput
+            if result is None:
+                results[f'main.{size}'] = {'symbols': size, 'error': 'main() failed; see its output'}
+                continue
+            results[f'main.{size}'] = {
+                'symbols': size,
+                'elapsed_seconds': round(elapsed, 4),
+                'pipeline_seconds': round(result['elapsed_seconds'], 4),
+                'symbols_per_second': round(size / elapsed, 2),
+            }
+    finally:
+        sys.argv = argv
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(old, new):
+    """Print the relative change of the headline metric for every shared benchmark."""
+    for section, metric, higher_is_better in (('micro', 'mean_ms', False), ('macro', 'symbols_per_second', True)):
+        for name, result in new.get(section, {}).items():
+            before = old.get(section, {}).get(name, {}).get(metric)
+            after = result.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = change < 0 if higher_is_better else change > 0
+            flag = ' ⚠' if worse and abs(change) > 0.1 else ''
+            print(f"  {name:<36} {metric} {before:>12,.3f} -> {after:>12,.3f} ({change:+.1%}){flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1,100,10000', help='comma-separated universe sizes for main()')
+    parser.add_argument('--micro-calls', type=int, default=200)
+    parser.add_argument('--api-latency', type=float, default=0.0, help='Finnhub/yfinance stub latency in seconds')
+    parser.add_argument('--llm-latency', type=float, default=0.05, help='Groq stub latency in seconds')
+    parser.add_argument('--embed-latency', type=float, default=0.0, help='embedder stub latency per batch')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='probability a stub API call raises')
+    parser.add_argument('--real-embeddings', action='store_true', help='use sentence_transformers instead of the stub')
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--skip-macro', action='store_true')
+    parser.add_argument('--output', help='results file (default benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    args = parser.parse_args()
+
+    configs = stubs.install(args.api_latency, args.llm_latency, args.embed_latency, args.failure_rate,
+                            embeddings=not args.real_embeddings)
+    # Keep the run offline and independent of earlier runs
+    os.environ.pop('DB_CONNECTION', None)
+    os.environ['LLM_BACKEND'] = 'groq'
+    os.environ['LLM_CACHE_DIR'] = tempfile.mkdtemp(prefix='bench_llm_')
+    os.environ['TRADE_JOURNAL_DIR'] = ''
+    logging.disable(logging.CRITICAL)
+
+    results = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'args': vars(args),
+        },
+    }
+    with contextlib.redirect_stdout(io.StringIO()):
+        if not args.skip_micro:
+            results['micro'] = run_micro(args.micro_calls)
+        if not args.skip_macro:
+            results['macro'] = run_macro([int(size) for size in args.sizes.split(',') if size])
+    results['stubs'] = {name: config.stats() for name, config in configs.items()}
+
+    for section in ('micro', 'macro'):
+        for name, result in results.get(section, {}).items():
+            print(f"{section:<5} {name:<36} {result}")
+
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results', f"{results['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        print(f"Compared with {args.compare} ({old.get('meta', {}).get('commit')}):")
+        compare(old, results)
+
+
+if __name__ == '__main__':
+    main()
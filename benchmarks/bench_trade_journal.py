@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Trade journal benchmark.
+
+Compares the old in-memory trade log (a list of dicts with a datetime per
+trade) against TradeJournal, in memory only and persisted to a temporary
+directory: append cost, memory held (tracemalloc) and the cost of a
+symbol + one-hour range query.
+
+Usage:
+    python benchmarks/bench_trade_journal.py --trades 1000000 --symbols 500
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trade_journal import TradeJournal
+
+START = 1_700_000_000.0
+
+
+def make_trades(n, n_symbols):
+    symbols = [f'SYM{i}' for i in range(n_symbols)]
+    reasons = ['Bullish sentiment', 'Bearish sentiment', 'Mean reversion', 'Stop loss']
+    return [
+        (symbols[i % n_symbols], 'buy' if i % 3 else 'sell', 100.0 + i % 50, 1 + i % 20, reasons[i % len(reasons)], START + i)
+        for i in range(n)
+    ]
+
+
+def append_dicts(trades):
+    log = []
+    for symbol, action, price, quantity, reason, ts in trades:
+        log.append({'timestamp': datetime.fromtimestamp(ts), 'symbol': symbol, 'action': action,
+                    'price': price, 'quantity': quantity, 'reason': reason})
+    return log
+
+
+def append_journal(trades, directory=None):
+    journal = TradeJournal(directory)
+    for symbol, action, price, quantity, reason, ts in trades:
+        journal.append(symbol, action, price, quantity, reason, ts)
+    journal.close()
+    return journal
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trades', type=int, default=1_000_000)
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--queries', type=int, default=1000)
+    args = parser.parse_args()
+
+    trades = make_trades(args.trades, args.symbols)
+    directory = tempfile.mkdtemp(prefix='trade_journal_')
+    try:
+        results = [
+            ('list of dicts', *measure(append_dicts, trades)),
+            ('journal (memory)', *measure(append_journal, trades)),
+            ('journal (disk)', *measure(append_journal, trades, directory)),
+        ]
+        for label, _, elapsed, current in results:
+            print(f"{label:>17}: append {elapsed * 1e6 / args.trades:.2f} us/trade, "
+                  f"{current / 1e6:.1f} MB held ({current / args.trades:.0f} B/trade)")
+
+        log, journal = results[0][1], results[2][1]
+        window = 3600.0
+        for label, query in (
+            ('list of dicts', lambda symbol, lo: [t for t in log if t['symbol'] == symbol and lo <= t['timestamp'].timestamp() <= lo + window]),
+            ('journal', lambda symbol, lo: journal.query(symbol, lo, lo + window)),
+        ):
+            queries = args.queries if label == 'journal' else max(1, args.queries // 100)
+            start = time.perf_counter()
+            for i in range(queries):
+                query(f'SYM{i % args.symbols}', START + (i * 7919) % max(1, args.trades - window))
+            elapsed = time.perf_counter() - start
+            print(f"{label:>17}: symbol + 1h range query {elapsed * 1e6 / queries:.1f} us")
+
+        start = time.perf_counter()
+        reopened = TradeJournal(directory)
+        print(f"reopen {len(reopened):,} trades: {(time.perf_counter() - start) * 1000:.1f} ms "
+              f"({os.path.getsize(os.path.join(directory, TradeJournal.RECORDS_FILE)) / 1e6:.1f} MB on disk)")
+        reopened.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+In-memory vector index benchmark.
+
+Inserts synthetic 384-d embeddings (default 1M) into VectorIndex, checks
+top-k results against a brute-force full sort, and times queries.
+
+Usage:
+    python benchmarks/bench_vector_index.py --n 1000000 --queries 100
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vector_index import VectorIndex
+
+
+def brute_force(vectors, query, k):
+    norms = np.linalg.norm(vectors, axis=1)
+    scores = (vectors @ query) / (norms * np.linalg.norm(query))
+    return np.argsort(-scores, kind='stable')[:k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n', type=int, default=1_000_000)
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--check', type=int, default=10, help='queries to verify against brute force')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.n, args.dim)).astype(np.float32)
+    index = VectorIndex()
+
+    start = time.perf_counter()
+    for i in range(args.n):
+        index.add('strategy', vectors[i], i)
+    insert = time.perf_counter() - start
+    print(f"Inserted {args.n:,} vectors in {insert:.2f}s ({args.n / insert:,.0f} inserts/sec)")
+
+    queries = rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+    for query in queries[:args.check]:
+        expected = brute_force(vectors, query, args.k).tolist()
+        assert index.search('strategy', query, args.k) == expected
+    print(f"Top-{args.k} matches brute force on {min(args.check, args.queries)} queries")
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search('strategy', query, args.k)
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1e3
+    print(f"Query latency over {args.n:,} vectors: p50 {np.percentile(latencies, 50):.2f}ms, "
+          f"p99 {np.percentile(latencies, 99):.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+"""
+Local stand-ins for the external services the agents call.
+
+``install()`` starts a local HTTP server that answers the Finnhub and
+Yahoo chart endpoints and points the market-data client at it. It also
+registers fake ``langchain_groq`` and (optionally) ``sentence_transformers``
+modules in ``sys.modules``; the agents import these lazily through
+``timed_import``, so they pick up the stand-ins without any change. Every
+call sleeps for a configurable latency and fails with a configurable
+probability. Data is deterministic per symbol, so runs are comparable.
+"""
+
+import hashlib
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+import types
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from agents.market_data_client import TokenBucket
+
+
+class StubConfig:
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.failures = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def call(self, name):
+        with self._lock:
+            self.calls += 1
+            fail = self._rng.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise RuntimeError(f"stub {name} failure")
+
+    def stats(self):
+        return {'calls': self.calls, 'failures': self.failures}
+
+
+def _symbol_rng(symbol, salt=''):
+    digest = hashlib.sha1(f'{symbol}:{salt}'.encode('utf-8')).digest()
+    return np.random.default_rng(int.from_bytes(digest[:8], 'little'))
+
+
+@lru_cache(maxsize=None)
+def _daily_bars(symbol, n_bars):
+    # Cached so stub overhead stays out of the measurements; callers must not mutate
+    rng = _symbol_rng(symbol, 'bars')
+    close = rng.uniform(20, 500) * np.exp(np.cumsum(rng.normal(0, 0.02, n_bars)))
+    open_ = close * (1 + rng.normal(0, 0.005, n_bars))
+    index = pd.bdate_range(end=pd.Timestamp.now(tz='UTC').normalize(), periods=n_bars)
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) * 1.005,
+        'Low': np.minimum(open_, close) * 0.995,
+        'Close': close,
+        'Volume': rng.lognormal(13, 0.6, n_bars).round(),
+    }, index=index)
+
+
+HEADLINES = (
+    '{symbol} beats estimates as profit growth stays strong',
+    '{symbol} shares fall after weak guidance',
+    '{symbol} announces product update',
+    'Analysts turn bullish on {symbol} after upgrade',
+    '{symbol} misses revenue forecast, concern over demand',
+    '{symbol} holds annual investor day',
+)
+
+
+class StubFinnhubClient:
+    """Stands in for ``finnhub.Client``: ``quote`` and ``company_news``."""
+
+    config = StubConfig()
+    news_per_day = 2
+
+    def __init__(self, api_key=None):
+        self.api_key = api_key
+
+    def quote(self, symbol):
+        self.config.call('finnhub.quote')
+        last = _daily_bars(symbol, 2).iloc[-1]
+        return {'c': float(last['Close']), 'o': float(last['Open']), 'h': float(last['High']),
+                'l': float(last['Low']), 'pc': float(last['Open']), 't': int(time.time())}
+
+    def company_news(self, symbol, _from, to):
+        self.config.call('finnhub.company_news')
+        rng = _symbol_rng(symbol, 'news')
+        days = pd.date_range(_from, to, freq='D')
+        news = []
+        for day in days:
+            for i in range(self.news_per_day):
+                template = HEADLINES[int(rng.integers(len(HEADLINES)))]
+                news.append({
+                    'id': int(hashlib.sha1(f'{symbol}:{day.date()}:{i}'.encode()).hexdigest()[:12], 16),
+                    'datetime': int(day.timestamp()) + 3600 * (9 + i),
+                    'headline': template.format(symbol=symbol),
+                    'summary': '',
+                })
+        return news
+
+
+class StubTicker:
+    """Stands in for ``yfinance.Ticker``: ``history(period=...)`` or ``history(start=..., end=...)``."""
+
+    config = StubConfig()
+    PERIOD_BARS = {'1d': 1, '5d': 5, '1mo': 21, '3mo': 63, '6mo': 126, '1y': 252, '2y': 504, '5y': 1260}
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def history(self, period='1mo', start=None, end=None):
+        """The last bars of ``period``, or the bars from ``start`` to ``end`` (epoch seconds) when given."""
+        self.config.call('yfinance.history')
+        if start is None:
+            return _daily_bars(self.symbol, self.PERIOD_BARS.get(period, 21))
+        start = pd.Timestamp(start, unit='s', tz='UTC')
+        end = pd.Timestamp.now(tz='UTC') if end is None else pd.Timestamp(end, unit='s', tz='UTC')
+        # Bars always end today, so take enough of them to reach back to start
+        n_bars = max(1, len(pd.bdate_range(start.normalize(), pd.Timestamp.now(tz='UTC').normalize())))
+        bars = _daily_bars(self.symbol, n_bars)
+        return bars[(bars.index >= start) & (bars.index <= end)]
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out in separate writes; without this, Nagle
+        # holds the body back for the client's delayed ACK on kept-alive sockets
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.stub.count('connections')
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        stub = self.server.stub
+        url = urlsplit(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if url.path in ('/api/v1/quote', '/api/v1/company-news'):
+            provider = 'finnhub'
+        elif url.path.startswith('/v8/finance/chart/'):
+            provider = 'yahoo'
+        else:
+            return self._send(404, {'error': 'not found'})
+        if not stub.buckets[provider].try_acquire():
+            stub.count('throttled')
+            return self._send(429, {'error': 'API limit reached'})
+        try:
+            if url.path == '/api/v1/quote':
+                payload = StubFinnhubClient().quote(params['symbol'])
+            elif url.path == '/api/v1/company-news':
+                payload = StubFinnhubClient().company_news(params['symbol'], params['from'], params['to'])
+            else:
+                symbol = unquote(url.path.rsplit('/', 1)[1])
+                if 'period1' in params:
+                    bars = StubTicker(symbol).history(start=int(params['period1']),
+                                                      end=int(params['period2']) if 'period2' in params else None)
+                else:
+                    bars = StubTicker(symbol).history(params.get('range', '1mo'))
+                payload = _chart_payload(bars)
+        except RuntimeError as e:
+            stub.count('errors')
+            return self._send(500, {'error': str(e)})
+        self._send(200, payload)
+
+
+def _chart_payload(bars):
+    return {'chart': {'error': None, 'result': [{
+        'timestamp': [int(ts.timestamp()) for ts in bars.index],
+        'indicators': {'quote': [{
+            'open': bars['Open'].tolist(),
+            'high': bars['High'].tolist(),
+            'low': bars['Low'].tolist(),
+            'close': bars['Close'].tolist(),
+            'volume': bars['Volume'].tolist(),
+        }]},
+    }]}}
+
+
+class StubMarketDataServer:
+    """Local HTTP server for the Finnhub and Yahoo chart endpoints.
+
+    Serves ``/api/v1/quote``, ``/api/v1/company-news`` and
+    ``/v8/finance/chart/<symbol>`` from the stand-in classes above, with
+    keep-alive connections. Above ``quota`` requests per second per
+    provider (0 for no limit) it answers 429, and stand-in failures answer
+    500.
+    """
+
+    def __init__(self, quota=0.0, host='127.0.0.1', port=0):
+        self.buckets = {'finnhub': TokenBucket(quota), 'yahoo': TokenBucket(quota)}
+        self._stats = {'connections': 0, 'throttled': 0, 'errors': 0}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), _StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='stub-market-data', daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class StubChatGroq:
+    """Stands in for ``langchain_groq.ChatGroq``; ``invoke`` returns a message with ``content``."""
+
+    config = StubConfig()
+    RESPONSE = '{"approved": true, "risk_reason": "Stub LLM approval"}'
+
+    def __init__(self, temperature=0, model_name='stub', groq_api_key=None):
+        self.temperature = temperature
+        self.model_name = model_name
+
+    def invoke(self, prompt):
+        self.config.call('groq.invoke')
+        return types.SimpleNamespace(content=self.RESPONSE)
+
+
+class StubSentenceTransformer:
+    """Stands in for ``SentenceTransformer``: deterministic unit vectors per text."""
+
+    config = StubConfig()
+    dim = 384
+
+    def __init__(self, model_name=None):
+        self.model_name = model_name
+
+    def encode(self, texts):
+        self.config.call('sentence_transformers.encode')
+        vectors = np.stack([_symbol_rng(text, 'embed').standard_normal(self.dim) for text in texts]).astype(np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    module.__stub__ = True
+    return module
+
+
+server = None
+
+
+def install(api_latency=0.0, llm_latency=0.0, embed_latency=0.0, failure_rate=0.0, llm_failure_rate=None,
+            embeddings=True, seed=0):
+    """Start the stub server, register the stand-ins and return their configs by service name.
+
+    The market-data client is pointed at the server with rate limiting off
+    and a short retry backoff, so benchmarks measure the agents rather than
+    the quotas of the real providers.
+    """
+    global server
+    configs = {
+        'finnhub': StubConfig(api_latency, failure_rate, seed),
+        'yfinance': StubConfig(api_latency, failure_rate, seed + 1),
+        'groq': StubConfig(llm_latency, failure_rate if llm_failure_rate is None else llm_failure_rate, seed + 2),
+    }
+    StubFinnhubClient.config = configs['finnhub']
+    StubTicker.config = configs['yfinance']
+    StubChatGroq.config = configs['groq']
+    sys.modules['langchain_groq'] = _module('langchain_groq', ChatGroq=StubChatGroq)
+    if server is None:
+        server = StubMarketDataServer()
+    os.environ.update({
+        'FINNHUB_BASE_URL': f'{server.url}/api/v1',
+        'YAHOO_BASE_URL': server.url,
+        'FINNHUB_RATE_LIMIT': '0',
+        'YAHOO_RATE_LIMIT': '0',
+        'MARKET_DATA_BACKOFF': '0.01',
+    })
+    if embeddings:
+        configs['embeddings'] = StubConfig(embed_latency, 0.0, seed + 3)
+        StubSentenceTransformer.config = configs['embeddings']
+        sys.modules['sentence_transformers'] = _module('sentence_transformers', SentenceTransformer=StubSentenceTransformer)
+    return configs
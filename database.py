@@ -1,29 +1,160 @@
 import os
+import re
 import json
+import hashlib
+import threading
+import time
 import numpy as np
 from datetime import datetime
+from agents.embedding_service import get_embedding_service
+from db_pool import ConnectionPool
+from memory_worker import MemoryIngestWorker
+from metrics import metrics
+from profiling import timed_import
+from trade_journal import TradeJournal
+from vector_index import DTYPES, VectorIndex
+from write_buffer import WriteBuffer
+
+
+def _multi_row_insert(cur, statement, columns, rows, suffix=''):
+    """Insert ``rows`` with a single multi-row ``INSERT ... VALUES (...), (...)``."""
+    placeholders = '(' + ', '.join(['%s'] * columns) + ')'
+    values = ', '.join([placeholders] * len(rows))
+    params = [value for row in rows for value in row]
+    cur.execute(f"{statement} VALUES {values}{suffix};", params)
+
+
+def _collapse_memories(rows):
+    """Merge rows with the same (agent_type, content_hash), summing their hit counts.
+
+    One multi-row upsert may not touch the same conflict target twice.
+    """
+    merged = {}
+    for agent_type, vector, metadata, content_hash, hits in rows:
+        key = (agent_type, content_hash)
+        if key in merged:
+            merged[key][4] += hits
+        else:
+            merged[key] = [agent_type, vector, metadata, content_hash, hits]
+    return [tuple(row) for row in merged.values()]
+
+
+AGENT_TYPES = ('market_data', 'sentiment', 'strategy', 'risk')
+ANN_METHODS = ('hnsw', 'ivfflat')
+# pgvector has no int8 vectors: int8 maps to a binary-quantized index. Each
+# entry is (indexed expression, query expression, distance operator, opclass)
+QUANTIZED_INDEXES = {
+    'float16': ('(memory_vector::halfvec(384))', '%s::halfvec(384)', '<->', 'halfvec_l2_ops'),
+    'int8': ('(binary_quantize(memory_vector)::bit(384))', 'binary_quantize(%s::vector)::bit(384)', '<~>', 'bit_hamming_ops'),
+}
+SECONDS_PER_DAY = 86400
+
+
+def load_memory_retention():
+    """Retention limits per agent_type as {agent_type: (max_entries, max_age_days)}.
+
+    MEMORY_MAX_ENTRIES and MEMORY_MAX_AGE_DAYS set the defaults (0 keeps
+    everything); MEMORY_RETENTION holds JSON overrides such as
+    ``{"market_data": {"max_entries": 50000, "max_age_days": 7}}``. The
+    defaults are stored under ``None``.
+    """
+    default = {
+        'max_entries': int(os.getenv('MEMORY_MAX_ENTRIES', '0')),
+        'max_age_days': float(os.getenv('MEMORY_MAX_AGE_DAYS', '0')),
+    }
+    retention = {None: (default['max_entries'], default['max_age_days'])}
+    for agent_type, limits in json.loads(os.getenv('MEMORY_RETENTION') or '{}').items():
+        limits = {**default, **limits}
+        retention[agent_type] = (int(limits['max_entries']), float(limits['max_age_days']))
+    return retention
+
 
 class DatabaseHandler:
-    def __init__(self):
+    def __init__(self, batch_size=None, flush_interval=None, connection_factory=None, pool_size=None, async_memory=None):
         self.conn_string = os.getenv('DB_CONNECTION')
         self.use_db = False
-        self.conn = None
+        self.pool = None
+        self.batch_size = batch_size or int(os.getenv('DB_BATCH_SIZE', '500'))
+        self.flush_interval = flush_interval if flush_interval is not None else float(os.getenv('DB_FLUSH_INTERVAL', '1.0'))
+        pool_size = pool_size or int(os.getenv('DB_POOL_SIZE', '5'))
+        # ANN index settings for agent_memory; DB_ANN_INDEX=none keeps exact scans
+        self.ann_method = os.getenv('DB_ANN_INDEX', 'hnsw').lower()
+        self.hnsw_m = int(os.getenv('DB_HNSW_M', '16'))
+        self.hnsw_ef_construction = int(os.getenv('DB_HNSW_EF_CONSTRUCTION', '64'))
+        self.ivfflat_lists = int(os.getenv('DB_IVFFLAT_LISTS', '100'))
+        self.ef_search = int(os.getenv('DB_HNSW_EF_SEARCH', '40'))
+        self.probes = int(os.getenv('DB_IVFFLAT_PROBES', '1'))
+        self._indexed_agent_types = set()
+        # Quantized memory vectors: float16/int8 shrink the in-memory index
+        # (or the pgvector ANN index), and the top limit * MEMORY_RESCORE
+        # candidates are re-ranked at full precision
+        self.vector_dtype = os.getenv('MEMORY_VECTOR_DTYPE', 'float32').lower()
+        if self.vector_dtype not in DTYPES:
+            raise ValueError(f"Unknown MEMORY_VECTOR_DTYPE: {self.vector_dtype}")
+        self.rescore = int(os.getenv('MEMORY_RESCORE', '4'))
+        self.retention = load_memory_retention()
+        self.compact_interval = float(os.getenv('MEMORY_COMPACT_INTERVAL', '300'))
+        self._last_compaction = time.monotonic()
+        self._compaction_lock = threading.Lock()
         
         try:
-            import psycopg2
-            from pgvector.psycopg2 import register_vector
-            self.conn = psycopg2.connect(self.conn_string)
-            register_vector(self.conn)
-            self.create_tables()
+            self.pool = ConnectionPool(
+                connection_factory or self._connect,
+                minconn=1,
+                maxconn=pool_size,
+                timeout=float(os.getenv('DB_POOL_TIMEOUT', '10')),
+                health_check_interval=float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', '30')),
+            )
             self.use_db = True
+            self.create_tables()
+            # Inserts are buffered and written as multi-row batches; a batch
+            # that keeps failing is set aside in DB_DEAD_LETTER_DIR
+            max_retries = int(os.getenv('DB_WRITE_MAX_RETRIES', '3'))
+            dead_letter_dir = os.getenv('DB_DEAD_LETTER_DIR', '.dead_letter') or None
+            self.trade_writer = WriteBuffer(self._insert_trades, self.batch_size, self.flush_interval, 'trade_logs',
+                                            max_retries, dead_letter_dir)
+            self.memory_writer = WriteBuffer(self._insert_memories, self.batch_size, self.flush_interval, 'agent_memory',
+                                             max_retries, dead_letter_dir)
         except Exception as e:
+            self.use_db = False
+            if self.pool:
+                self.pool.close()
             print(f"Database not available, using in-memory storage: {e}")
-            self.memory_store = []
-            self.trade_logs = []
+            self.memory_index = VectorIndex(
+                dtype=self.vector_dtype,
+                rescore=self.rescore,
+                originals_dir=os.getenv('MEMORY_VECTOR_DIR') or None,
+            )
+            # TRADE_JOURNAL_DIR= (empty) keeps the journal in memory only
+            self.trade_journal = TradeJournal(
+                os.getenv('TRADE_JOURNAL_DIR', '.trade_journal') or None,
+                fsync_interval=float(os.getenv('TRADE_JOURNAL_FSYNC_INTERVAL', '1.0')),
+            )
+
+        # Agents submit memories here; encoding and storing happen off the decision path
+        if async_memory is None:
+            async_memory = os.getenv('MEMORY_WORKER', '1') != '0'
+        self.memory_worker = None
+        if async_memory:
+            self.memory_worker = MemoryIngestWorker(
+                self.store_memory,
+                get_embedding_service(),
+                max_queue=int(os.getenv('MEMORY_QUEUE_SIZE', '10000')),
+                batch_size=int(os.getenv('MEMORY_BATCH_SIZE', '64')),
+                batch_window=float(os.getenv('MEMORY_BATCH_WINDOW', '0.05')),
+                policy=os.getenv('MEMORY_QUEUE_POLICY', 'block'),
+            )
+
+    def _connect(self):
+        psycopg2 = timed_import('psycopg2')
+        pgvector_psycopg2 = timed_import('pgvector.psycopg2')
+        conn = psycopg2.connect(self.conn_string)
+        pgvector_psycopg2.register_vector(conn)
+        return conn
 
     def create_tables(self):
         if self.use_db:
-            with self.conn.cursor() as cur:
+            with self.pool.connection() as conn, conn.cursor() as cur:
                 cur.execute('''
                     CREATE TABLE IF NOT EXISTS trade_logs (
                         id SERIAL PRIMARY KEY,
@@ -40,69 +171,306 @@ class DatabaseHandler:
                         id SERIAL PRIMARY KEY,
                         agent_type TEXT,
                         memory_vector VECTOR(384),
-                        metadata JSONB
+                        metadata JSONB,
+                        content_hash TEXT,
+                        hit_count INT DEFAULT 1,
+                        last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     );
                 ''')
-                self.conn.commit()
+                # Tables created before memories were deduplicated
+                cur.execute('''
+                    ALTER TABLE agent_memory
+                        ADD COLUMN IF NOT EXISTS content_hash TEXT,
+                        ADD COLUMN IF NOT EXISTS hit_count INT DEFAULT 1,
+                        ADD COLUMN IF NOT EXISTS last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+                ''')
+                cur.execute('''
+                    CREATE UNIQUE INDEX IF NOT EXISTS agent_memory_content_idx
+                    ON agent_memory (agent_type, content_hash);
+                ''')
+                conn.commit()
+            for agent_type in AGENT_TYPES:
+                self.ensure_memory_index(agent_type)
+
+    def _memory_index_name(self, agent_type):
+        suffix = '' if self.vector_dtype == 'float32' else f'_{self.vector_dtype}'
+        return f"agent_memory_{re.sub(r'[^a-z0-9_]', '_', agent_type.lower())}_{self.ann_method}{suffix}_idx"
+
+    def ensure_memory_index(self, agent_type):
+        """Create the partial ANN index covering one agent_type's memories.
+
+        Each agent_type gets its own HNSW or IVFFlat index restricted with
+        ``WHERE agent_type = ...``, so a filtered search only walks the graph
+        (or lists) of that agent's vectors. With MEMORY_VECTOR_DTYPE float16
+        or int8 the index covers a halfvec or binary-quantized copy of the
+        vector rather than the vector itself.
+        """
+        if self.ann_method not in ANN_METHODS or agent_type in self._indexed_agent_types:
+            return
+        literal = agent_type.replace("'", "''")
+        if self.ann_method == 'hnsw':
+            options = f"(m = {self.hnsw_m}, ef_construction = {self.hnsw_ef_construction})"
+        else:
+            options = f"(lists = {self.ivfflat_lists})"
+        if self.vector_dtype in QUANTIZED_INDEXES:
+            expression, _, _, opclass = QUANTIZED_INDEXES[self.vector_dtype]
+        else:
+            expression, opclass = 'memory_vector', 'vector_l2_ops'
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(f'''
+                CREATE INDEX IF NOT EXISTS {self._memory_index_name(agent_type)}
+                ON agent_memory USING {self.ann_method} ({expression} {opclass})
+                WITH {options}
+                WHERE agent_type = '{literal}';
+            ''')
+            conn.commit()
+        self._indexed_agent_types.add(agent_type)
+
+    def rebuild_memory_indexes(self, agent_type=None):
+        """Rebuild ANN indexes, e.g. after bulk loads.
+
+        IVFFlat picks its list centroids from the rows present at build time,
+        so an index created on an empty table should be rebuilt once real
+        data has arrived.
+        """
+        if not self.use_db or self.ann_method not in ANN_METHODS:
+            return
+        agent_types = [agent_type] if agent_type else sorted(self._indexed_agent_types)
+        with self.pool.connection() as conn:
+            for name in agent_types:
+                with conn.cursor() as cur:
+                    cur.execute(f"REINDEX INDEX {self._memory_index_name(name)};")
+                conn.commit()
+
+    def _insert_trades(self, rows):
+        with metrics.span('db_commit'):
+            with self.pool.connection() as conn:
+                with conn.cursor() as cur:
+                    _multi_row_insert(cur, 'INSERT INTO trade_logs (timestamp, symbol, action, price, quantity, reason)', 6, rows)
+                conn.commit()
+
+    def _insert_memories(self, rows):
+        with metrics.span('db_commit'):
+            with self.pool.connection() as conn:
+                with conn.cursor() as cur:
+                    # Identical memories collapse into one row with a hit count
+                    _multi_row_insert(
+                        cur, 'INSERT INTO agent_memory (agent_type, memory_vector, metadata, content_hash, hit_count)', 5,
+                        _collapse_memories(rows),
+                        ' ON CONFLICT (agent_type, content_hash) DO UPDATE SET'
+                        ' hit_count = agent_memory.hit_count + EXCLUDED.hit_count, last_seen = CURRENT_TIMESTAMP',
+                    )
+                conn.commit()
 
     def log_trade(self, symbol, action, price, quantity, reason):
         if self.use_db:
-            with self.conn.cursor() as cur:
-                cur.execute('''
-                    INSERT INTO trade_logs (symbol, action, price, quantity, reason)
-                    VALUES (%s, %s, %s, %s, %s);
-                ''', (symbol, action, price, quantity, reason))
-                self.conn.commit()
+            self.trade_writer.add((datetime.now(), symbol, action, price, quantity, reason))
         else:
-            # Store in memory
-            trade_log = {
-                'timestamp': datetime.now(),
-                'symbol': symbol,
-                'action': action,
-                'price': price,
-                'quantity': quantity,
-                'reason': reason
-            }
-            self.trade_logs.append(trade_log)
-            print(f"Trade logged: {trade_log}")
+            self.trade_journal.append(symbol, action, price, quantity, reason)
 
-    def store_memory(self, agent_type, embedding, metadata):
+    def query_trades(self, symbol=None, start=None, end=None):
+        """Journaled trades for ``symbol`` between ``start`` and ``end`` (datetimes) as dicts."""
         if self.use_db:
-            vector = np.array(embedding)
-            with self.conn.cursor() as cur:
-                cur.execute('''
-                    INSERT INTO agent_memory (agent_type, memory_vector, metadata)
-                    VALUES (%s, %s, %s);
-                ''', (agent_type, vector, json.dumps(metadata)))
-                self.conn.commit()
+            self.trade_writer.flush()
+            clauses, params = [], []
+            for clause, value in (('symbol = %s', symbol), ('timestamp >= %s', start), ('timestamp <= %s', end)):
+                if value is not None:
+                    clauses.append(clause)
+                    params.append(value)
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+            with self.pool.connection() as conn, conn.cursor() as cur:
+                cur.execute(f"SELECT timestamp, symbol, action, price, quantity, reason FROM trade_logs {where} ORDER BY id;", params)
+                columns = ('timestamp', 'symbol', 'action', 'price', 'quantity', 'reason')
+                return [dict(zip(columns, row)) for row in cur.fetchall()]
+        records = self.trade_journal.query(
+            symbol,
+            start.timestamp() if start is not None else None,
+            end.timestamp() if end is not None else None,
+        )
+        return self.trade_journal.to_dicts(records)
+
+    def store_memory(self, agent_type, embedding, metadata):
+        """Store a memory; one identical to a stored memory only bumps its hit count."""
+        with metrics.span('store_memory', metadata.get('symbol')):
+            payload = json.dumps(metadata, sort_keys=True, default=str)
+            content_hash = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+            if self.use_db:
+                if agent_type not in self._indexed_agent_types:
+                    self.ensure_memory_index(agent_type)
+                vector = np.array(embedding)
+                self.memory_writer.add((agent_type, vector, payload, content_hash, 1))
+            else:
+                # Store in memory
+                if not self.memory_index.add(agent_type, embedding, metadata, content_hash):
+                    metrics.increment('memory_duplicates_total', agent=agent_type)
+        self._maybe_compact(agent_type)
+
+    def _retention_for(self, agent_type):
+        return self.retention.get(agent_type, self.retention[None])
+
+    def _maybe_compact(self, agent_type):
+        # Compact every agent type each MEMORY_COMPACT_INTERVAL seconds, and an
+        # in-memory partition as soon as it is 25% over its entry limit
+        if not any(max_entries or max_age_days for max_entries, max_age_days in self.retention.values()):
+            return
+        max_entries = self._retention_for(agent_type)[0]
+        if time.monotonic() - self._last_compaction >= self.compact_interval:
+            agent_types = None
+        elif not self.use_db and max_entries and self.memory_index.count(agent_type) > max_entries + max_entries // 4:
+            agent_types = [agent_type]
         else:
-            # Store in memory
-            memory_entry = {
-                'agent_type': agent_type,
-                'embedding': embedding,
-                'metadata': metadata
-            }
-            self.memory_store.append(memory_entry)
-
-    def retrieve_memory(self, agent_type, query_embedding, limit=5):
+            return
+        if self._compaction_lock.acquire(blocking=False):
+            try:
+                self.compact_memories(agent_types)
+            finally:
+                self._compaction_lock.release()
+
+    def compact_memories(self, agent_types=None):
+        """Apply the retention limits; returns the memories removed per agent_type.
+
+        Memories not seen for ``max_age_days`` go first, then all but the
+        ``max_entries`` most recently seen.
+        """
+        if agent_types is None:
+            agent_types = self.memory_index.agent_types() if not self.use_db else self._memory_agent_types()
+            self._last_compaction = time.monotonic()
+        removed = {}
+        for agent_type in agent_types:
+            max_entries, max_age_days = self._retention_for(agent_type)
+            if not max_entries and not max_age_days:
+                continue
+            if self.use_db:
+                removed[agent_type] = self._delete_memories(agent_type, max_entries, max_age_days)
+            else:
+                removed[agent_type] = self.memory_index.compact(
+                    agent_type, max_entries or None, max_age_days * SECONDS_PER_DAY or None,
+                )
+            if removed[agent_type]:
+                metrics.increment('memory_evicted_total', removed[agent_type], agent=agent_type)
+        return removed
+
+    def _memory_agent_types(self):
+        self.memory_writer.flush()
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute('SELECT DISTINCT agent_type FROM agent_memory;')
+            return [row[0] for row in cur.fetchall()]
+
+    def _delete_memories(self, agent_type, max_entries, max_age_days):
+        # Dead rows are reclaimed by autovacuum; the partial ANN index skips them meanwhile
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            removed = 0
+            if max_age_days:
+                cur.execute('''
+                    DELETE FROM agent_memory
+                    WHERE agent_type = %s AND last_seen < CURRENT_TIMESTAMP - make_interval(secs => %s);
+                ''', (agent_type, max_age_days * SECONDS_PER_DAY))
+                removed += cur.rowcount
+            if max_entries:
+                cur.execute('''
+                    DELETE FROM agent_memory WHERE id IN (
+                        SELECT id FROM agent_memory WHERE agent_type = %s
+                        ORDER BY last_seen DESC, id DESC OFFSET %s
+                    );
+                ''', (agent_type, max_entries))
+                removed += cur.rowcount
+            conn.commit()
+        return removed
+
+    def submit_memory(self, agent_type, text, metadata):
+        """Embed ``text`` and store it as a memory, in the background when the worker is on.
+
+        Returns False if the worker's queue was full and the memory dropped.
+        """
+        if self.memory_worker is not None:
+            return self.memory_worker.submit(agent_type, text, metadata)
+        self.store_memory(agent_type, get_embedding_service().encode(text), metadata)
+        return True
+
+    def get_memory_stats(self):
+        """Stored memories and total hits (stores including duplicates) per agent type."""
+        if self.memory_worker is not None:
+            self.memory_worker.flush()
+        if not self.use_db:
+            return self.memory_index.get_stats()
+        self.memory_writer.flush()
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute('SELECT agent_type, COUNT(*), SUM(hit_count) FROM agent_memory GROUP BY agent_type;')
+            return {agent_type: {'entries': entries, 'hits': int(hits or 0)} for agent_type, entries, hits in cur.fetchall()}
+
+    def retrieve_memory(self, agent_type, query_embedding, limit=5, ef_search=None, probes=None):
+        """Return the metadata of the ``limit`` nearest memories for ``agent_type``.
+
+        ``ef_search`` (HNSW) and ``probes`` (IVFFlat) trade recall for latency
+        on this query only; they default to DB_HNSW_EF_SEARCH and
+        DB_IVFFLAT_PROBES.
+        """
+        if self.memory_worker is not None:
+            self.memory_worker.flush()
         if self.use_db:
+            # Make buffered memories visible to the query
+            self.memory_writer.flush()
             vector = np.array(query_embedding)
-            with self.conn.cursor() as cur:
-                cur.execute('''
-                    SELECT metadata FROM agent_memory
-                    WHERE agent_type = %s
-                    ORDER BY memory_vector <-> %s
-                    LIMIT %s;
-                ''', (agent_type, vector, limit))
+            with self.pool.connection() as conn, conn.cursor() as cur:
+                # SET LOCAL only lasts for this transaction, which the pool
+                # rolls back when the connection is returned
+                if self.ann_method == 'hnsw':
+                    cur.execute(f"SET LOCAL hnsw.ef_search = {int(ef_search or self.ef_search)};")
+                elif self.ann_method == 'ivfflat':
+                    cur.execute(f"SET LOCAL ivfflat.probes = {int(probes or self.probes)};")
+                if self.vector_dtype not in QUANTIZED_INDEXES:
+                    cur.execute('''
+                        SELECT metadata FROM agent_memory
+                        WHERE agent_type = %s
+                        ORDER BY memory_vector <-> %s
+                        LIMIT %s;
+                    ''', (agent_type, vector, limit))
+                else:
+                    # Walk the quantized index for candidates, then re-rank them by exact distance
+                    expression, query, operator, _ = QUANTIZED_INDEXES[self.vector_dtype]
+                    cur.execute(f'''
+                        SELECT metadata FROM (
+                            SELECT metadata, memory_vector FROM agent_memory
+                            WHERE agent_type = %s
+                            ORDER BY {expression} {operator} {query}
+                            LIMIT %s
+                        ) candidates
+                        ORDER BY memory_vector <-> %s
+                        LIMIT %s;
+                    ''', (agent_type, vector, limit * max(1, self.rescore), vector, limit))
                 return [row[0] for row in cur.fetchall()]
         else:
-            # Simple in-memory retrieval
-            relevant_memories = [
-                entry['metadata'] for entry in self.memory_store 
-                if entry['agent_type'] == agent_type
-            ]
-            return relevant_memories[:limit]
+            # Top-k cosine similarity over the in-memory index
+            return self.memory_index.search(agent_type, query_embedding, limit)
+
+    def flush(self):
+        """Write all buffered trade and memory rows to the database, or fsync the trade journal."""
+        if self.memory_worker is not None:
+            self.memory_worker.flush()
+        if self.use_db:
+            self.trade_writer.flush()
+            self.memory_writer.flush()
+        else:
+            self.trade_journal.sync()
+
+    def get_pool_stats(self):
+        return self.pool.get_stats() if self.use_db else {}
+
+    def get_write_stats(self):
+        stats = {'memory_worker': self.memory_worker.get_stats()} if self.memory_worker is not None else {}
+        if not self.use_db:
+            stats['trade_journal'] = self.trade_journal.get_stats()
+        else:
+            stats.update({'trade_logs': self.trade_writer.get_stats(), 'agent_memory': self.memory_writer.get_stats()})
+        return stats
 
     def close(self):
-        if self.use_db and self.conn:
-            self.conn.close()
\ No newline at end of file
+        # Drain queued memories while their destination is still open
+        if self.memory_worker is not None:
+            self.memory_worker.close()
+        if self.use_db and self.pool:
+            self.trade_writer.close()
+            self.memory_writer.close()
+            self.pool.close()
+        elif not self.use_db:
+            self.trade_journal.close()
\ No newline at end of file
@@ -0,0 +1,174 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the pool timeout."""
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of DB-API connections.
+
+    ``connect_fn`` opens a new connection, so the pool works the same with
+    psycopg2 or with an in-process stand-in. Connections are checked out for
+    a single operation via ``connection()``. A connection that has been idle
+    for ``health_check_interval`` seconds is pinged before it is handed out,
+    and one that fails the ping or breaks during use is replaced.
+    """
+
+    def __init__(self, connect_fn, minconn=1, maxconn=5, timeout=10.0, health_check_interval=30.0):
+        if minconn > maxconn:
+            raise ValueError("minconn cannot exceed maxconn")
+        self.connect_fn = connect_fn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._idle = []
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._created_at = time.monotonic()
+        self._stats = {
+            'checkouts': 0,
+            'connections_opened': 0,
+            'reconnects': 0,
+            'health_checks': 0,
+            'timeouts': 0,
+            'total_wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+            'busy_seconds': 0.0,
+            'peak_in_use': 0,
+        }
+        for _ in range(minconn):
+            self._idle.append((self._open(), time.monotonic()))
+            self._size += 1
+
+    def _count(self, key):
+        with self._cond:
+            self._stats[key] += 1
+
+    def _open(self):
+        conn = self.connect_fn()
+        self._count('connections_opened')
+        return conn
+
+    @staticmethod
+    def _discard(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn):
+        if getattr(conn, 'closed', False):
+            return False
+        self._count('health_checks')
+        try:
+            cur = conn.cursor()
+            try:
+                cur.execute('SELECT 1')
+                cur.fetchone()
+            finally:
+                cur.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _acquire(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeoutError("Connection pool is closed")
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.maxconn:
+                    self._size += 1
+                    conn, last_used = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeoutError(f"No database connection available after {self.timeout}s")
+                self._cond.wait(remaining)
+            waited = time.monotonic() - start
+            self._stats['checkouts'] += 1
+            self._stats['total_wait_seconds'] += waited
+            self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], waited)
+            in_use = self._size - len(self._idle)
+            self._stats['peak_in_use'] = max(self._stats['peak_in_use'], in_use)
+
+        # Opening and pinging happen outside the lock so they do not block other checkouts
+        try:
+            if conn is None:
+                conn = self._open()
+            elif time.monotonic() - last_used >= self.health_check_interval and not self._is_healthy(conn):
+                self._discard(conn)
+                self._count('reconnects')
+                conn = self._open()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def _release(self, conn, broken=False):
+        with self._cond:
+            if broken or self._closed or getattr(conn, 'closed', False):
+                self._discard(conn)
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for one operation.
+
+        Anything not committed inside the block is rolled back when the
+        connection is returned, so the next user starts with a clean
+        transaction. If the rollback fails the connection is dropped and
+        replaced on a later checkout.
+        """
+        conn = self._acquire()
+        start = time.monotonic()
+        try:
+            yield conn
+        finally:
+            try:
+                conn.rollback()
+                broken = False
+            except Exception:
+                broken = True
+            with self._cond:
+                self._stats['busy_seconds'] += time.monotonic() - start
+            self._release(conn, broken)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['size'] = self._size
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._size - len(self._idle)
+        elapsed = time.monotonic() - self._created_at
+        checkouts = stats['checkouts']
+        stats['max_connections'] = self.maxconn
+        stats['utilization'] = stats['in_use'] / self.maxconn
+        stats['avg_utilization'] = stats['busy_seconds'] / (elapsed * self.maxconn) if elapsed > 0 else 0.0
+        stats['avg_wait_ms'] = stats['total_wait_seconds'] * 1000 / checkouts if checkouts else 0.0
+        return stats
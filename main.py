@@ -18,84 +18,219 @@ License: MIT
 """
 
 import os
-from dotenv import load_dotenv
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from profiling import startup_profile, timed_import
 os.environ["LANGCHAIN_TRACING_V2"] = "false"
 os.environ["OTEL_SDK_DISABLED"] = "true"  # Disable OpenTelemetry
-from crewai import Crew, Process, Task
 
-load_dotenv()
+# Heavy dependencies (crewai, langchain, sentence_transformers, psycopg2)
+# are imported by the agents on first use, not here.
+timed_import('dotenv').load_dotenv()
 from database import DatabaseHandler
 from agents.market_data_agent import MarketDataAgent
 from agents.sentiment_analysis_agent import SentimentAnalysisAgent
 from agents.strategy_agent import StrategyAgent
 from agents.risk_management_agent import RiskManagementAgent
 from agents.trade_execution_agent import TradeExecutionAgent
-import json
+from agents.embedding_service import get_embedding_service
+from streaming import StreamingEngine, make_source
+from metrics import metrics
+from order_manager import OrderManager
+from sim_exchange import SimulatedExchange
 
-def main():
+def fetch_inputs(market_agent, sentiment_agent, symbols, max_workers=8):
+    """Fetch quotes and news for every symbol concurrently.
+
+    Returns a dict mapping each symbol to its (market_data, news) pair.
+    """
+    results = {}
+    # History for symbols seen for the first time comes down in one bulk download
+    market_agent.prefetch(symbols)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        quote_futures = {symbol: executor.submit(market_agent.fetch_stock_data, symbol) for symbol in symbols}
+        news_futures = {symbol: executor.submit(sentiment_agent.fetch_news, symbol) for symbol in symbols}
+        for symbol in symbols:
+            results[symbol] = (quote_futures[symbol].result(), news_futures[symbol].result())
+    market_agent.clear_prefetched()
+    return results
+
+
+def run_pipeline(symbols, agents, current_portfolio, capital, max_workers=8):
+    """Run the full agent pipeline over a list of symbols.
+
+    Network-bound fetches fan out over a bounded thread pool. Strategies are
+    generated symbol by symbol, then sized together in one risk batch, so
+    orders approved earlier in the run count against the sector and gross
+    limits of later ones. Decisions follow the order given, regardless of
+    which fetch finished first.
+    """
+    market_agent, sentiment_agent, strategy_agent, risk_agent, execution_agent = agents
+    symbols = list(dict.fromkeys(symbols))
+    start = time.perf_counter()
+
+    print(f"\n📊 Fetching market data and news for {len(symbols)} symbols...")
+    inputs = fetch_inputs(market_agent, sentiment_agent, symbols, max_workers)
+    # Mark every position the market agent has history for, so exposure limits see real prices
+    risk_agent.risk_engine.update_prices(market_agent.last_prices())
+
+    print("\n📰 Scoring news sentiment...")
+    sentiments = sentiment_agent.analyze_sentiment_batch({symbol: inputs[symbol][1] for symbol in symbols})
+
+    decisions = {}
+    strategies = {}
+    prices = {}
+    for symbol in symbols:
+        market_data, news = inputs[symbol]
+        print(f"\n🚀 {symbol}")
+        market_insights = market_agent.process_data(symbol, market_data)
+        print(f"Market Data: {market_data.to_dict('records')[0]}")
+
+        sentiment_result = sentiments[symbol]
+        print(f"Sentiment: {sentiment_result} ({len(news)} new, {sentiment_agent.news_window_size(symbol)} in window)")
+
+        indicators = market_agent.get_indicators(symbol)
+        strategy = strategy_agent.generate_strategy(symbol, market_data, sentiment_result, indicators)
+        print(f"Strategy: {strategy}")
+
+        strategies[symbol] = strategy
+        prices[symbol] = float(market_data['close'].iloc[-1])
+        decisions[symbol] = {'insights': market_insights, 'sentiment': sentiment_result, 'strategy': strategy}
+
+    print(f"\n⚖️ Evaluating risk for {len(strategies)} strategies...")
+    risk_evals = risk_agent.evaluate_risk_batch(strategies, current_portfolio, capital, prices, screen=True)
+    for symbol in symbols:
+        risk_eval = risk_evals[symbol]
+        print(f"\n{symbol} Risk Evaluation: {risk_eval}")
+
+        if risk_eval.get('approved', False):
+            adjusted_strategy = risk_eval.get('adjusted_strategy', strategies[symbol])
+            execution_agent.execute_trade(symbol, adjusted_strategy, prices[symbol])
+        else:
+            print(f"❌ Trade not approved: {risk_eval.get('risk_reason', 'Unknown reason')}")
+
+        decisions[symbol]['risk'] = risk_eval
+
+    elapsed = time.perf_counter() - start
+    throughput = len(symbols) / elapsed if elapsed > 0 else 0.0
+    print(f"\n⏱️ Processed {len(symbols)} symbols in {elapsed:.2f}s ({throughput:.2f} symbols/sec)")
+    return {'decisions': decisions, 'elapsed_seconds': elapsed, 'symbols_per_second': throughput}
+
+
+def run_stream(source_spec, agents, current_portfolio, capital):
+    """Drive the agents from a bar/tick feed until it ends.
+
+    ``source_spec`` is a replay file (CSV or JSON lines) or ``host:port`` of a
+    socket feed.
+    """
+    source = make_source(source_spec, float(os.getenv('STREAM_SPEED', '0')))
+    engine = StreamingEngine(agents, current_portfolio, capital, queue_size=int(os.getenv('STREAM_QUEUE_SIZE', '1000')))
+    print(f"\n📡 Streaming from {source_spec}...")
+    try:
+        stats = engine.run(source)
+    except KeyboardInterrupt:
+        engine.stop()
+        stats = engine.get_stats()
+    print(f"\n⏱️ Stream stats: {stats}")
+    return stats
+
+
+def main(symbols=None):
+    args = sys.argv[1:]
+    profile_startup = '--profile-startup' in args or os.getenv('PROFILE_STARTUP') == '1'
+    args = [arg for arg in args if arg != '--profile-startup']
+    stream_source = os.getenv('STREAM_SOURCE')
+    if '--stream' in args:
+        i = args.index('--stream')
+        if i + 1 == len(args) or args[i + 1].startswith('--'):
+            raise SystemExit("usage: main.py [--profile-startup] [--stream <path|host:port>] [SYMBOL ...]")
+        stream_source = args[i + 1]
+        args = args[:i] + args[i + 2:]
+    db_handler = order_manager = None
     try:
         # Try to initialize database, but continue without it if it fails
         try:
-            db_handler = DatabaseHandler()
+            with startup_profile.timed('DatabaseHandler'):
+                db_handler = DatabaseHandler()
             print("✓ Database connected successfully")
         except Exception as e:
             print(f"⚠ Database connection failed: {e}")
             print("Continuing without database storage...")
             db_handler = None
         
-        symbol = 'AAPL'
+        if symbols is None:
+            symbols = args or os.getenv('TRADING_SYMBOLS', 'AAPL').split(',')
+        symbols = [symbol.strip().upper() for symbol in symbols if symbol.strip()]
         current_portfolio = {'AAPL': 100, 'GOOGL': 50}
         capital = 100000
+        max_workers = int(os.getenv('PIPELINE_MAX_WORKERS', '8'))
 
-        print(f"\n🚀 Starting trading analysis for {symbol}")
+        print(f"\n🚀 Starting trading analysis for {stream_source or ', '.join(symbols)}")
         print(f"Portfolio: {current_portfolio}")
         print(f"Available Capital: ${capital:,}")
 
         # Initialize agents
-        market_agent = MarketDataAgent(db_handler)
-        sentiment_agent = SentimentAnalysisAgent(db_handler)
-        strategy_agent = StrategyAgent(db_handler)
-        risk_agent = RiskManagementAgent(db_handler)
-        execution_agent = TradeExecutionAgent(db_handler)
-
-        # Step 1: Get market data
-        print("\n📊 Fetching market data...")
-        market_data = market_agent.fetch_stock_data(symbol)
-        market_insights = market_agent.process_data(symbol)
-        print(f"Market Data: {market_data.to_dict('records')[0]}")
-
-        # Step 2: Analyze sentiment
-        print("\n📰 Analyzing market sentiment...")
-        sentiment_result = sentiment_agent.analyze_sentiment(symbol)
-        print(f"Sentiment: {sentiment_result}")
+        agents = []
+        for agent_class in (MarketDataAgent, SentimentAnalysisAgent, StrategyAgent, RiskManagementAgent):
+            with startup_profile.timed(agent_class.__name__):
+                agents.append(agent_class(db_handler))
+        # SIM_EXCHANGE=1 routes orders through the order manager to a local
+        # simulated venue, whose fills update the portfolio
+        if os.getenv('SIM_EXCHANGE') == '1':
+            exchange = SimulatedExchange(
+                latency=float(os.getenv('SIM_EXCHANGE_LATENCY', '0.001')),
+                liquidity=int(os.getenv('SIM_EXCHANGE_LIQUIDITY', '1000')),
+                slippage_bps=float(os.getenv('SIM_EXCHANGE_SLIPPAGE_BPS', '0')),
+            )
+            order_manager = OrderManager(exchange, current_portfolio, db_handler, agents[3].risk_engine,
+                                         max_queue=int(os.getenv('ORDER_QUEUE_SIZE', '10000')))
+        with startup_profile.timed(TradeExecutionAgent.__name__):
+            agents.append(TradeExecutionAgent(db_handler, order_manager))
 
-        # Step 3: Generate strategy
-        print("\n🎯 Generating trading strategy...")
-        strategy = strategy_agent.generate_strategy(symbol, market_data, sentiment_result)
-        print(f"Strategy: {strategy}")
-
-        # Step 4: Risk evaluation
-        print("\n⚖️ Evaluating risk...")
-        risk_eval = risk_agent.evaluate_risk(symbol, strategy, current_portfolio, capital)
-        print(f"Risk Evaluation: {risk_eval}")
+        if profile_startup:
+            budget = os.getenv('STARTUP_BUDGET_SECONDS')
+            startup_profile.print_report(float(budget) if budget else None)
 
-        # Step 5: Execute trade if approved
-        print("\n💼 Trade execution decision...")
-        if risk_eval.get('approved', False):
-            price = market_data['close'].iloc[-1]
-            adjusted_strategy = risk_eval.get('adjusted_strategy', strategy)
-            execution_agent.execute_trade(symbol, adjusted_strategy, price)
-            print("✅ Trade executed successfully!")
+        if stream_source:
+            result = run_stream(stream_source, agents, current_portfolio, capital)
         else:
-            print(f"❌ Trade not approved: {risk_eval.get('risk_reason', 'Unknown reason')}")
+            result = run_pipeline(symbols, agents, current_portfolio, capital, max_workers)
+
+        if order_manager is not None:
+            order_manager.close()
+            print(f"\n📬 Order stats: {order_manager.get_stats()}, venue: {order_manager.exchange.get_stats()}")
+            print(f"Portfolio: {current_portfolio}")
+        print(f"\n🧮 Embedding stats: {get_embedding_service().get_stats()}")
+        print(f"🗄️ Quote cache stats: {agents[0].get_cache_stats()}")
+        print(f"🌐 Market data client stats: {agents[0].client.get_stats()}")
+        print(f"📰 News stats: {agents[1].get_news_stats()}")
+        print(f"🤖 LLM cache stats: {agents[3].response_cache.get_stats()}")
+        print(f"📈 Stage metrics: {metrics.summary()}")
 
         if db_handler:
+            print(f"🧠 Memory stats: {db_handler.get_memory_stats()}")
             db_handler.close()
-            
+            print(f"💾 DB write stats: {db_handler.get_write_stats()}")
+            print(f"🔌 DB pool stats: {db_handler.get_pool_stats()}")
+
+        # METRICS_EXPORT=metrics.prom writes Prometheus text, any other path JSON lines
+        if os.getenv('METRICS_EXPORT'):
+            metrics.export(os.getenv('METRICS_EXPORT'))
+        return result
+
     except Exception as e:
         print(f"❌ Error in main execution: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        # A failed run still routes queued orders, drains the memory ingest
+        # worker and flushes buffered writes (db_handler.close() drains the
+        # worker first); both closes are no-ops after a clean run
+        if order_manager is not None:
+            order_manager.close()
+        if db_handler:
+            db_handler.close()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
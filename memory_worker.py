@@ -0,0 +1,141 @@
+import queue
+import threading
+import time
+
+from metrics import metrics
+
+POLICIES = ('block', 'drop')
+_STOP = object()
+
+
+class MemoryIngestWorker:
+    """Embeds and stores agent memories on a background thread.
+
+    ``submit`` puts (agent_type, text, metadata) on a bounded queue and
+    returns at once. The worker takes up to ``batch_size`` items at a time,
+    waiting up to ``batch_window`` seconds for a batch to fill, encodes them
+    with one ``encode_batch`` call and hands each vector to ``store_fn``.
+
+    When the queue is full, the ``block`` policy makes ``submit`` wait for
+    room and the ``drop`` policy discards the memory and counts it.
+    ``errors`` counts memories, not batches, that could not be embedded or
+    stored. ``close()`` stops intake and drains everything already queued.
+    """
+
+    def __init__(self, store_fn, embedder, max_queue=10000, batch_size=64, batch_window=0.05, policy='block'):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy: {policy}")
+        self.store_fn = store_fn
+        self.embedder = embedder
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.policy = policy
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'submitted': 0,
+            'dropped': 0,
+            'stored': 0,
+            'batches': 0,
+            'errors': 0,
+            'max_depth': 0,
+            'blocked_seconds': 0.0,
+        }
+        self._thread = threading.Thread(target=self._run, name='memory-ingest', daemon=True)
+        self._thread.start()
+
+    def submit(self, agent_type, text, metadata):
+        """Queue a memory; returns False if it was dropped."""
+        if self._closed:
+            raise RuntimeError("MemoryIngestWorker is closed")
+        item = (agent_type, text, metadata)
+        blocked = 0.0
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            if self.policy == 'drop':
+                with self._stats_lock:
+                    self._stats['dropped'] += 1
+                metrics.increment('memory_dropped_total', agent=agent_type)
+                return False
+            start = time.perf_counter()
+            self._queue.put(item)
+            blocked = time.perf_counter() - start
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self._stats['submitted'] += 1
+            self._stats['blocked_seconds'] += blocked
+            self._stats['max_depth'] = max(self._stats['max_depth'], depth)
+        return True
+
+    def _next_batch(self):
+        item = self._queue.get()
+        batch = [item]
+        if item is _STOP:
+            return batch
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is _STOP:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            stop = batch[-1] is _STOP
+            items = batch[:-1] if stop else batch
+            if items:
+                self._ingest(items)
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _ingest(self, items):
+        try:
+            vectors = self.embedder.encode_batch([text for _, text, _ in items])
+        except Exception as e:
+            print(f"Memory ingestion error: {e}")
+            metrics.increment('memory_ingest_errors_total', len(items))
+            with self._stats_lock:
+                self._stats['errors'] += len(items)
+            return
+        stored = 0
+        # One failed store must not cost the rest of the batch
+        for (agent_type, _, metadata), vector in zip(items, vectors):
+            try:
+                self.store_fn(agent_type, vector, metadata)
+                stored += 1
+            except Exception as e:
+                print(f"Memory store error for {agent_type}: {e}")
+                metrics.increment('memory_ingest_errors_total')
+        with self._stats_lock:
+            self._stats['stored'] += stored
+            self._stats['errors'] += len(items) - stored
+            self._stats['batches'] += 1
+
+    def flush(self):
+        """Wait until every queued memory has been stored."""
+        self._queue.join()
+
+    def close(self):
+        """Stop accepting memories and drain the queue."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['pending'] = self._queue.qsize()
+        stats['policy'] = self.policy
+        return stats
@@ -0,0 +1,186 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+# Latency buckets in seconds, 50us to 10s
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape_label_value(value):
+    # Prometheus text format: backslash, double quote and newline are escaped
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + '}'
+
+
+class Histogram:
+    """Fixed-bucket histogram; ``observe`` is a bisect and two additions."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile."""
+        if not self.count:
+            return None
+        target = q * self.count
+        running = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            running += count
+            if running >= target:
+                return bound
+        return float('inf')
+
+
+class Metrics:
+    """Counters, latency histograms and per-symbol spans for the agents.
+
+    Stages are timed with ``span(stage, symbol)``; each span feeds the
+    ``agent_stage_seconds`` histogram for its stage and is kept in a bounded
+    buffer for JSON-lines export. Fallbacks and failures are counted with
+    ``increment``. Set METRICS_ENABLED=0 to turn recording off.
+    """
+
+    def __init__(self, enabled=True, span_buffer=10000, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self.counters = {}
+        self.histograms = {}
+        self.spans = deque(maxlen=span_buffer)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage, symbol=None):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            self.observe('agent_stage_seconds', duration, stage=stage)
+            record = {'stage': stage, 'symbol': symbol, 'start': time.time() - duration, 'seconds': duration}
+            if error:
+                record['error'] = error
+                self.increment('agent_stage_errors_total', stage=stage)
+            self.spans.append(record)
+
+    def increment(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def summary(self):
+        """Count, mean and approximate p50/p95/p99 (ms) per stage, plus counters."""
+        with self._lock:
+            stages = {}
+            for (name, key), histogram in self.histograms.items():
+                if name != 'agent_stage_seconds':
+                    continue
+                stages[dict(key)['stage']] = {
+                    'count': histogram.count,
+                    'mean_ms': round(histogram.total * 1000 / histogram.count, 3),
+                    'p50_ms': histogram.quantile(0.5) * 1000,
+                    'p95_ms': histogram.quantile(0.95) * 1000,
+                    'p99_ms': histogram.quantile(0.99) * 1000,
+                }
+            counters = {name + _format_labels(key): value for (name, key), value in sorted(self.counters.items())}
+        return {'stages': stages, 'counters': counters}
+
+    def export_prometheus(self):
+        """Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+            typed = set()
+            for (name, key), value in counters:
+                if name not in typed:
+                    lines.append(f'# TYPE {name} counter')
+                    typed.add(name)
+                lines.append(f'{name}{_format_labels(key)} {value}')
+            for (name, key), histogram in histograms:
+                if name not in typed:
+                    lines.append(f'# TYPE {name} histogram')
+                    typed.add(name)
+                running = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    running += count
+                    lines.append(f'{name}_bucket{_format_labels(key, [("le", bound)])} {running}')
+                lines.append(f'{name}_bucket{_format_labels(key, [("le", "+Inf")])} {histogram.count}')
+                lines.append(f'{name}_sum{_format_labels(key)} {histogram.total}')
+                lines.append(f'{name}_count{_format_labels(key)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def export_json_lines(self, f):
+        """Write buffered spans, then one line per counter and histogram, to file ``f``."""
+        with self._lock:
+            spans = list(self.spans)
+            counters = list(self.counters.items())
+            histograms = [(key, list(h.counts), h.total, h.count) for key, h in self.histograms.items()]
+        for span in spans:
+            f.write(json.dumps({'type': 'span', **span}) + '\n')
+        for (name, key), value in counters:
+            f.write(json.dumps({'type': 'counter', 'name': name, 'labels': dict(key), 'value': value}) + '\n')
+        for (name, key), counts, total, count in histograms:
+            f.write(json.dumps({'type': 'histogram', 'name': name, 'labels': dict(key), 'buckets': list(self.buckets),
+                                'counts': counts, 'sum': total, 'count': count}) + '\n')
+
+    def export(self, path):
+        """Write to ``path``: Prometheus text for ``.prom``/``.txt``, JSON lines otherwise."""
+        with open(path, 'w') as f:
+            if path.endswith(('.prom', '.txt')):
+                f.write(self.export_prometheus())
+            else:
+                self.export_json_lines(f)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.spans.clear()
+
+
+metrics = Metrics(
+    enabled=os.getenv('METRICS_ENABLED', '1') != '0',
+    span_buffer=int(os.getenv('METRICS_SPAN_BUFFER', '10000')),
+)
@@ -0,0 +1,226 @@
+import itertools
+import threading
+import time
+from collections import Counter, deque
+
+from metrics import metrics
+
+
+class OrderManager:
+    """Non-blocking order queue that nets orders per symbol and routes them to a venue.
+
+    ``submit`` appends an order to a bounded queue and returns its id at
+    once; a full queue rejects the order. A router thread wakes up, waits
+    ``batch_window`` seconds for more orders and takes up to ``batch_size``
+    of them. It nets each symbol's buys against its sells and sends one
+    order per symbol for the remainder. The shares that cancel out are
+    crossed internally at the batch's price and never reach the venue;
+    they are logged as one internal fill per original order.
+
+    Fills reported by the venue update ``portfolio`` (a {symbol: shares}
+    dict, changed in place), ``risk_engine`` positions and the trade log
+    of ``db_handler``.
+    """
+
+    def __init__(self, exchange, portfolio=None, db_handler=None, risk_engine=None, max_queue=10000,
+                 batch_size=256, batch_window=0.001):
+        self.exchange = exchange
+        self.exchange.on_fills = self._on_fills
+        self.portfolio = portfolio if portfolio is not None else {}
+        self.db_handler = db_handler
+        self.risk_engine = risk_engine
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        # deque append/popleft are atomic, so submit takes no lock
+        self._pending = deque()
+        self._ids = itertools.count(1)
+        self._wakeup = threading.Event()
+        self._open = {}
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._closed = False
+        self._routing = False
+        self._rejected = Counter()
+        self._stats = {
+            'routed': 0,
+            'batches': 0,
+            'net_orders': 0,
+            'net_shares': 0,
+            'crossed_shares': 0,
+            'internal_fills': 0,
+            'fills': 0,
+            'filled_shares': 0,
+            'completed_orders': 0,
+        }
+        self._thread = threading.Thread(target=self._run, name='order-router', daemon=True)
+        self._thread.start()
+
+    def submit(self, symbol, side, quantity, price, reason=''):
+        """Queue a market order; returns its id, or None if it was rejected.
+
+        Orders are rejected when the queue is full or the side or quantity
+        is invalid.
+        """
+        if self._closed:
+            raise RuntimeError("OrderManager is closed")
+        if side not in ('buy', 'sell') or quantity <= 0:
+            return self._reject('invalid')
+        if len(self._pending) >= self.max_queue:
+            return self._reject('queue_full')
+        order_id = next(self._ids)
+        self._pending.append((order_id, symbol, side, quantity, price, reason))
+        if not self._wakeup.is_set():
+            self._wakeup.set()
+        return order_id
+
+    def _reject(self, reason):
+        self._rejected[reason] += 1
+        metrics.increment('orders_rejected_total', reason=reason)
+        return None
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            if self.batch_window > 0 and not self._closed:
+                time.sleep(self.batch_window)
+            self._wakeup.clear()
+            # Set before popping so flush never sees an order in neither place
+            self._routing = True
+            while self._pending:
+                batch = []
+                while self._pending and len(batch) < self.batch_size:
+                    batch.append(self._pending.popleft())
+                try:
+                    self._route(batch)
+                except Exception as e:
+                    print(f"Order routing error: {e}")
+                    metrics.increment('order_routing_errors_total')
+            with self._lock:
+                self._routing = False
+                self._idle.notify_all()
+                if self._closed and not self._pending:
+                    return
+
+    def _route(self, orders):
+        net = {}
+        for order_id, symbol, side, quantity, price, reason in orders:
+            entry = net.get(symbol)
+            if entry is None:
+                entry = net[symbol] = [0, price, []]
+            entry[0] += quantity if side == 'buy' else -quantity
+            entry[1] = price
+            entry[2].append((side, quantity, reason))
+        routed = []
+        crossed = []
+        with self._lock:
+            self._stats['routed'] += len(orders)
+            self._stats['batches'] += 1
+            for symbol, (shares, price, legs) in net.items():
+                crossed.extend(self._cross(symbol, shares, price, legs))
+                if not shares:
+                    continue
+                parent_id = next(self._ids)
+                side = 'buy' if shares > 0 else 'sell'
+                self._open[parent_id] = {
+                    'symbol': symbol, 'side': side, 'quantity': abs(shares), 'filled': 0,
+                    'reason': legs[0][2] if len(legs) == 1 else f"Net of {len(legs)} orders",
+                }
+                routed.append((parent_id, symbol, side, abs(shares), price))
+            self._stats['crossed_shares'] += sum(fill[3] for fill in crossed)
+            self._stats['internal_fills'] += len(crossed)
+            self._stats['net_orders'] += len(routed)
+            self._stats['net_shares'] += sum(order[3] for order in routed)
+        metrics.increment('orders_routed_total', len(orders))
+        if crossed:
+            metrics.increment('order_internal_fills_total', len(crossed))
+            # Crossed legs cancel out, so only the trade log sees them
+            if self.db_handler is not None:
+                for symbol, side, price, quantity, reason in crossed:
+                    self.db_handler.log_trade(symbol, side, price, quantity, reason)
+        if routed:
+            self.exchange.submit_batch(routed)
+
+    @staticmethod
+    def _cross(symbol, shares, price, legs):
+        """Internal fills for the part of each order matched against the other side, at ``price``.
+
+        Orders on the smaller side are crossed in full; the larger side
+        covers them first-come, and its remainder is what goes to the venue.
+        """
+        minority = 'sell' if shares > 0 else 'buy' if shares < 0 else None
+        remaining = sum(quantity for side, quantity, _ in legs if side == minority) if minority else None
+        fills = []
+        for side, quantity, reason in legs:
+            if side == minority or remaining is None:
+                matched = quantity
+            else:
+                matched = min(quantity, remaining)
+                remaining -= matched
+            if matched:
+                fills.append((symbol, side, price, matched, f"{reason} (crossed internally)" if reason else 'Crossed internally'))
+        return fills
+
+    def _on_fills(self, fills):
+        signed = []
+        logs = []
+        with self._lock:
+            portfolio = self.portfolio
+            for fill in fills:
+                symbol, quantity = fill['symbol'], fill['quantity']
+                shares = quantity if fill['side'] == 'buy' else -quantity
+                signed.append(shares)
+                position = portfolio.get(symbol, 0) + shares
+                if position:
+                    portfolio[symbol] = position
+                else:
+                    portfolio.pop(symbol, None)
+                order = self._open.get(fill['order_id'])
+                logs.append(order['reason'] if order else '')
+                if order is not None:
+                    order['filled'] += quantity
+                    if order['filled'] >= order['quantity']:
+                        del self._open[fill['order_id']]
+                        self._stats['completed_orders'] += 1
+            self._stats['fills'] += len(fills)
+            self._stats['filled_shares'] += sum(abs(shares) for shares in signed)
+            self._idle.notify_all()
+        if self.risk_engine is not None:
+            self.risk_engine.apply_fills([fill['symbol'] for fill in fills], signed, [fill['price'] for fill in fills])
+        if self.db_handler is not None:
+            for fill, reason in zip(fills, logs):
+                self.db_handler.log_trade(fill['symbol'], fill['side'], fill['price'], fill['quantity'], reason)
+        metrics.increment('order_fills_total', len(fills))
+
+    def open_orders(self):
+        with self._lock:
+            return len(self._open)
+
+    def flush(self, timeout=None):
+        """Wait until every submitted order has been routed and filled; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._pending or self._routing or self._open:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                # Woken after each routing pass and each batch of fills
+                self._idle.wait(remaining if remaining is not None else 0.05)
+        return True
+
+    def close(self):
+        """Stop taking orders, route what is queued and wait for the venue to fill it."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self.exchange.close()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['open_orders'] = len(self._open)
+        stats['queued'] = len(self._pending)
+        stats['rejected'] = sum(self._rejected.values())
+        return stats
@@ -0,0 +1,302 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+# Sectors for common large caps; RISK_SECTOR_MAP points at a JSON
+# {symbol: sector} file to extend or override them. A symbol without a
+# sector counts as a sector of its own.
+DEFAULT_SECTORS = {
+    'AAPL': 'Technology', 'MSFT': 'Technology', 'NVDA': 'Technology', 'AMD': 'Technology',
+    'INTC': 'Technology', 'ORCL': 'Technology', 'CRM': 'Technology', 'ADBE': 'Technology',
+    'GOOGL': 'Communication Services', 'GOOG': 'Communication Services', 'META': 'Communication Services',
+    'NFLX': 'Communication Services', 'DIS': 'Communication Services',
+    'AMZN': 'Consumer Discretionary', 'TSLA': 'Consumer Discretionary', 'HD': 'Consumer Discretionary',
+    'NKE': 'Consumer Discretionary', 'MCD': 'Consumer Discretionary',
+    'JPM': 'Financials', 'BAC': 'Financials', 'GS': 'Financials', 'V': 'Financials', 'MA': 'Financials',
+    'JNJ': 'Health Care', 'PFE': 'Health Care', 'UNH': 'Health Care', 'MRK': 'Health Care',
+    'XOM': 'Energy', 'CVX': 'Energy',
+    'WMT': 'Consumer Staples', 'KO': 'Consumer Staples', 'PG': 'Consumer Staples', 'PEP': 'Consumer Staples',
+}
+
+# Reason codes returned by PortfolioRiskEngine.evaluate
+OK, POSITION_LIMIT, SECTOR_LIMIT, GROSS_LIMIT, STOP_LOSS, NO_PRICE, NO_POSITION = range(7)
+REASONS = (
+    'Risk within acceptable limits',
+    'Position exposure limit',
+    'Sector concentration limit',
+    'Gross exposure limit',
+    'Stop-loss triggered',
+    'No price available',
+    'No position to sell',
+)
+
+
+def load_sector_map(path=None):
+    sectors = dict(DEFAULT_SECTORS)
+    path = path or os.getenv('RISK_SECTOR_MAP')
+    if path:
+        with open(path) as f:
+            sectors.update({symbol.upper(): sector for symbol, sector in json.load(f).items()})
+    return sectors
+
+
+def _fill_in_order(groups, demand, room):
+    """Greedy first-come allocation of ``demand`` against each group's ``room``.
+
+    Candidates are served in input order within their group; returns the
+    amount each one gets.
+    """
+    if not len(demand):
+        return demand
+    order = np.argsort(groups, kind='stable')
+    sorted_groups = groups[order]
+    sorted_demand = demand[order]
+    before = np.cumsum(sorted_demand) - sorted_demand
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    prior = before - np.repeat(before[starts], np.diff(np.r_[starts, len(sorted_groups)]))
+    filled = np.clip(room[sorted_groups] - prior, 0, sorted_demand)
+    out = np.empty_like(filled)
+    out[order] = filled
+    return out
+
+
+class PortfolioRiskEngine:
+    """Array-backed portfolio limits for batches of candidate orders.
+
+    Positions, average entry prices, last prices and sector ids are parallel
+    arrays indexed by symbol. ``evaluate`` checks a whole batch of signed
+    order quantities in one vectorized pass against:
+
+    - per-position exposure of ``max_position_pct`` of capital,
+    - per-sector exposure of ``max_sector_pct`` of capital,
+    - gross exposure of ``max_gross_pct`` of capital,
+    - a stop-loss ``stop_loss_pct`` below the average entry price, which
+      blocks adding to the position.
+
+    Orders that reduce a position are always allowed up to its size. Orders
+    compete for the remaining room in the order given.
+
+    Approved orders that have not filled yet can be held with ``reserve``;
+    limits then count them as part of the position until ``apply_fills``
+    releases them, or ``release`` drops an order that will not fill. ``sync_positions`` leaves reservations in place.
+    """
+
+    def __init__(self, capital=100000, max_position_pct=0.10, max_sector_pct=0.25, max_gross_pct=1.0,
+                 stop_loss_pct=0.05, sectors=None, allow_short=False, initial_capacity=256):
+        self.capital = capital
+        self.max_position_pct = max_position_pct
+        self.max_sector_pct = max_sector_pct
+        self.max_gross_pct = max_gross_pct
+        self.stop_loss_pct = stop_loss_pct
+        self.allow_short = allow_short
+        self.sector_map = load_sector_map() if sectors is None else sectors
+        self.symbols = []
+        self._index = {}
+        self._sector_ids = {}
+        self.positions = np.zeros(initial_capacity)
+        self.entry_prices = np.full(initial_capacity, np.nan)
+        self.prices = np.full(initial_capacity, np.nan)
+        self.sectors = np.zeros(initial_capacity, dtype=np.int64)
+        # Signed shares approved but not yet filled
+        self.reserved = np.zeros(initial_capacity)
+        self._lock = threading.Lock()
+
+    def _grow(self, needed):
+        capacity = len(self.positions)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        for name, fill in (('positions', 0.0), ('entry_prices', np.nan), ('prices', np.nan), ('sectors', 0),
+                           ('reserved', 0.0)):
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:len(self.symbols)] = old[:len(self.symbols)]
+            setattr(self, name, new)
+
+    def _indices(self, symbols):
+        index = self._index
+        missing = [symbol for symbol in dict.fromkeys(symbols) if symbol not in index]
+        if missing:
+            self._grow(len(self.symbols) + len(missing))
+            for symbol in missing:
+                i = len(self.symbols)
+                index[symbol] = i
+                self.symbols.append(symbol)
+                sector = self.sector_map.get(symbol, symbol)
+                self.sectors[i] = self._sector_ids.setdefault(sector, len(self._sector_ids))
+        return np.fromiter((index[symbol] for symbol in symbols), dtype=np.int64, count=len(symbols))
+
+    def update_prices(self, prices):
+        """Set last prices from a {symbol: price} dict.
+
+        A position without an entry price takes its first known price as
+        entry.
+        """
+        with self._lock:
+            idx = self._indices(list(prices))
+            self.prices[idx] = np.fromiter(prices.values(), dtype=np.float64, count=len(prices))
+            unknown_entry = idx[np.isnan(self.entry_prices[idx]) & (self.positions[idx] != 0)]
+            self.entry_prices[unknown_entry] = self.prices[unknown_entry]
+
+    def sync_positions(self, portfolio, entry_prices=None):
+        """Replace positions with a {symbol: quantity} dict."""
+        # Copy first: an OrderManager may be filling into the same dict
+        portfolio = dict(portfolio)
+        with self._lock:
+            n = len(self.symbols)
+            idx = self._indices(list(portfolio))
+            quantities = np.fromiter(portfolio.values(), dtype=np.float64, count=len(portfolio))
+            # Positions opened outside apply_fills take the last price as entry
+            opened = (self.positions[idx] != quantities) & (np.isnan(self.entry_prices[idx]) | (self.positions[idx] == 0))
+            held = np.zeros(len(self.symbols), dtype=bool)
+            held[idx] = True
+            # Drop positions that are no longer in the portfolio
+            self.positions[:n][~held[:n]] = 0
+            self.entry_prices[:n][~held[:n]] = np.nan
+            self.entry_prices[idx[opened]] = self.prices[idx[opened]]
+            self.positions[idx] = quantities
+            if entry_prices:
+                entry_idx = self._indices(list(entry_prices))
+                self.entry_prices[entry_idx] = list(entry_prices.values())
+
+    def reserve(self, symbols, quantities):
+        """Hold signed order quantities against the limits until they fill."""
+        with self._lock:
+            np.add.at(self.reserved, self._indices(list(symbols)), np.asarray(quantities, dtype=np.float64))
+
+    def release(self, symbols, quantities):
+        """Drop reservations for signed quantities that will never fill."""
+        with self._lock:
+            for i, quantity in zip(self._indices(list(symbols)), quantities):
+                self._release(i, quantity)
+
+    def _release(self, i, quantity):
+        reserved = self.reserved[i]
+        if reserved * quantity > 0:
+            self.reserved[i] = reserved - np.sign(reserved) * min(abs(reserved), abs(quantity))
+
+    def apply_fills(self, symbols, quantities, prices):
+        """Update positions and average entry prices with executed fills.
+
+        Each fill also releases up to its quantity of a reservation on the
+        same side.
+        """
+        with self._lock:
+            for i, quantity, price in zip(self._indices(list(symbols)), quantities, prices):
+                self._release(i, quantity)
+                position = self.positions[i]
+                new_position = position + quantity
+                if new_position == 0:
+                    self.entry_prices[i] = np.nan
+                elif position == 0 or np.sign(new_position) != np.sign(position):
+                    self.entry_prices[i] = price
+                elif np.sign(quantity) == np.sign(position):
+                    self.entry_prices[i] = (position * self.entry_prices[i] + quantity * price) / new_position
+                self.positions[i] = new_position
+                self.prices[i] = price
+
+    def position(self, symbol):
+        i = self._index.get(symbol)
+        return float(self.positions[i]) if i is not None else 0.0
+
+    def stopped(self, symbols=None):
+        """Boolean mask of positions trading ``stop_loss_pct`` or more against their entry."""
+        with self._lock:
+            idx = np.arange(len(self.symbols)) if symbols is None else self._indices(list(symbols))
+            return self._stopped(idx)
+
+    def _stopped(self, idx):
+        position, price, entry = self.positions[idx], self.prices[idx], self.entry_prices[idx]
+        with np.errstate(invalid='ignore'):
+            return (((position > 0) & (price <= entry * (1 - self.stop_loss_pct))) |
+                    ((position < 0) & (price >= entry * (1 + self.stop_loss_pct))))
+
+    def stop_loss_orders(self):
+        """{symbol: quantity} orders that close every stopped-out position."""
+        with self._lock:
+            idx = np.flatnonzero(self._stopped(np.arange(len(self.symbols))))
+            return {self.symbols[i]: -float(self.positions[i]) for i in idx}
+
+    def evaluate(self, symbols, quantities, prices=None):
+        """Check a batch of signed order quantities (buy > 0, sell < 0).
+
+        ``prices`` (array or dict) overrides the last known prices for this
+        call only. Returns arrays ``quantity`` (approved signed shares),
+        ``approved``, ``reason`` (index into REASONS) and ``stopped``.
+        """
+        with self._lock:
+            idx = self._indices(list(symbols))
+            requested = np.asarray(quantities, dtype=np.float64)
+            if prices is None:
+                price = self.prices[idx]
+            elif isinstance(prices, dict):
+                price = np.array([prices.get(symbol, np.nan) for symbol in symbols], dtype=np.float64)
+                price = np.where(np.isnan(price), self.prices[idx], price)
+            else:
+                price = np.asarray(prices, dtype=np.float64)
+            n_symbols = len(self.symbols)
+            # Reserved orders count as held; the stop-loss looks at actual positions
+            held = self.positions[:n_symbols] + self.reserved[:n_symbols]
+            position = held[idx]
+            stopped = self._stopped(idx)
+
+            direction = np.sign(requested)
+            size = np.abs(requested)
+            reason = np.full(len(idx), OK)
+            has_price = price > 0
+
+            # The part of an order that shrinks the existing position needs no price
+            reduces = (direction != 0) & (direction == -np.sign(position))
+            reduce_room = np.abs(held)
+            reduce = _fill_in_order(idx, np.where(reduces, size, 0.0), reduce_room)
+            increase = size - reduce
+            if not self.allow_short:
+                reason[(direction < 0) & (increase > 0) & (reduce == 0)] = NO_POSITION
+                increase = np.where(direction < 0, 0.0, increase)
+            reason[stopped & (increase > 0)] = STOP_LOSS
+            increase = np.where(stopped, 0.0, increase)
+            reason[~has_price & (increase > 0) & (reason == OK)] = NO_PRICE
+            increase = np.where(has_price, increase, 0.0)
+
+            # Limits apply to notional exposure added by the rest of the order
+            with np.errstate(invalid='ignore'):
+                demand = np.where(increase > 0, increase * price, 0.0)
+            marks = np.nan_to_num(self.prices[:n_symbols])
+            exposure = np.abs(held) * marks
+            # A position can grow on its own side, or from zero once reduced to flat
+            long_exposure = np.maximum(held, 0) * marks
+            short_exposure = np.maximum(-held, 0) * marks
+            position_room = np.maximum(self.capital * self.max_position_pct - np.r_[long_exposure, short_exposure], 0)
+            side_group = idx + np.where(direction < 0, n_symbols, 0)
+            allowed = _fill_in_order(side_group, demand, position_room)
+            cut = allowed < demand
+            reason[cut & (reason == OK)] = POSITION_LIMIT
+
+            sector_exposure = np.bincount(self.sectors[:n_symbols], weights=exposure, minlength=len(self._sector_ids))
+            sector_room = np.maximum(self.capital * self.max_sector_pct - sector_exposure, 0)
+            demand, allowed = allowed, _fill_in_order(self.sectors[idx], allowed, sector_room)
+            reason[(allowed < demand) & (reason == OK)] = SECTOR_LIMIT
+
+            gross_room = np.array([max(self.capital * self.max_gross_pct - exposure.sum(), 0.0)])
+            demand, allowed = allowed, _fill_in_order(np.zeros(len(idx), dtype=np.int64), allowed, gross_room)
+            reason[(allowed < demand) & (reason == OK)] = GROSS_LIMIT
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                added = np.where(has_price, np.floor(allowed / price + 1e-9), 0.0)
+            quantity = direction * (reduce + added) + 0.0
+            approved = (quantity != 0) | (requested == 0)
+            return {'quantity': quantity, 'approved': approved, 'reason': reason, 'stopped': stopped}
+
+    def get_stats(self):
+        with self._lock:
+            n = len(self.symbols)
+            exposure = np.abs(self.positions[:n]) * np.nan_to_num(self.prices[:n])
+            return {
+                'symbols': n,
+                'positions': int(np.count_nonzero(self.positions[:n])),
+                'gross_exposure': float(exposure.sum()),
+                'stopped': int(self._stopped(np.arange(n)).sum()),
+                'reserved': int(np.count_nonzero(self.reserved[:n])),
+            }
@@ -0,0 +1,69 @@
+import importlib
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupProfile:
+    """Records import time per module and construction time per component.
+
+    Heavy dependencies are imported through ``timed_import`` at the point
+    they are first needed, so the report shows which code path paid for
+    which import.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.imports = {}
+        self.constructions = {}
+        self._lock = threading.Lock()
+
+    def timed_import(self, name):
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.imports.setdefault(name, elapsed)
+        return module
+
+    @contextmanager
+    def timed(self, label):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.constructions[label] = self.constructions.get(label, 0.0) + elapsed
+
+    def report(self):
+        with self._lock:
+            return {
+                'elapsed_seconds': time.perf_counter() - self.started_at,
+                'imports': dict(sorted(self.imports.items(), key=lambda item: -item[1])),
+                'constructions': dict(self.constructions),
+            }
+
+    def print_report(self, budget=None):
+        report = self.report()
+        print("\n🕒 Startup profile")
+        for name, seconds in report['imports'].items():
+            print(f"  import {name:<28} {seconds * 1000:8.1f} ms")
+        for label, seconds in report['constructions'].items():
+            print(f"  build  {label:<28} {seconds * 1000:8.1f} ms")
+        print(f"  total  {'':<28} {report['elapsed_seconds'] * 1000:8.1f} ms")
+        if budget is not None and report['elapsed_seconds'] > budget:
+            print(f"⚠ Startup took {report['elapsed_seconds']:.2f}s, over the {budget:.2f}s budget")
+        return report
+
+
+startup_profile = StartupProfile()
+
+
+def timed_import(name):
+    """Import ``name`` and record how long the first import took."""
+    return startup_profile.timed_import(name)
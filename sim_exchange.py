@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class SimulatedExchange:
+    """In-process venue that fills market orders with latency and partial fills.
+
+    An order becomes visible to the matching loop ``latency`` seconds after
+    ``submit``. Every ``tick_interval`` the loop fills resting orders first
+    come first served, up to ``liquidity`` shares per symbol and side per
+    tick, so large orders fill over several ticks. The fill price is the
+    symbol's last reference price, moved against the order by
+    ``slippage_bps``. Each tick's fills are passed to ``on_fills`` as a list
+    of dicts.
+    """
+
+    def __init__(self, latency=0.0, liquidity=1000, tick_interval=0.001, slippage_bps=0.0, on_fills=None):
+        self.latency = latency
+        self.liquidity = liquidity
+        self.tick_interval = tick_interval
+        self.slippage_bps = slippage_bps
+        self.on_fills = on_fills
+        self._arrivals = deque()
+        self._book = OrderedDict()
+        self._prices = {}
+        self._cond = threading.Condition()
+        self._running = True
+        self._stats = {'orders': 0, 'fills': 0, 'partial_fills': 0, 'filled_shares': 0, 'ticks': 0}
+        self._thread = threading.Thread(target=self._run, name='sim-exchange', daemon=True)
+        self._thread.start()
+
+    def submit(self, order_id, symbol, side, quantity, price):
+        """Send a market order for ``quantity`` shares; ``price`` updates the reference price."""
+        self.submit_batch([(order_id, symbol, side, quantity, price)])
+
+    def submit_batch(self, orders):
+        """``submit`` for a list of (order_id, symbol, side, quantity, price) tuples."""
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("SimulatedExchange is closed")
+            visible_at = time.monotonic() + self.latency
+            for order_id, symbol, side, quantity, price in orders:
+                self._prices[symbol] = price
+                self._arrivals.append((visible_at, {
+                    'order_id': order_id, 'symbol': symbol, 'side': side, 'quantity': quantity, 'remaining': quantity,
+                }))
+            self._stats['orders'] += len(orders)
+            self._cond.notify()
+
+    def update_price(self, symbol, price):
+        with self._cond:
+            self._prices[symbol] = price
+
+    def open_orders(self):
+        with self._cond:
+            return len(self._arrivals) + len(self._book)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                while self._arrivals and self._arrivals[0][0] <= now:
+                    order = self._arrivals.popleft()[1]
+                    self._book[order['order_id']] = order
+                if not self._book:
+                    if not self._running and not self._arrivals:
+                        return
+                    # Sleep until the next order arrives
+                    timeout = self._arrivals[0][0] - now if self._arrivals else None
+                    self._cond.wait(timeout)
+                    continue
+                fills = self._match()
+            if fills and self.on_fills is not None:
+                self.on_fills(fills)
+            time.sleep(self.tick_interval)
+
+    def _match(self):
+        budget = {}
+        fills = []
+        done = []
+        now = time.time()
+        for order_id, order in self._book.items():
+            key = (order['symbol'], order['side'])
+            available = budget.get(key, self.liquidity)
+            quantity = min(order['remaining'], available)
+            if quantity <= 0:
+                continue
+            budget[key] = available - quantity
+            order['remaining'] -= quantity
+            direction = 1 if order['side'] == 'buy' else -1
+            price = self._prices[order['symbol']] * (1 + direction * self.slippage_bps / 10000)
+            fills.append({
+                'order_id': order_id, 'symbol': order['symbol'], 'side': order['side'], 'quantity': quantity,
+                'price': price, 'remaining': order['remaining'], 'timestamp': now,
+            })
+            if not order['remaining']:
+                done.append(order_id)
+        for order_id in done:
+            del self._book[order_id]
+        self._stats['ticks'] += 1
+        self._stats['fills'] += len(fills)
+        self._stats['partial_fills'] += sum(1 for fill in fills if fill['remaining'])
+        self._stats['filled_shares'] += sum(fill['quantity'] for fill in fills)
+        return fills
+
+    def close(self):
+        """Stop taking orders and wait until every open order has filled."""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join()
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['open_orders'] = len(self._arrivals) + len(self._book)
+        return stats
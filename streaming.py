@@ -0,0 +1,309 @@
+import csv
+import json
+import queue
+import socket
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+_STOP = object()
+
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def parse_event(record):
+    """Normalize a replay/feed record into a bar or tick event dict.
+
+    Records carry ``symbol`` and ``timestamp`` (epoch seconds) plus either
+    OHLCV fields (a bar) or ``price`` and optional ``size`` (a tick).
+    """
+    event = {'symbol': str(record['symbol']).strip().upper(), 'timestamp': float(record['timestamp'])}
+    if record.get('close') not in (None, ''):
+        event['kind'] = 'bar'
+        close = float(record['close'])
+        for field in BAR_FIELDS:
+            value = record.get(field)
+            event[field] = float(value) if value not in (None, '') else (0.0 if field == 'volume' else close)
+    else:
+        event['kind'] = 'tick'
+        event['price'] = float(record['price'])
+        size = record.get('size')
+        event['size'] = float(size) if size not in (None, '') else 0.0
+    return event
+
+
+class ReplaySource:
+    """Replays bars or ticks from a CSV (with header) or JSON-lines file.
+
+    With ``speed`` > 0 events are paced by their timestamps, ``speed`` times
+    faster than real time; with 0 they are emitted as fast as they are read.
+    """
+
+    def __init__(self, path, speed=0.0):
+        self.path = path
+        self.speed = speed
+
+    def _records(self, f):
+        if self.path.endswith('.csv'):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def __iter__(self):
+        previous = None
+        with open(self.path) as f:
+            for record in self._records(f):
+                event = parse_event(record)
+                if self.speed and previous is not None and event['timestamp'] > previous:
+                    time.sleep((event['timestamp'] - previous) / self.speed)
+                previous = event['timestamp']
+                yield event
+
+    def close(self):
+        pass
+
+
+class SocketSource:
+    """Reads newline-delimited JSON events from a TCP feed until it closes."""
+
+    def __init__(self, host, port, timeout=10.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._sock = None
+
+    def __iter__(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock.settimeout(None)
+        with self._sock.makefile('r') as f:
+            for line in f:
+                if line.strip():
+                    yield parse_event(json.loads(line))
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+
+
+class ReplayServer:
+    """Local stand-in for a live feed: serves a replay file over TCP.
+
+    Each client connection receives every event of ``source`` as a JSON
+    line. Blocking sends mean a slow client throttles the server, as a real
+    feed over TCP would.
+    """
+
+    def __init__(self, source, host='127.0.0.1', port=0):
+        self.source = source
+        self._server = socket.create_server((host, port))
+        self.host, self.port = self._server.getsockname()[:2]
+        self._thread = threading.Thread(target=self._serve, name='replay-server', daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            with conn:
+                try:
+                    for event in self.source:
+                        conn.sendall((json.dumps(event) + '\n').encode('utf-8'))
+                except OSError:
+                    pass
+
+    def close(self):
+        self._server.close()
+
+
+def make_source(spec, speed=0.0):
+    """``host:port`` connects to a socket feed; anything else is a replay file path."""
+    host, sep, port = spec.rpartition(':')
+    if sep and port.isdigit() and '/' not in spec:
+        return SocketSource(host or '127.0.0.1', int(port))
+    return ReplaySource(spec, speed)
+
+
+class _Stage:
+    def __init__(self, name, maxsize):
+        self.name = name
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.max_depth = 0
+        self.processed = 0
+        self.blocked_seconds = 0.0
+
+    def put(self, item):
+        # A full queue blocks the upstream stage, which is the backpressure
+        start = time.perf_counter()
+        self.queue.put(item)
+        self.blocked_seconds += time.perf_counter() - start
+        depth = self.queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def stats(self):
+        return {
+            'depth': self.queue.qsize(),
+            'max_depth': self.max_depth,
+            'processed': self.processed,
+            'blocked_seconds': round(self.blocked_seconds, 4),
+        }
+
+
+class StreamingEngine:
+    """Event-driven pipeline from a market feed to trade decisions.
+
+    Events flow source -> market -> strategy -> risk -> execution, one thread
+    per stage with bounded queues between them, so a slow stage backs up to
+    the source instead of buffering without limit. The market stage folds
+    each event into MarketDataAgent's history; a symbol is then queued for
+    re-evaluation only if it is not already waiting, so a burst of events
+    for one symbol yields one decision on its latest state. Latency is
+    measured from when the oldest unserved event for a symbol was read to
+    when its decision was executed.
+    """
+
+    STAGES = ('market', 'strategy', 'risk', 'execution')
+
+    def __init__(self, agents, current_portfolio, capital, queue_size=1000, sentiment_fn=None,
+                 max_latency_samples=100000):
+        self.market_agent, self.sentiment_agent, self.strategy_agent, self.risk_agent, self.execution_agent = agents
+        self.current_portfolio = current_portfolio
+        self.capital = capital
+        # Only an order manager reports fills back to the risk engine, so
+        # only then can a reservation be released by its fills
+        self.reserve = self.execution_agent.order_manager is not None
+        if sentiment_fn is None:
+            sentiment_fn = self.sentiment_agent.current_sentiment
+        self.sentiment_fn = sentiment_fn
+        self.stages = {name: _Stage(name, queue_size) for name in self.STAGES}
+        self.decisions = {}
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._latencies = deque(maxlen=max_latency_samples)
+        self._stop = threading.Event()
+        self._source = None
+        self.events = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.elapsed = 0.0
+
+    def run(self, source):
+        """Consume ``source`` to the end (or until ``stop()``) and return stats."""
+        self._source = source
+        workers = [
+            threading.Thread(target=self._run_stage, args=(name, handler), name=f'stream-{name}', daemon=True)
+            for name, handler in (('market', self._on_event), ('strategy', self._on_symbol),
+                                  ('risk', self._on_strategy), ('execution', self._on_risk))
+        ]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        try:
+            for event in source:
+                if self._stop.is_set():
+                    break
+                event['received'] = time.perf_counter()
+                self.events += 1
+                self.stages['market'].put(event)
+        finally:
+            self.stages['market'].put(_STOP)
+            for worker in workers:
+                worker.join()
+            self.elapsed = time.perf_counter() - start
+        return self.get_stats()
+
+    def stop(self):
+        self._stop.set()
+        if self._source is not None:
+            self._source.close()
+
+    def _run_stage(self, name, handler):
+        stage = self.stages[name]
+        following = self.STAGES.index(name) + 1
+        downstream = self.stages[self.STAGES[following]] if following < len(self.STAGES) else None
+        while True:
+            item = stage.queue.get()
+            if item is _STOP:
+                if downstream is not None:
+                    downstream.put(_STOP)
+                return
+            try:
+                result = handler(item)
+            except Exception as e:
+                self.errors += 1
+                print(f"Streaming {name} error: {e}")
+                result = None
+            stage.processed += 1
+            if result is not None and downstream is not None:
+                downstream.put(result)
+
+    def _on_event(self, event):
+        symbol = event['symbol']
+        if event['kind'] == 'bar':
+            self.market_agent.on_bar(symbol, event['timestamp'], *(event[field] for field in BAR_FIELDS))
+        else:
+            self.market_agent.on_tick(symbol, event['timestamp'], event['price'], event['size'])
+        with self._pending_lock:
+            if symbol in self._pending:
+                self.coalesced += 1
+                return None
+            self._pending[symbol] = event['received']
+        return symbol
+
+    def _on_symbol(self, symbol):
+        with self._pending_lock:
+            received = self._pending.pop(symbol)
+        market_data = self.market_agent.latest_bar(symbol)
+        self.market_agent.process_data(symbol, market_data)
+        indicators = self.market_agent.get_indicators(symbol)
+        strategy = self.strategy_agent.generate_strategy(symbol, market_data, self.sentiment_fn(symbol), indicators)
+        return symbol, received, float(market_data['close'].iloc[-1]), strategy
+
+    def _on_strategy(self, item):
+        symbol, received, price, strategy = item
+        # Approved orders stay reserved in the risk engine, so later decisions
+        # see the exposure before the trades reach current_portfolio
+        risk_eval = self.risk_agent.evaluate_risk(symbol, strategy, self.current_portfolio, self.capital, price,
+                                                  reserve=self.reserve)
+        return symbol, received, price, strategy, risk_eval
+
+    def _on_risk(self, item):
+        symbol, received, price, strategy, risk_eval = item
+        if risk_eval.get('approved', False):
+            adjusted_strategy = risk_eval.get('adjusted_strategy', strategy)
+            executed = False
+            try:
+                executed = self.execution_agent.execute_trade(symbol, adjusted_strategy, price)
+            finally:
+                # A rejected order never fills, so its reservation is handed back
+                if self.reserve and not executed:
+                    self.risk_agent.release(symbol, adjusted_strategy)
+        self.decisions[symbol] = {'strategy': strategy, 'risk': risk_eval, 'price': price}
+        self._latencies.append(time.perf_counter() - received)
+        return None
+
+    def get_stats(self):
+        latencies = np.fromiter(self._latencies, dtype=np.float64) * 1000
+        latency = {}
+        if len(latencies):
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            latency = {'p50_ms': round(float(p50), 3), 'p95_ms': round(float(p95), 3), 'p99_ms': round(float(p99), 3),
+                       'max_ms': round(float(latencies.max()), 3)}
+        return {
+            'events': self.events,
+            'decisions': len(self._latencies),
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+            'events_per_second': self.events / self.elapsed if self.elapsed > 0 else 0.0,
+            'queues': {name: stage.stats() for name, stage in self.stages.items()},
+            'tick_to_decision': latency,
+        }
@@ -0,0 +1,199 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+# 32-byte fixed-width record; symbol, action and reason are ids into the
+# journal's string table
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('price', '<f8'),
+    ('quantity', '<i4'),
+    ('symbol', '<u4'),
+    ('action', '<u4'),
+    ('reason', '<u4'),
+])
+
+
+class TradeJournal:
+    """Append-only trade log of fixed-width NumPy records.
+
+    Trades live in a growable structured array with interned strings. With a
+    ``directory`` each record is also appended to ``trades.bin`` and each new
+    string to ``strings.jsonl``; both are fsynced at most every
+    ``fsync_interval`` seconds and on ``sync()``/``close()``. Reopening the
+    directory loads the journal back, dropping a torn trailing record.
+    """
+
+    RECORDS_FILE = 'trades.bin'
+    STRINGS_FILE = 'strings.jsonl'
+
+    def __init__(self, directory=None, fsync_interval=1.0, initial_capacity=1024):
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self._records = np.empty(initial_capacity, dtype=RECORD_DTYPE)
+        self._count = 0
+        self._strings = []
+        self._string_ids = {}
+        self._sorted = True
+        self._last_timestamp = None
+        self._lock = threading.Lock()
+        self._records_file = None
+        self._strings_file = None
+        self._last_sync = time.monotonic()
+        self.syncs = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+            self._strings_file = open(os.path.join(directory, self.STRINGS_FILE), 'a', encoding='utf-8')
+            self._records_file = open(os.path.join(directory, self.RECORDS_FILE), 'ab')
+
+    def _load(self):
+        strings_path = os.path.join(self.directory, self.STRINGS_FILE)
+        if os.path.exists(strings_path):
+            with open(strings_path, 'r+b') as f:
+                data = f.read()
+                complete = data.rfind(b'\n') + 1
+                if complete != len(data):
+                    # Drop a torn trailing line so the next string starts on its own line
+                    f.truncate(complete)
+            for line in data[:complete].decode('utf-8').split('\n')[:-1]:
+                self._intern_loaded(json.loads(line))
+        records_path = os.path.join(self.directory, self.RECORDS_FILE)
+        if os.path.exists(records_path):
+            size = os.path.getsize(records_path)
+            complete = size - size % RECORD_DTYPE.itemsize
+            if complete != size:
+                # Drop a torn trailing record so appends stay aligned
+                with open(records_path, 'r+b') as f:
+                    f.truncate(complete)
+            records = np.fromfile(records_path, dtype=RECORD_DTYPE)
+            self._grow(len(records))
+            self._records[:len(records)] = records
+            self._count = len(records)
+            self._sorted = bool(np.all(np.diff(records['timestamp']) >= 0))
+            if len(records):
+                self._last_timestamp = float(records['timestamp'][-1])
+
+    def _intern_loaded(self, value):
+        self._string_ids[value] = len(self._strings)
+        self._strings.append(value)
+
+    def _intern(self, value):
+        value = str(value)
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._string_ids[value] = string_id
+            self._strings.append(value)
+            if self._strings_file is not None:
+                # Reaches the file before any record that refers to it
+                self._strings_file.write(json.dumps(value) + '\n')
+                self._strings_file.flush()
+        return string_id
+
+    def _grow(self, needed):
+        if needed > len(self._records):
+            capacity = max(needed, len(self._records) * 2)
+            records = np.empty(capacity, dtype=RECORD_DTYPE)
+            records[:self._count] = self._records[:self._count]
+            self._records = records
+
+    def append(self, symbol, action, price, quantity, reason, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            self._grow(self._count + 1)
+            i = self._count
+            self._records[i] = (timestamp, price, quantity, self._intern(symbol), self._intern(action), self._intern(reason))
+            if i and timestamp < self._last_timestamp:
+                self._sorted = False
+            self._last_timestamp = timestamp
+            self._count += 1
+            if self._records_file is not None:
+                self._records_file.write(self._records[i:i + 1].tobytes())
+                if time.monotonic() - self._last_sync >= self.fsync_interval:
+                    self._sync()
+
+    def _sync(self):
+        for f in (self._strings_file, self._records_file):
+            f.flush()
+            os.fsync(f.fileno())
+        self._last_sync = time.monotonic()
+        self.syncs += 1
+
+    def sync(self):
+        with self._lock:
+            if self._records_file is not None:
+                self._sync()
+
+    def close(self):
+        with self._lock:
+            if self._records_file is not None:
+                self._sync()
+                self._records_file.close()
+                self._strings_file.close()
+                self._records_file = self._strings_file = None
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def records(self):
+        """All records as a read-only view."""
+        view = self._records[:self._count]
+        view.flags.writeable = False
+        return view
+
+    def query(self, symbol=None, start=None, end=None):
+        """Records for ``symbol`` (or all) with ``start <= timestamp <= end``, in append order."""
+        with self._lock:
+            records = self._records[:self._count]
+            if self._sorted:
+                timestamps = records['timestamp']
+                lo = 0 if start is None else int(np.searchsorted(timestamps, start, 'left'))
+                hi = len(records) if end is None else int(np.searchsorted(timestamps, end, 'right'))
+                records = records[lo:hi]
+            else:
+                mask = np.ones(len(records), dtype=bool)
+                if start is not None:
+                    mask &= records['timestamp'] >= start
+                if end is not None:
+                    mask &= records['timestamp'] <= end
+                records = records[mask]
+            if symbol is not None:
+                symbol_id = self._string_ids.get(symbol)
+                if symbol_id is None:
+                    return records[:0].copy()
+                records = records[records['symbol'] == symbol_id]
+            return records.copy()
+
+    def to_dicts(self, records=None):
+        """Records as the dicts the in-memory trade log used to hold."""
+        if records is None:
+            records = self.records
+        strings = self._strings
+        return [
+            {
+                'timestamp': datetime.fromtimestamp(timestamp),
+                'symbol': strings[symbol],
+                'action': strings[action],
+                'price': price,
+                'quantity': quantity,
+                'reason': strings[reason],
+            }
+            for timestamp, price, quantity, symbol, action, reason in records.tolist()
+        ]
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'trades': self._count,
+                'strings': len(self._strings),
+                'record_bytes': self._count * RECORD_DTYPE.itemsize,
+                'sorted': self._sorted,
+                'syncs': self.syncs,
+            }
@@ -0,0 +1,339 @@
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+DTYPES = ('float32', 'float16', 'int8')
+# Quantized rows are widened to float32 this many at a time, so each block
+# stays in cache between the conversion and the dot product
+SCAN_BLOCK_ROWS = 512
+# float16 bits shifted into a float32 are the same value times 2**-112 (the
+# exponent biases differ by 112); bits 28-30 are the int16 sign extension
+_HALF_SHIFT = 13
+_HALF_MASK = np.int32(-0x70000001)
+_HALF_SCALE = np.float32(2.0 ** 112)
+
+
+class _Partition:
+    """Contiguous storage for the vectors of one agent type.
+
+    Vectors are kept as ``dtype``; int8 rows carry a float32 scale each.
+    With ``keep_originals`` the float32 vectors are also appended to an
+    unnamed temporary file in ``originals_dir`` and memory-mapped for
+    rescoring, so they cost disk and page cache rather than heap.
+    """
+
+    def __init__(self, dim, capacity, dtype, keep_originals=False, originals_dir=None):
+        self.dim = dim
+        self.dtype = dtype
+        self.originals_dir = originals_dir
+        self.vectors = np.empty((capacity, dim), dtype=dtype)
+        self.scales = np.empty(capacity, dtype=np.float32) if dtype == 'int8' else None
+        self.last_seen = np.empty(capacity, dtype=np.float64)
+        self.hit_counts = np.empty(capacity, dtype=np.int64)
+        self.metadata = []
+        self.rows_by_key = {}
+        self.count = 0
+        self.originals = tempfile.TemporaryFile(dir=originals_dir) if keep_originals else None
+        self._originals_map = None
+
+    def _grow(self, needed=1):
+        # Amortized doubling: each row is copied O(1) times on average
+        capacity = len(self.vectors) * 2
+        while capacity < self.count + needed:
+            capacity *= 2
+        for name in ('vectors', 'scales', 'last_seen', 'hit_counts'):
+            old = getattr(self, name)
+            if old is not None:
+                grown = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+                grown[:self.count] = old[:self.count]
+                setattr(self, name, grown)
+
+    def append(self, vector, metadata, timestamp):
+        if self.count == len(self.vectors):
+            self._grow()
+        row = self.count
+        if self.dtype == 'int8':
+            scale = float(np.abs(vector).max()) / 127 or 1.0
+            self.vectors[row] = np.rint(vector / scale)
+            self.scales[row] = scale
+        else:
+            self.vectors[row] = vector
+        if self.originals is not None:
+            self.originals.write(vector.tobytes())
+        self.last_seen[row] = timestamp
+        self.hit_counts[row] = 1
+        self.metadata.append(metadata)
+        self.count += 1
+
+    def extend(self, vectors, metadata, timestamp):
+        n = len(vectors)
+        if self.count + n > len(self.vectors):
+            self._grow(n)
+        rows = slice(self.count, self.count + n)
+        if self.dtype == 'int8':
+            scales = np.abs(vectors).max(axis=1) / 127
+            scales[scales == 0] = 1.0
+            self.vectors[rows] = np.rint(vectors / scales[:, None])
+            self.scales[rows] = scales
+        else:
+            self.vectors[rows] = vectors
+        if self.originals is not None:
+            self.originals.write(vectors.tobytes())
+        self.last_seen[rows] = timestamp
+        self.hit_counts[rows] = 1
+        self.metadata.extend(metadata)
+        self.count += n
+
+    def originals_map(self):
+        """Read-only float32 view of the original vectors, remapped when rows were added."""
+        if self.originals is None or not self.count:
+            return None
+        if self._originals_map is None or len(self._originals_map) != self.count:
+            self.originals.flush()
+            self._originals_map = np.memmap(self.originals, dtype=np.float32, mode='r', shape=(self.count, self.dim))
+        return self._originals_map
+
+    def compacted(self, keep):
+        """A new partition holding only the rows in ``keep`` (ascending), with 25% headroom."""
+        capacity = max(1, len(keep) + len(keep) // 4)
+        partition = _Partition(self.dim, capacity, self.dtype, self.originals is not None, self.originals_dir)
+        n = len(keep)
+        partition.vectors[:n] = self.vectors[keep]
+        if self.scales is not None:
+            partition.scales[:n] = self.scales[keep]
+        partition.last_seen[:n] = self.last_seen[keep]
+        partition.hit_counts[:n] = self.hit_counts[keep]
+        partition.metadata = [self.metadata[row] for row in keep.tolist()]
+        partition.count = n
+        originals = self.originals_map()
+        if originals is not None:
+            for start in range(0, n, 65536):
+                partition.originals.write(np.ascontiguousarray(originals[keep[start:start + 65536]]).tobytes())
+        new_rows = np.full(self.count, -1, dtype=np.int64)
+        new_rows[keep] = np.arange(n)
+        for key, row in self.rows_by_key.items():
+            if new_rows[row] >= 0:
+                partition.rows_by_key[key] = int(new_rows[row])
+        return partition
+
+    def close(self):
+        if self.originals is not None:
+            self.originals.close()
+
+    def nbytes(self):
+        per_row = self.vectors.itemsize * self.dim + self.last_seen.itemsize + self.hit_counts.itemsize
+        if self.scales is not None:
+            per_row += self.scales.itemsize
+        return per_row * self.count
+
+
+class VectorIndex:
+    """In-memory cosine-similarity index partitioned by agent type.
+
+    Vectors are L2-normalized on insert, so a top-k query is one
+    matrix-vector product followed by ``argpartition``. Entries added with
+    a ``key`` are stored once per agent type; adding the same key again only
+    bumps its hit count and last-seen time.
+
+    ``dtype`` float16 halves and int8 (one scale per row) quarters the
+    memory taken by vectors. Both scan slower than float32, float16 about
+    four times and int8 under twice, so int8 is the better choice unless
+    its recall is too low. For quantized partitions with ``rescore`` > 0,
+    a query takes the ``limit * rescore`` best quantized scores and re-ranks
+    them against the float32 originals, which are kept in a temporary file
+    under ``originals_dir``. ``compact`` drops old or surplus entries.
+    """
+
+    def __init__(self, initial_capacity=1024, dtype='float32', rescore=4, originals_dir=None):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown vector dtype: {dtype}")
+        self.initial_capacity = initial_capacity
+        self.dtype = dtype
+        self.rescore = rescore
+        self.originals_dir = originals_dir
+        self.dim = None
+        self._partitions = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _bump(self, partition, row, timestamp):
+        partition.hit_counts[row] += 1
+        partition.last_seen[row] = timestamp
+
+    def _partition(self, agent_type):
+        partition = self._partitions.get(agent_type)
+        if partition is None:
+            keep_originals = self.dtype != 'float32' and self.rescore > 0
+            partition = _Partition(self.dim, self.initial_capacity, self.dtype, keep_originals, self.originals_dir)
+            self._partitions[agent_type] = partition
+        return partition
+
+    def add(self, agent_type, embedding, metadata, key=None, timestamp=None):
+        """Add an entry; returns False if ``key`` was already stored for ``agent_type``."""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            partition = self._partitions.get(agent_type)
+            if key is not None and partition is not None:
+                row = partition.rows_by_key.get(key)
+                if row is not None:
+                    self._bump(partition, row, timestamp)
+                    return False
+        vector = self._normalize(embedding)
+        with self._lock:
+            if self.dim is None:
+                self.dim = len(vector)
+            elif len(vector) != self.dim:
+                raise ValueError(f"Expected embedding of dimension {self.dim}, got {len(vector)}")
+            partition = self._partition(agent_type)
+            if key is not None:
+                row = partition.rows_by_key.get(key)
+                if row is not None:
+                    self._bump(partition, row, timestamp)
+                    return False
+                partition.rows_by_key[key] = partition.count
+            partition.append(vector, metadata, timestamp)
+            return True
+
+    def add_batch(self, agent_type, embeddings, metadata, timestamp=None):
+        """Add many entries without keys in one pass, e.g. for a bulk load."""
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms > 0, norms, 1)
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected embedding of dimension {self.dim}, got {vectors.shape[1]}")
+            partition = self._partition(agent_type)
+            partition.extend(vectors, metadata, timestamp)
+
+    def hit_count(self, agent_type, key):
+        with self._lock:
+            partition = self._partitions.get(agent_type)
+            row = partition.rows_by_key.get(key) if partition else None
+            return int(partition.hit_counts[row]) if row is not None else 0
+
+    def search(self, agent_type, query_embedding, limit=5):
+        """Return the metadata of the ``limit`` most similar entries, best first."""
+        with self._lock:
+            partition = self._partitions.get(agent_type)
+            if partition is None or partition.count == 0 or limit <= 0:
+                return []
+            # Compaction swaps in a new partition, so these stay consistent
+            vectors = partition.vectors[:partition.count]
+            scales = partition.scales[:partition.count] if partition.scales is not None else None
+            metadata = partition.metadata
+            originals = partition.originals_map()
+        query = self._normalize(query_embedding)
+        if vectors.dtype == np.float32:
+            indices, _ = self.top_k(vectors, query, limit)
+        else:
+            scores = self.quantized_scores(vectors, scales, query)
+            if originals is None or self.rescore <= 0:
+                indices, _ = self._top_k(scores, limit)
+            else:
+                candidates, _ = self._top_k(scores, limit * self.rescore)
+                candidates.sort()
+                order, _ = self._top_k(np.asarray(originals[candidates]) @ query, limit)
+                indices = candidates[order]
+        return [metadata[i] for i in indices]
+
+    @staticmethod
+    def quantized_scores(vectors, scales, query):
+        """``vectors @ query`` for float16 or int8 rows (times ``scales``), in float32.
+
+        numpy's float16 to float32 cast is scalar code, about ten times the
+        cost of the int8 one, so float16 rows are widened with integer
+        shifts on their bits instead and the exponent bias is folded into
+        the query.
+        """
+        scores = np.empty(len(vectors), dtype=np.float32)
+        half = vectors.dtype == np.float16
+        if half:
+            vectors = vectors.view(np.int16)
+            query = query * _HALF_SCALE
+        block = np.empty((min(SCAN_BLOCK_ROWS, len(vectors)), vectors.shape[1]),
+                         dtype=np.int32 if half else np.float32)
+        for start in range(0, len(vectors), SCAN_BLOCK_ROWS):
+            rows = vectors[start:start + SCAN_BLOCK_ROWS]
+            widened = block[:len(rows)]
+            if half:
+                np.left_shift(rows, _HALF_SHIFT, out=widened, dtype=np.int32)
+                np.bitwise_and(widened, _HALF_MASK, out=widened)
+                widened = widened.view(np.float32)
+            else:
+                np.copyto(widened, rows, casting='unsafe')
+            np.dot(widened, query, out=scores[start:start + len(rows)])
+        if scales is not None:
+            scores *= scales
+        return scores
+
+    @staticmethod
+    def top_k(vectors, query, k):
+        """Indices and scores of the ``k`` highest ``vectors @ query`` rows, best first."""
+        return VectorIndex._top_k(vectors @ query, k)
+
+    @staticmethod
+    def _top_k(scores, k):
+        k = min(k, len(scores))
+        if k < len(scores):
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(len(scores))
+        order = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return order, scores[order]
+
+    def compact(self, agent_type, max_entries=None, max_age=None, now=None):
+        """Drop entries not seen for ``max_age`` seconds, then all but the ``max_entries`` most recently seen.
+
+        Returns the number of entries removed. Searches running meanwhile
+        finish against the old storage.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            partition = self._partitions.get(agent_type)
+            if partition is None:
+                return 0
+            last_seen = partition.last_seen[:partition.count]
+            keep = np.flatnonzero(last_seen >= now - max_age) if max_age else np.arange(partition.count)
+            if max_entries is not None and len(keep) > max_entries:
+                if max_entries > 0:
+                    keep = np.sort(keep[np.argpartition(-last_seen[keep], max_entries - 1)[:max_entries]])
+                else:
+                    keep = keep[:0]
+            removed = partition.count - len(keep)
+            if removed:
+                self._partitions[agent_type] = partition.compacted(keep)
+        if removed:
+            partition.close()
+        return removed
+
+    def count(self, agent_type=None):
+        with self._lock:
+            if agent_type is not None:
+                partition = self._partitions.get(agent_type)
+                return partition.count if partition else 0
+            return sum(partition.count for partition in self._partitions.values())
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                agent_type: {
+                    'entries': partition.count,
+                    'hits': int(partition.hit_counts[:partition.count].sum()),
+                    'array_bytes': partition.nbytes(),
+                }
+                for agent_type, partition in self._partitions.items()
+            }
+
+    def agent_types(self):
+        with self._lock:
+            return list(self._partitions)
@@ -0,0 +1,168 @@
+import json
+import os
+import threading
+import time
+
+from metrics import metrics
+
+
+def _json_default(value):
+    # Embeddings arrive as numpy arrays, timestamps as datetimes
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+class WriteBuffer:
+    """Collects rows and hands them to ``flush_fn`` in batches.
+
+    A batch is flushed when ``max_rows`` rows are pending, when the oldest
+    pending row is ``flush_interval`` seconds old (checked by a background
+    thread), or on an explicit ``flush()``/``close()``. If ``flush_fn``
+    raises, the batch is retried on its own by later flushes, ahead of
+    newer rows. After ``max_retries`` failed attempts it is dead-lettered:
+    appended as JSON lines to ``<dead_letter_dir>/<name>.jsonl``, or only
+    logged when no directory is set.
+    """
+
+    def __init__(self, flush_fn, max_rows=500, flush_interval=1.0, name='writer', max_retries=3,
+                 dead_letter_dir=None):
+        self.flush_fn = flush_fn
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+        self.name = name
+        self.max_retries = max(1, max_retries)
+        self.dead_letter_dir = dead_letter_dir
+        self._rows = []
+        self._oldest = None
+        # The batch that last failed and how often it has; guarded by _flush_lock
+        self._failed = []
+        self._attempts = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._stats = {
+            'rows_buffered': 0,
+            'rows_flushed': 0,
+            'rows_dead_lettered': 0,
+            'flushes': 0,
+            'failed_flushes': 0,
+            'max_batch_size': 0,
+            'total_flush_seconds': 0.0,
+            'max_flush_seconds': 0.0,
+            'last_flush_seconds': 0.0,
+        }
+        self._thread = None
+        if flush_interval and flush_interval > 0:
+            self._thread = threading.Thread(target=self._run, name=f'{name}-flusher', daemon=True)
+            self._thread.start()
+
+    def add(self, row):
+        with self._lock:
+            if not self._rows:
+                self._oldest = time.monotonic()
+            self._rows.append(row)
+            self._stats['rows_buffered'] += 1
+            full = len(self._rows) >= self.max_rows
+        if full:
+            self.flush()
+
+    def pending(self):
+        with self._lock:
+            return len(self._rows) + len(self._failed)
+
+    def flush(self):
+        """Write every pending row now. Returns the number of rows written.
+
+        A previously failed batch goes first; while it keeps failing, newer
+        rows stay buffered.
+        """
+        with self._flush_lock:
+            written = 0
+            if self._failed:
+                batch, self._failed = self._failed, []
+                if not self._write(batch):
+                    return written
+                written += len(batch)
+            with self._lock:
+                batch, self._rows = self._rows, []
+                self._oldest = None
+            if batch and self._write(batch):
+                written += len(batch)
+            return written
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        try:
+            self.flush_fn(batch)
+        except Exception as e:
+            self._attempts += 1
+            with self._lock:
+                self._stats['failed_flushes'] += 1
+            if self._attempts >= self.max_retries:
+                self._attempts = 0
+                self._dead_letter(batch, e)
+            else:
+                print(f"{self.name} flush failed (attempt {self._attempts}/{self.max_retries}), retrying later: {e}")
+                self._failed = batch
+            return False
+        self._attempts = 0
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._stats['flushes'] += 1
+            self._stats['rows_flushed'] += len(batch)
+            self._stats['max_batch_size'] = max(self._stats['max_batch_size'], len(batch))
+            self._stats['total_flush_seconds'] += elapsed
+            self._stats['max_flush_seconds'] = max(self._stats['max_flush_seconds'], elapsed)
+            self._stats['last_flush_seconds'] = elapsed
+        return True
+
+    def _dead_letter(self, batch, error):
+        with self._lock:
+            self._stats['rows_dead_lettered'] += len(batch)
+        metrics.increment('write_buffer_dead_lettered_total', len(batch), writer=self.name)
+        message = f"{self.name} dropped {len(batch)} rows after {self.max_retries} failed flushes: {error}"
+        if self.dead_letter_dir:
+            path = os.path.join(self.dead_letter_dir, f'{self.name}.jsonl')
+            try:
+                os.makedirs(self.dead_letter_dir, exist_ok=True)
+                with open(path, 'a') as f:
+                    f.writelines(json.dumps(list(row), default=_json_default) + '\n' for row in batch)
+                print(f"{message}; saved to {path}")
+                return
+            except (OSError, TypeError, ValueError) as e:
+                print(f"{self.name} could not write dead letters to {path}: {e}")
+        print(message)
+
+    def _run(self):
+        while not self._closed.wait(self.flush_interval / 2):
+            with self._lock:
+                due = bool(self._failed) or (
+                    self._oldest is not None and time.monotonic() - self._oldest >= self.flush_interval)
+            if due:
+                self.flush()
+
+    def close(self):
+        """Flush what is left, retrying failures; returns the number of rows dead-lettered meanwhile."""
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            dead_before = self._stats['rows_dead_lettered']
+        # Each pass either writes rows or brings a failing batch closer to the dead letters
+        while self.pending():
+            self.flush()
+        with self._lock:
+            lost = self._stats['rows_dead_lettered'] - dead_before
+        if lost:
+            print(f"{self.name} closed with {lost} rows not written")
+        return lost
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._rows) + len(self._failed)
+        flushes = stats['flushes']
+        stats['avg_batch_size'] = stats['rows_flushed'] / flushes if flushes else 0.0
+        stats['avg_flush_ms'] = stats['total_flush_seconds'] * 1000 / flushes if flushes else 0.0
+        return stats